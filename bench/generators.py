@@ -0,0 +1,328 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Generators of synthetic, but realistic enough, RIPE Atlas results for the
+benchmarks.  All of them are deterministic for a given seed.
+"""
+
+import base64
+import datetime
+import json
+import random
+import struct
+
+KINDS = ("ping", "traceroute", "dns", "sslcert", "http", "ntp")
+
+COUNTRIES = ("NL", "DE", "GR", "FR", "GB", "US", "JP", "BR", "ZA", "AU")
+ASNS = (3333, 1103, 3320, 6830, 7018, 2914, 3356, 1299, 6939, 13335)
+
+START = 1700000000
+
+
+class Generator(object):
+    """
+    Make `count` results of one kind, spread over `probes` probes.
+    """
+
+    MSM_IDS = {
+        "ping": 1001,
+        "traceroute": 5001,
+        "dns": 10001,
+        "sslcert": 15001,
+        "http": 20001,
+        "ntp": 25001,
+    }
+
+    def __init__(self, kind, count, probes=1000, seed=0):
+        if kind not in KINDS:
+            raise ValueError("Unknown kind of result: {}".format(kind))
+        self.kind = kind
+        self.count = count
+        self.probes = probes
+        self.random = random.Random(seed)
+
+        # A shared pool of router addresses so that paths overlap
+        self.routers = [self._address() for _ in range(200)]
+
+    def __iter__(self):
+        make = getattr(self, "_{}".format(self.kind))
+        for i in range(self.count):
+            yield make(i)
+
+    def lines(self):
+        for result in self:
+            yield json.dumps(result, separators=(",", ":")) + "\n"
+
+    def write(self, path):
+        with open(path, "w") as f:
+            f.writelines(self.lines())
+
+    def get_probes(self):
+        """
+        Return the meta data of every probe that appears in the results.
+        """
+        r = {}
+        for pk in range(1, self.probes + 1):
+            rng = random.Random(pk)
+            r[pk] = {
+                "id": pk,
+                "country_code": rng.choice(COUNTRIES),
+                "asn_v4": rng.choice(ASNS),
+                "asn_v6": rng.choice(ASNS + (None,)),
+                "prefix_v4": "{}.0.0.0/8".format(rng.randint(1, 223)),
+                "prefix_v6": None,
+                "is_anchor": pk % 50 == 0,
+                "is_public": True,
+                "status": {"id": 1, "name": "Connected"},
+            }
+        return r
+
+    def _address(self):
+        return "{}.{}.{}.{}".format(
+            self.random.randint(1, 223),
+            self.random.randint(0, 255),
+            self.random.randint(0, 255),
+            self.random.randint(1, 254),
+        )
+
+    def _base(self, i, msm_name):
+        probe_id = i % self.probes + 1
+        return {
+            "af": 4,
+            "from": "{}.{}.{}.1".format(
+                probe_id % 200 + 1, probe_id // 256 % 256, probe_id % 256
+            ),
+            "fw": 5080,
+            "group_id": self.MSM_IDS[self.kind],
+            "lts": self.random.randint(1, 100),
+            "msm_id": self.MSM_IDS[self.kind],
+            "msm_name": msm_name,
+            "prb_id": probe_id,
+            "src_addr": "192.168.1.{}".format(probe_id % 254 + 1),
+            "timestamp": START + i,
+            "type": self.kind,
+        }
+
+    def _rtt(self, base=30.0):
+        return round(self.random.lognormvariate(0, 0.5) * base, 3)
+
+    def _ping(self, i):
+        r = self._base(i, "Ping")
+        rtts = [self._rtt() for _ in range(3)]
+        packets = [{"rtt": rtt} for rtt in rtts]
+        if self.random.random() < 0.05:
+            packets[-1] = {"x": "*"}
+            rtts.pop()
+        r.update(
+            {
+                "avg": round(sum(rtts) / len(rtts), 3),
+                "dst_addr": "193.0.6.139",
+                "dst_name": "ripe.net",
+                "dup": 0,
+                "max": max(rtts),
+                "min": min(rtts),
+                "proto": "ICMP",
+                "rcvd": len(rtts),
+                "result": packets,
+                "sent": 3,
+                "size": 48,
+                "step": 240,
+                "ttl": 54,
+            }
+        )
+        return r
+
+    def _traceroute(self, i):
+        r = self._base(i, "Traceroute")
+        hops = []
+        path = self.random.sample(self.routers, self.random.randint(6, 14))
+        for hop, router in enumerate(path + ["193.0.6.139"], 1):
+            packets = []
+            for _ in range(3):
+                if self.random.random() < 0.05:
+                    packets.append({"x": "*"})
+                else:
+                    packets.append(
+                        {
+                            "from": router,
+                            "rtt": self._rtt(hop * 3.0),
+                            "size": 76,
+                            "ttl": 255 - hop,
+                        }
+                    )
+            hops.append({"hop": hop, "result": packets})
+        r.update(
+            {
+                "dst_addr": "193.0.6.139",
+                "dst_name": "ripe.net",
+                "endtime": START + i + 5,
+                "paris_id": i % 16,
+                "proto": "ICMP",
+                "result": hops,
+                "size": 48,
+            }
+        )
+        return r
+
+    def _dns(self, i):
+        r = self._base(i, "Tdig")
+        answers = [self._address() for _ in range(self.random.randint(1, 3))]
+        abuf = self._get_abuf(i % 65536, "example{}.com".format(i % 100), answers)
+        r.update(
+            {
+                "dst_addr": "193.0.14.129",
+                "proto": "UDP",
+                "result": {
+                    "ANCOUNT": len(answers),
+                    "ARCOUNT": 0,
+                    "ID": i % 65536,
+                    "NSCOUNT": 0,
+                    "QDCOUNT": 1,
+                    "abuf": base64.b64encode(abuf).decode(),
+                    "rt": self._rtt(),
+                    "size": len(abuf),
+                },
+            }
+        )
+        return r
+
+    @staticmethod
+    def _get_abuf(message_id, name, answers):
+        """
+        Pack a NOERROR response to an A query for `name` in DNS wire format.
+        """
+        abuf = struct.pack("!HHHHHH", message_id, 0x8180, 1, len(answers), 0, 0)
+        for label in name.split("."):
+            abuf += struct.pack("!B", len(label)) + label.encode()
+        abuf += b"\x00" + struct.pack("!HH", 1, 1)
+        for answer in answers:
+            # A pointer back to the name in the question
+            abuf += struct.pack("!HHHIH", 0xC00C, 1, 1, 300, 4)
+            abuf += bytes(int(octet) for octet in answer.split("."))
+        return abuf
+
+    def _sslcert(self, i):
+        r = self._base(i, "SSLCert")
+        r.update(
+            {
+                "cert": [get_certificate()],
+                "dst_addr": "193.0.6.139",
+                "dst_name": "ripe.net",
+                "dst_port": "443",
+                "method": "TLS",
+                "rt": self._rtt(),
+                "ttc": self._rtt(10.0),
+                "ver": "1.2",
+            }
+        )
+        return r
+
+    def _http(self, i):
+        r = self._base(i, "HTTPGet")
+        r.update(
+            {
+                "uri": "http://ripe.net:80/4096",
+                "result": [
+                    {
+                        "af": 4,
+                        "bsize": 4096,
+                        "dst_addr": "193.0.6.139",
+                        "hsize": 131,
+                        "method": "GET",
+                        "res": 200 if self.random.random() < 0.95 else 404,
+                        "rt": self._rtt(),
+                        "src_addr": r["src_addr"],
+                        "ver": "1.1",
+                    }
+                ],
+            }
+        )
+        return r
+
+    def _ntp(self, i):
+        r = self._base(i, "Ntp")
+        packets = []
+        for _ in range(3):
+            origin = START + i + self.random.random() + 2208988800
+            rtt = self._rtt(0.03)
+            packets.append(
+                {
+                    "final-ts": origin + rtt,
+                    "offset": round(self.random.gauss(0, 0.005), 6),
+                    "origin-ts": origin,
+                    "receive-ts": origin + rtt / 2,
+                    "rtt": rtt,
+                    "transmit-ts": origin + rtt / 2,
+                }
+            )
+        r.update(
+            {
+                "dst_addr": "193.0.0.229",
+                "dst_name": "ntp.ripe.net",
+                "li": "no",
+                "mode": "server",
+                "poll": 8,
+                "precision": 9.53674e-07,
+                "proto": "UDP",
+                "ref-id": "GPS",
+                "ref-ts": START + 2208988800,
+                "result": packets,
+                "root-delay": 0,
+                "root-dispersion": 0.000122,
+                "stratum": 1,
+                "version": 4,
+            }
+        )
+        return r
+
+
+_certificate = None
+
+
+def get_certificate():
+    """
+    A self-signed certificate in PEM format, made once per process.
+    """
+    global _certificate
+
+    if _certificate is None:
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.x509.oid import NameOID
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name(
+            [
+                x509.NameAttribute(NameOID.COUNTRY_NAME, "NL"),
+                x509.NameAttribute(NameOID.ORGANIZATION_NAME, "RIPE NCC"),
+                x509.NameAttribute(NameOID.COMMON_NAME, "ripe.net"),
+            ]
+        )
+        not_before = datetime.datetime.fromtimestamp(START, datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(1)
+            .not_valid_before(not_before)
+            .not_valid_after(not_before + datetime.timedelta(days=365))
+            .sign(key, hashes.SHA256())
+        )
+        _certificate = certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+    return _certificate
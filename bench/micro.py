@@ -0,0 +1,155 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Micro-benchmarks of the per-result hot paths of aggregation and filtering,
+over lightweight stand-ins for results so that nothing but those paths is
+timed:
+
+  $ python -m bench.micro --size 1000000
+
+Like bench.run, timings are the best of --repeat runs and are written out as
+JSON, with a summary on standard error.
+"""
+
+from types import SimpleNamespace
+import argparse
+import platform
+import random
+import sys
+
+from ripe.atlas.tools.aggregators import (
+    RangeKeyAggregator,
+    ValueKeyAggregator,
+    aggregate,
+)
+from ripe.atlas.tools.filters import FilterFactory, filter_results
+from ripe.atlas.tools.version import __version__
+
+from .generators import ASNS, COUNTRIES
+from .run import best_of, write_report
+
+
+def get_entities(size, probes=1000, seed=0):
+    """
+    Return `size` result-like objects spread over `probes` probe-like ones.
+    """
+    rng = random.Random(seed)
+    probes = [
+        SimpleNamespace(
+            id=pk,
+            country_code=rng.choice(COUNTRIES),
+            asn_v4=rng.choice(ASNS),
+            asn_v6=rng.choice(ASNS + (None,)),
+            prefix_v4="{}.0.0.0/8".format(rng.randint(1, 223)),
+            status="Connected",
+        )
+        for pk in range(1, probes + 1)
+    ]
+    return [
+        SimpleNamespace(
+            probe=probes[i % len(probes)],
+            rtt_median=round(rng.lognormvariate(3, 0.7), 3),
+        )
+        for i in range(size)
+    ]
+
+
+BENCHMARKS = {
+    "aggregate:country": lambda: [ValueKeyAggregator("probe.country_code")],
+    "aggregate:country+asn_v4": lambda: [
+        ValueKeyAggregator("probe.country_code"),
+        ValueKeyAggregator("probe.asn_v4"),
+    ],
+    "aggregate:prefix_v4": lambda: [ValueKeyAggregator("probe.prefix_v4")],
+    "aggregate:rtt-median": lambda: [
+        RangeKeyAggregator("rtt_median", [10, 20, 30, 40, 50, 100, 200, 300])
+    ],
+}
+
+
+def run(size, repeat):
+    entities = get_entities(size)
+
+    def record(name, seconds):
+        return {
+            "name": name,
+            "results": size,
+            "seconds": round(seconds, 6),
+            "results_per_second": round(size / seconds),
+        }
+
+    for name, get_aggregators in sorted(BENCHMARKS.items()):
+        aggregators = get_aggregators()
+        seconds, _ = best_of(repeat, lambda: aggregate(entities, aggregators))
+        yield record(name, seconds)
+
+    filters = [
+        FilterFactory.create("country_code", "NL"),
+        FilterFactory.create("asn", ASNS[0]),
+    ]
+    seconds, _ = best_of(repeat, lambda: filter_results(filters, entities))
+    yield record("filter:country_code|asn", seconds)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.micro",
+        description="Benchmark aggregation and filtering of results.",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=1000000,
+        help="The number of results (default: 1000000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Report the best of this many runs (default: 3)",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="Where to write the JSON results (default: standard output)",
+    )
+    arguments = parser.parse_args(args)
+
+    benchmarks = []
+    for benchmark in run(arguments.size, arguments.repeat):
+        sys.stderr.write(
+            "{name:28} {seconds:10.4f}s {results_per_second:12,}/s\n".format(
+                **benchmark
+            )
+        )
+        benchmarks.append(benchmark)
+
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": arguments.size,
+        "repeat": arguments.repeat,
+        "benchmarks": benchmarks,
+    }
+
+    write_report(report, arguments.output)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
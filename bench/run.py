@@ -0,0 +1,257 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Time the report pipeline (parse -> filter -> aggregate -> render) over
+synthetic results, with probe and IP lookups stubbed out so that neither the
+API nor the local cache is involved:
+
+  $ python -m bench.run --size 10000 --output bench.json
+
+Timings are the best of --repeat runs and are written out as JSON, so that two
+runs can be compared mechanically.  A summary goes to standard error.
+"""
+
+from unittest import mock
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+
+from ripe.atlas.cousteau import Probe as CProbe
+
+from ripe.atlas.tools.aggregators import RangeKeyAggregator, ValueKeyAggregator
+from ripe.atlas.tools.aggregators import aggregate
+from ripe.atlas.tools.filters import FilterFactory, Probe, SaganSet, filter_results
+from ripe.atlas.tools.ipdetails import IP
+from ripe.atlas.tools.renderers import Renderer
+from ripe.atlas.tools.version import __version__
+
+from .generators import ASNS, KINDS, Generator
+
+# Extra aggregators for the kinds that have something numeric to offer
+RANGE_AGGREGATORS = {
+    "ping": ("rtt_median", [10, 20, 30, 40, 50, 100, 200, 300]),
+}
+
+
+class StubbedLookups(object):
+    """
+    Serve probes from a generator's meta data, and make up deterministic
+    details for IP addresses, without touching the API or the cache.
+    """
+
+    def __init__(self, generator):
+        self.probes = {
+            pk: CProbe(id=pk, meta_data=meta_data)
+            for pk, meta_data in generator.get_probes().items()
+        }
+
+    def get_probes(self, ids):
+        return [self.probes[pk] for pk in ids]
+
+    @staticmethod
+    def resolve_ips(addresses):
+        r = {}
+        for address in addresses:
+            ip = IP(address, lookup=False)
+            first = int(address.split(".")[0]) if "." in address else 0
+            ip.asn = str(ASNS[first % len(ASNS)])
+            ip.holder = "AS{}".format(ip.asn)
+            r[address] = ip
+        return r
+
+    @contextlib.contextmanager
+    def patch(self):
+        with mock.patch.object(Probe, "get_many", side_effect=self.get_probes):
+            with mock.patch.object(IP, "resolve_many", side_effect=self.resolve_ips):
+                yield
+
+
+def best_of(repeat, function):
+    """
+    Return the fastest of `repeat` runs of `function`, and its last return
+    value.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        r = function()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, r
+
+
+def get_renderers(kind):
+    """
+    Yield (name, renderer class) for every renderer that can handle `kind`.
+    """
+    for name in sorted(Renderer.get_available()):
+        renderer = Renderer.get_renderer_by_name(name)
+        if kind in renderer.RENDERS:
+            yield name, renderer
+
+
+def get_renderer_arguments():
+    parser = argparse.ArgumentParser()
+    Renderer.add_arguments_for_available_renderers(parser)
+    return parser.parse_args([])
+
+
+def render(renderer_class, arguments, results):
+    renderer = renderer_class(arguments=arguments)
+    with contextlib.redirect_stdout(io.StringIO()):
+        renderer.render(results)
+
+
+def run_kind(kind, size, repeat, jobs=1, probes=1000):
+    """
+    Yield a dict for every benchmark of the pipeline over `size` results of
+    one kind.
+    """
+    generator = Generator(kind, size, probes=probes)
+    lines = list(generator.lines())
+    stubs = StubbedLookups(generator)
+
+    def record(stage, seconds, count):
+        return {
+            "kind": kind,
+            "stage": stage,
+            "results": count,
+            "seconds": round(seconds, 6),
+            "usec_per_result": round(seconds / count * 1e6, 3) if count else None,
+        }
+
+    with stubs.patch():
+
+        seconds, results = best_of(
+            repeat, lambda: list(SaganSet(iterable=lines, jobs=jobs))
+        )
+        yield record("parse", seconds, len(lines))
+
+        filters = [
+            FilterFactory.create("country_code", "NL"),
+            FilterFactory.create("asn", ASNS[0]),
+        ]
+        seconds, _ = best_of(repeat, lambda: filter_results(filters, results))
+        yield record("filter", seconds, len(results))
+
+        aggregators = [
+            ValueKeyAggregator("probe.country_code"),
+            ValueKeyAggregator("probe.asn_v4", prefix="ASN"),
+        ]
+        if kind in RANGE_AGGREGATORS:
+            aggregators.append(RangeKeyAggregator(*RANGE_AGGREGATORS[kind]))
+        seconds, _ = best_of(repeat, lambda: aggregate(results, aggregators))
+        yield record("aggregate", seconds, len(results))
+
+        arguments = get_renderer_arguments()
+        with tempfile.TemporaryDirectory() as path:
+            # For the renderers that write to a file rather than stdout
+            arguments.columnar_file = os.path.join(path, "columns")
+            for name, renderer_class in get_renderers(kind):
+                seconds, _ = best_of(
+                    repeat, lambda: render(renderer_class, arguments, results)
+                )
+                yield record("render:{}".format(name), seconds, len(results))
+
+
+def write_report(report, path):
+    """
+    Write `report` out as JSON to `path`, or to standard output for "-".
+    """
+    if path == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.run",
+        description="Benchmark the report pipeline over synthetic results.",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=10000,
+        help="The number of results of each kind (default: 10000)",
+    )
+    parser.add_argument(
+        "--kind",
+        action="append",
+        choices=KINDS,
+        help="Only benchmark this kind of result (can be given more than once)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Report the best of this many runs (default: 3)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="The number of processes to parse results with (default: 1)",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="Where to write the JSON results (default: standard output)",
+    )
+    arguments = parser.parse_args(args)
+
+    # sagan and its dependencies complain about the synthetic certificates
+    warnings.simplefilter("ignore")
+
+    benchmarks = []
+    for kind in arguments.kind or KINDS:
+        for benchmark in run_kind(
+            kind, arguments.size, arguments.repeat, jobs=arguments.jobs
+        ):
+            sys.stderr.write(
+                "{kind:12} {stage:28} {seconds:10.4f}s "
+                "{usec_per_result:10.1f}us/result\n".format(**benchmark)
+            )
+            benchmarks.append(benchmark)
+
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": arguments.size,
+        "repeat": arguments.repeat,
+        "jobs": arguments.jobs,
+        "benchmarks": benchmarks,
+    }
+
+    write_report(report, arguments.output)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
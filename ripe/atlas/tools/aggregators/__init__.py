@@ -14,9 +14,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from .base import RangeKeyAggregator, ValueKeyAggregator, aggregate
+from .summary import BucketSummary, OnlineAggregate
 
 __all__ = [
     "aggregate",
+    "BucketSummary",
+    "OnlineAggregate",
     "RangeKeyAggregator",
     "ValueKeyAggregator",
 ]
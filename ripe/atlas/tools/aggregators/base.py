@@ -12,7 +12,24 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import itertools
+import array
+import bisect
+import functools
+import operator
+import re
+
+
+@functools.lru_cache(maxsize=None)
+def get_numpy():
+    """
+    NumPy if it's installed, or None.  It's only imported once it's needed,
+    as importing it takes longer than many a command does.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 
 class ValueKeyAggregator(object):
@@ -21,23 +38,36 @@ class ValueKeyAggregator(object):
     def __init__(self, key, prefix=None):
         self.aggregation_keys = key.split(".")
         self.key_prefix = prefix or self.aggregation_keys[-1].upper()
+        self.get_key_value = operator.attrgetter(key)
+
+    def get_bucket_key(self, entity):
+        """
+        Returns a hashable key for the bucket the specific entity belongs to.
+        Entities with the same key always end up with the same bucket label,
+        so the label only needs to be made once per key (see get_label()).
+        """
+        value = self.get_key_value(entity)
+        # 34 == 34.0, but they make for different labels
+        return value.__class__, value
 
-    def get_key_value(self, entity):
+    def get_label(self, bucket_key):
         """
-        Returns the value of the key/attribute the aggregation will use to
-        bucketize probes/results
+        Returns the human-readable label of the bucket with the given key
         """
-        attribute = entity
-        for key in self.aggregation_keys:
-            attribute = getattr(attribute, key)
-        return attribute
+        return "{0}: {1}".format(self.key_prefix, bucket_key[1])
 
     def get_bucket(self, entity):
         """
         Returns the bucket the specific entity belongs to based on the give
         key/attribute
         """
-        return "{0}: {1}".format(self.key_prefix, self.get_key_value(entity))
+        return self.get_label(self.get_bucket_key(entity))
+
+    def get_bucket_keys(self, entities):
+        """
+        Returns an iterable of the bucket keys of all of the given entities
+        """
+        return map(self.get_bucket_key, entities)
 
 
 class RangeKeyAggregator(ValueKeyAggregator):
@@ -49,41 +79,89 @@ class RangeKeyAggregator(ValueKeyAggregator):
     def __init__(self, key, ranges):
         ValueKeyAggregator.__init__(self, key)
         self.aggregation_ranges = sorted(ranges, reverse=True)
-
-    def get_bucket(self, entity):
+        self._ascending_ranges = sorted(ranges)
+
+        # Bucket keys are indexes into aggregation_ranges, with one more for
+        # values below all of them, and each has a label made up front.
+        ranges = self.aggregation_ranges
+        self.labels = ["{0}: > {1}".format(self.key_prefix, ranges[0])]
+        for index in range(1, len(ranges)):
+            self.labels.append(
+                "{0}: {1}-{2}".format(self.key_prefix, ranges[index], ranges[index - 1])
+            )
+        self.labels.append("{0}: < {1}".format(self.key_prefix, ranges[-1]))
+
+        # Entities without a value (like a ping that got no replies, so has no
+        # median RTT) get a bucket of their own, after all of the ranges
+        self.missing = len(ranges) + 1
+        self.labels.append("{0}: none".format(self.key_prefix))
+
+    def get_bucket_key(self, entity):
         """
-        Returns the bucket the specific entity belongs to based on the give
-        key/attribute
+        Returns the index of the first range the value of the key/attribute
+        is above, the number of ranges if it's below all of them, or
+        `self.missing` if there's no value.
         """
+        value = self.get_key_value(entity)
+        # NaN too, as that's what None becomes in get_range_indexes()
+        if value is None or value != value:
+            return self.missing
+        ranges = self._ascending_ranges
+        return len(ranges) - bisect.bisect_left(ranges, value)
+
+    def get_label(self, bucket_key):
+        return self.labels[bucket_key]
+
+    def get_bucket_keys(self, entities):
+        return self.get_range_indexes(map(self.get_key_value, entities)).tolist()
 
-        bucket = "{0}: < {1}".format(
-            self.key_prefix, self.aggregation_ranges[-1]
+    def get_range_indexes(self, values):
+        """
+        Returns the bucket keys (see get_bucket_key()) of a whole sequence of
+        values in one go, as a NumPy array if NumPy is installed or an
+        array("l") if it isn't.
+        """
+        ranges = self._ascending_ranges
+        missing = self.missing
+        numpy = get_numpy()
+        if numpy is not None:
+            if not isinstance(values, numpy.ndarray):
+                # Missing values (None) become NaN...
+                values = numpy.fromiter(values, dtype=float)
+            indexes = len(ranges) - numpy.searchsorted(ranges, values, side="left")
+            # ...which searchsorted() puts above all of the ranges
+            indexes[numpy.isnan(values)] = missing
+            return indexes
+
+        bisect_left = bisect.bisect_left
+        return array.array(
+            "l",
+            [
+                missing
+                if value is None or value != value
+                else len(ranges) - bisect_left(ranges, value)
+                for value in values
+            ],
         )
 
-        key_value = self.get_key_value(entity)
-        for index, krange in enumerate(self.aggregation_ranges):
-            if key_value > krange:
-                if index == 0:
-                    bucket = "{0}: > {1}".format(self.key_prefix, krange)
-                else:
-                    bucket = "{0}: {1}-{2}".format(
-                        self.key_prefix,
-                        krange,
-                        self.aggregation_ranges[index - 1],
-                    )
-                break
 
-        return bucket
+_DIGITS = re.compile(r"(\d+)")
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_natural_key(label):
+    """
+    Split a label into its text and numeric parts, so that "ASN: 9" sorts
+    before "ASN: 10".  Text and numbers always alternate, starting with
+    (possibly empty) text, so any two of these keys can be compared.
+    """
+    parts = _DIGITS.split(label)
+    parts[1::2] = map(int, parts[1::2])
+    return parts
 
 
 def _get_sort_key(kv):
-    key = []
-    for is_digit, part in itertools.groupby(kv[0], key=str.isdigit):
-        part = "".join(part)
-        if is_digit:
-            part = int(part)
-        key.append(part)
-    return key
+    return _get_natural_key(kv[0])
 
 
 def aggregate(entities, aggregators):
@@ -96,11 +174,28 @@ def aggregate(entities, aggregators):
     if not aggregators:
         return entities
 
-    buckets = {}
+    if not isinstance(entities, list):
+        entities = list(entities)
+
+    # Work out the keys of every entity an aggregator at a time, which lets
+    # the aggregators do it in bulk
+    columns = [a.get_bucket_keys(entities) for a in aggregators]
+    keys = columns[0] if len(columns) == 1 else zip(*columns)
 
-    for e in entities:
-        key = " | ".join(a.get_bucket(e) for a in aggregators)
-        bucket = buckets.setdefault(key, [])
+    buckets = {}
+    labels = {}
+
+    for e, key in zip(entities, keys):
+        bucket = labels.get(key)
+        if bucket is None:
+            if len(aggregators) == 1:
+                label = aggregators[0].get_label(key)
+            else:
+                label = " | ".join(
+                    a.get_label(k) for a, k in zip(aggregators, key)
+                )
+            # Different keys may still share a label (e.g. "3333" and 3333)
+            bucket = labels[key] = buckets.setdefault(label, [])
         bucket.append(e)
 
     return dict(sorted(buckets.items(), key=_get_sort_key))
@@ -0,0 +1,166 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from ..helpers.sketch import QuantileSketch
+from .base import _get_sort_key
+
+
+class BucketSummary(object):
+    """
+    Running statistics for the results in one bucket: how many there were,
+    how many packets/queries/requests they sent and how many were answered,
+    and the distribution of the RTTs of the answers.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self.results = 0
+        self.sent = 0
+        self.received = 0
+        self.rtt_sum = 0.0
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtts = QuantileSketch()
+
+    def add(self, result):
+        sent, rtts = self.get_rtts(result)
+
+        self.results += 1
+        self.sent += sent
+        self.received += len(rtts)
+
+        if rtts:
+            self.rtt_sum += sum(rtts)
+            low, high = min(rtts), max(rtts)
+            if self.rtt_min is None or low < self.rtt_min:
+                self.rtt_min = low
+            if self.rtt_max is None or high > self.rtt_max:
+                self.rtt_max = high
+            self.rtts.update(rtts)
+
+    @staticmethod
+    def get_rtts(result):
+        """
+        Return (number of attempts, [RTTs of the successful ones]) for any
+        kind of result.
+        """
+        if result.is_error:
+            return 1, []
+
+        if hasattr(result, "packets"):  # ping, ntp
+            attempts = [
+                packet.rtt
+                for packet in result.packets
+                if not getattr(packet, "dup", False)
+            ]
+        elif hasattr(result, "responses"):  # dns, http
+            attempts = [response.response_time for response in result.responses]
+        elif hasattr(result, "last_median_rtt"):  # traceroute
+            rtt = result.last_median_rtt if result.destination_ip_responded else None
+            attempts = [rtt]
+        else:  # sslcert
+            attempts = [getattr(result, "response_time", None)]
+
+        return len(attempts), [rtt for rtt in attempts if rtt is not None]
+
+    @property
+    def loss(self):
+        if not self.sent:
+            return None
+        return 100.0 * (self.sent - self.received) / self.sent
+
+    @property
+    def rtt_average(self):
+        if not self.received:
+            return None
+        return self.rtt_sum / self.received
+
+    def quantile(self, q):
+        return self.rtts.quantile(q)
+
+
+class OnlineAggregate(object):
+    """
+    Aggregate results with the given aggregators as they come, keeping only a
+    BucketSummary for each bucket rather than the results themselves.  Memory
+    use depends on the number of buckets, not the number of results.
+    """
+
+    ALL = "All results"
+
+    HEADER = (
+        "{:<40} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+            "Bucket", "Results", "Loss%", "Min", "Median", "P90", "P99", "Max", "Avg"
+        )
+    )
+
+    def __init__(self, aggregators=()):
+        self.aggregators = aggregators
+        self.buckets = {}
+        self._buckets_by_key = {}
+
+    def __len__(self):
+        return sum(bucket.results for bucket in self.buckets.values())
+
+    def add(self, result):
+        key = tuple([a.get_bucket_key(result) for a in self.aggregators])
+        bucket = self._buckets_by_key.get(key)
+        if bucket is None:
+            label = " | ".join(
+                a.get_label(k) for a, k in zip(self.aggregators, key)
+            )
+            bucket = self.buckets.get(label or self.ALL)
+            if bucket is None:
+                bucket = self.buckets[label or self.ALL] = BucketSummary()
+            self._buckets_by_key[key] = bucket
+        bucket.add(result)
+
+    def update(self, results):
+        for result in results:
+            self.add(result)
+
+    def get_buckets(self):
+        """
+        Return [(key, BucketSummary)] in ascending numeric >> lexical order.
+        """
+        return sorted(self.buckets.items(), key=_get_sort_key)
+
+    def render(self):
+        """
+        Return the bucket summaries as a table, with RTTs in milliseconds.
+        """
+        lines = [self.HEADER, "=" * len(self.HEADER)]
+        for key, bucket in self.get_buckets():
+            lines.append(
+                "{:<40} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+                    key,
+                    bucket.results,
+                    self._format(bucket.loss, 1),
+                    self._format(bucket.rtt_min),
+                    self._format(bucket.quantile(0.5)),
+                    self._format(bucket.quantile(0.9)),
+                    self._format(bucket.quantile(0.99)),
+                    self._format(bucket.rtt_max),
+                    self._format(bucket.rtt_average),
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format(value, places=3):
+        if value is None:
+            return "-"
+        return "{:.{}f}".format(value, places)
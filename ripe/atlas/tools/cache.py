@@ -13,10 +13,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import datetime
 import functools
 import os
+import sqlite3
 import sys
+import threading
 
 try:
     import cPickle as pickle
@@ -28,7 +31,9 @@ try:
 except ImportError:
     import dbm  # ... and on Python3 dbm does the same
 
+from .exceptions import RipeAtlasToolsException
 from .helpers import xdg
+from .settings import conf
 
 
 class LocalCache(object):
@@ -36,52 +41,121 @@ class LocalCache(object):
     Simple caching engine, making use of the built-in dbm support.  This will
     create a file called cache.db in ripe-atlas-tools config directory and dump
     stuff in there for use later.
+
+    Recently used values are also kept in memory (up to `cache.memory-size`
+    of them from the configuration), so that looking up the same probe or
+    prefix over and over doesn't mean reading and unpickling it every time.
+    Note that this means values read from the cache may be shared, so don't
+    modify them in place.
+
+    The cache may be used from several threads, but only one of them touches
+    the database at a time.
     """
 
+    FILE_EXTENSION = "db"
+
     def __init__(self):
         self._now = datetime.datetime.now()
         self._db_file = None
+        self._db_path = None
+
+        self._memory = collections.OrderedDict()
+        self.memory_size = conf["cache"]["memory-size"]
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.RLock()
 
     @property
     def _db(self):
         if self._db_file is None:
-            self._db_file = dbm.open(self._get_or_create_db_path(), "c")
+            self._db_file = dbm.open(self.get_path(), "c")
         return self._db_file
 
+    def get_path(self):
+        """
+        The path to the database file backing this cache.  Other persistent
+        structures that need to live alongside the cache can use this as a
+        base for their own file names.
+        """
+        if self._db_path is None:
+            self._db_path = self._get_or_create_db_path()
+        return self._db_path
+
     def __contains__(self, key):
-        return key in self._db
+        with self._lock:
+            return self._memory_key(key) in self._memory or self._contains(key)
 
     def __getitem__(self, key):
         return self.get(key)
 
     def __setitem__(self, key, value, expires=None):
-        self._db[key] = pickle.dumps((expires, value))
+        with self._lock:
+            self._write([(key, (expires, value))])
+            self._remember(key, expires, value)
 
     def __delitem__(self, key):
-        if key not in self._db:
-            raise KeyError
-        del self._db[key]
-
-    def keys(self):
-        return self._db.keys()
-
-    def items(self):
-        for key in self.keys():
-            yield key, self._db[key]
+        with self._lock:
+            self._memory.pop(self._memory_key(key), None)
+            self._delete(key)
 
     def get(self, key, default=None):
-        if key in self._db:
-            expires, value = pickle.loads(self._db[key])
-            if not expires or expires > self._now:
-                return value
-            else:
-                del self._db[key]
-        return default
+        return self.get_many([key]).get(key, default)
 
     def set(self, key, value, expires=None):
-        return self.__setitem__(
-            key, value, self._now + datetime.timedelta(seconds=expires)
-        )
+        return self.__setitem__(key, value, self._get_expiry(expires))
+
+    def get_many(self, keys):
+        """
+        Return a dict of {key: value} for all of `keys` found in the cache.
+        Missing and expired keys are left out.
+        """
+        with self._lock:
+            r = {}
+            missing = []
+            for key in keys:
+                memory_key = self._memory_key(key)
+                entry = self._memory.get(memory_key)
+                if entry is not None and self._is_fresh(entry[0]):
+                    self._memory.move_to_end(memory_key)
+                    r[key] = entry[1]
+                else:
+                    missing.append(key)
+
+            self.hits += len(r)
+            self.misses += len(missing)
+
+            if missing:
+                for key, (expires, value) in self._read(missing).items():
+                    self._remember(key, expires, value)
+                    r[key] = value
+
+            return r
+
+    def set_many(self, mapping, expires=None):
+        """
+        Set all of the values in `mapping` ({key: value}, or an iterable of
+        (key, value) pairs) with the same expiration time, in one batch.
+        Pairs are written as they're consumed, so a generator can be used to
+        load more values than would comfortably fit in memory.
+        """
+        expires = self._get_expiry(expires)
+        if hasattr(mapping, "items"):
+            mapping = mapping.items()
+
+        def entries():
+            for key, value in mapping:
+                self._remember(key, expires, value)
+                yield key, (expires, value)
+
+        with self._lock:
+            try:
+                self._write(entries())
+                self._sync()
+            except BaseException:
+                # Whatever was remembered may not have made it to disk
+                self._memory.clear()
+                raise
 
     def clear(self, key=None):
         """
@@ -90,11 +164,14 @@ class LocalCache(object):
         unless you've cached something with an inappropriately long expire time.
         """
         if key:
-            if key in self._db:
-                del self._db[key]
+            try:
+                del self[key]
+            except KeyError:
+                pass
         else:
-            for key in self.keys():
-                del self._db[key]
+            with self._lock:
+                self._memory.clear()
+                self._delete_all()
 
     def expire(self):
         """
@@ -102,14 +179,120 @@ class LocalCache(object):
         happens automatically whenever you call `.get()` so you should never
         really need to run this.
         """
-        for key in self.keys():
-            self.get(key)
+        with self._lock:
+            for key, (expires, _) in list(self._memory.items()):
+                if not self._is_fresh(expires):
+                    del self._memory[key]
+            self._expire()
+
+    def _get_expiry(self, expires):
+        """
+        Turn a number of seconds from now into an expiry time.  No expiry time
+        means the value never expires.
+        """
+        if expires is None:
+            return None
+        return self._now + datetime.timedelta(seconds=expires)
+
+    def _is_fresh(self, expires):
+        return not expires or expires > self._now
 
     @staticmethod
-    def _get_or_create_db_path():
+    def _memory_key(key):
+        if isinstance(key, str):
+            return key.encode()
+        return key
+
+    def _remember(self, key, expires, value):
+        if self.memory_size <= 0:
+            return
+        memory_key = self._memory_key(key)
+        self._memory[memory_key] = (expires, value)
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    # The storage engine
+
+    def keys(self, namespace=None):
+        """
+        Return all of the keys in the cache, or only those of the form
+        "namespace:..." if `namespace` is given.
+        """
+        with self._lock:
+            keys = self._db.keys()
+        if namespace is None:
+            return keys
+        prefix = "{}:".format(namespace).encode()
+        return [key for key in keys if key.startswith(prefix)]
+
+    def items(self):
+        for key in self.keys():
+            yield key, self._db[key]
+
+    def _contains(self, key):
+        return key in self._db
+
+    def _read(self, keys):
+        """
+        Return {key: (expires, value)} for the fresh entries among `keys`,
+        removing the expired ones along the way.
+        """
+        db = self._db
+
+        r = {}
+        expired = []
+        for key in keys:
+            try:
+                expires, value = pickle.loads(db[key])
+            except KeyError:
+                continue
+            if self._is_fresh(expires):
+                r[key] = (expires, value)
+            else:
+                expired.append(key)
+
+        for key in expired:
+            del db[key]
+
+        return r
+
+    def _write(self, entries):
+        """Write (key, (expires, value)) pairs."""
+        db = self._db
+        for key, entry in entries:
+            db[key] = pickle.dumps(entry)
+
+    def _sync(self):
+        """
+        Flush a batch of writes to disk.  Only set_many() does this, as with
+        some dbm implementations (like dbm.dumb) it rewrites the whole index,
+        which would make every single write as slow as the cache is big.
+        """
+        # Not every dbm implementation can be synced explicitly
+        sync = getattr(self._db, "sync", None)
+        if sync is not None:
+            sync()
+
+    def _delete(self, key):
+        if key not in self._db:
+            raise KeyError
+        del self._db[key]
+
+    def _delete_all(self):
+        for key in self.keys():
+            del self._db[key]
+
+    def _expire(self):
+        self._read(self.keys())
+
+    @classmethod
+    def _get_or_create_db_path(cls):
 
         v = sys.version_info
-        file_name = "cache-{}.{}.{}.db".format(v.major, v.minor, v.micro)
+        file_name = "cache-{}.{}.{}.{}".format(
+            v.major, v.minor, v.micro, cls.FILE_EXTENSION
+        )
 
         db_path = os.path.join("/", "tmp", file_name)
         if "HOME" in os.environ:
@@ -123,7 +306,161 @@ class LocalCache(object):
         return db_path
 
 
-cache = LocalCache()
+class SQLiteCache(LocalCache):
+    """
+    A caching engine backed by SQLite in WAL mode.  Keys are indexed along with
+    their namespace (the part before the first ":", as in "probe:1234") and
+    their expiry time, so batch lookups and expiry are single statements
+    rather than a walk over every key.
+
+    Select it with `cache.engine: sqlite` in the configuration file.
+    """
+
+    FILE_EXTENSION = "sqlite3"
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache ("
+        "  key BLOB PRIMARY KEY,"
+        "  namespace TEXT NOT NULL,"
+        "  expires REAL,"
+        "  value BLOB NOT NULL"
+        ")",
+        "CREATE INDEX IF NOT EXISTS cache_namespace ON cache (namespace)",
+        "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+    )
+
+    # SQLite's default limit on the number of host parameters in a statement
+    BATCH_SIZE = 999
+
+    @property
+    def _db(self):
+        if self._db_file is None:
+            self._db_file = sqlite3.connect(
+                self.get_path(), check_same_thread=False
+            )
+            self._db_file.execute("PRAGMA journal_mode=WAL")
+            self._db_file.execute("PRAGMA synchronous=NORMAL")
+            with self._db_file:
+                for statement in self.SCHEMA:
+                    self._db_file.execute(statement)
+        return self._db_file
+
+    @staticmethod
+    def _get_namespace(key):
+        if isinstance(key, str) and ":" in key:
+            return key.split(":", 1)[0]
+        return ""
+
+    @staticmethod
+    def _to_timestamp(expires):
+        if expires is None:
+            return None
+        return expires.timestamp()
+
+    def keys(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                cursor = self._db.execute("SELECT key FROM cache")
+            else:
+                cursor = self._db.execute(
+                    "SELECT key FROM cache WHERE namespace = ?", (namespace,)
+                )
+            return [row[0] for row in cursor]
+
+    def items(self):
+        for key, value in self._db.execute("SELECT key, value FROM cache"):
+            yield key, value
+
+    def _contains(self, key):
+        row = self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self._memory_key(key), self._now.timestamp()),
+        ).fetchone()
+        return row is not None
+
+    def _read(self, keys):
+        keys = {self._memory_key(key): key for key in keys}
+        encoded = list(keys)
+        now = self._now.timestamp()
+
+        r = {}
+        for i in range(0, len(encoded), self.BATCH_SIZE - 1):
+            batch = encoded[i:i + self.BATCH_SIZE - 1]
+            cursor = self._db.execute(
+                "SELECT key, expires, value FROM cache WHERE key IN ({}) "
+                "AND (expires IS NULL OR expires > ?)".format(
+                    ", ".join("?" * len(batch))
+                ),
+                batch + [now],
+            )
+            for key, expires, value in cursor:
+                if expires is not None:
+                    expires = datetime.datetime.fromtimestamp(expires)
+                r[keys[key]] = (expires, pickle.loads(value))
+        return r
+
+    def _write(self, entries):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cache (key, namespace, expires, value) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        self._memory_key(key),
+                        self._get_namespace(key),
+                        self._to_timestamp(expires),
+                        pickle.dumps(value),
+                    )
+                    for key, (expires, value) in entries
+                ),
+            )
+
+    def _sync(self):
+        # Each write is committed in a transaction of its own
+        pass
+
+    def _delete(self, key):
+        with self._db:
+            cursor = self._db.execute(
+                "DELETE FROM cache WHERE key = ?", (self._memory_key(key),)
+            )
+        if not cursor.rowcount:
+            raise KeyError
+
+    def _delete_all(self):
+        with self._db:
+            self._db.execute("DELETE FROM cache")
+
+    def _expire(self):
+        with self._db:
+            self._db.execute(
+                "DELETE FROM cache WHERE expires <= ?", (self._now.timestamp(),)
+            )
+
+
+ENGINES = {
+    "dbm": LocalCache,
+    "sqlite": SQLiteCache,
+}
+
+
+def get_cache(engine=None):
+    """
+    Return a new cache instance for the given engine, or the one selected in
+    the configuration.
+    """
+    engine = engine or conf["cache"]["engine"]
+    try:
+        return ENGINES[engine]()
+    except KeyError:
+        raise RipeAtlasToolsException(
+            'Unknown cache engine "{}". Choose one of: {}'.format(
+                engine, ", ".join(sorted(ENGINES))
+            )
+        )
+
+
+cache = get_cache()
 
 
 class Memoiser(object):
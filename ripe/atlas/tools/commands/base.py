@@ -24,6 +24,7 @@ import platform
 
 from ..helpers.actions import StoreIfNotEmpty
 from ..helpers import xdg
+from ..helpers.manifest import Manifest
 from ..helpers.colours import colourise
 from ..version import __version__
 
@@ -91,15 +92,27 @@ class Command(object):
     @classmethod
     def _load_commands(cls):
         """
-        Scan for available commands and store a map of command names to module
-        paths.
+        Scan for available commands and store a map of their module names to
+        where they can be imported from and the name and description they go
+        by.  Finding those out means importing every command, so we keep them
+        in a Manifest until something in the command directories changes.
         """
         builtin_path = os.path.dirname(__file__)
         user_command_path = cls._get_user_command_path()
 
-        cls._commands = {}
+        if os.path.isdir(user_command_path) and user_command_path not in sys.path:
+            sys.path.append(user_command_path)
 
         paths = [builtin_path, user_command_path]
+        cls._commands = Manifest("commands", paths).get(
+            lambda: cls._build_manifest(paths)
+        )
+
+    @classmethod
+    def _build_manifest(cls, paths):
+        builtin_path = paths[0]
+        commands = {}
+
         for path, package_name in cls._get_packages_for_paths(paths):
             if package_name == "base":
                 continue
@@ -107,14 +120,28 @@ class Command(object):
                 module = "ripe.atlas.tools.commands.{}".format(package_name)
             else:
                 module = package_name
-                if user_command_path not in sys.path:
-                    sys.path.append(user_command_path)
-            cls._commands[package_name] = module
+
+            try:
+                cmd = cls._import_command_class(module)
+            except Exception:
+                # It'll complain for itself if anybody tries to use it
+                name, description = package_name.replace("_", "-"), ""
+            else:
+                name, description = cmd.get_name(), cmd.DESCRIPTION
+
+            commands[package_name] = {
+                "module": module,
+                "name": name,
+                "description": description,
+            }
+
+        return commands
 
     @classmethod
     def load_command_class(cls, command_name):
         """
-        Get the Command or Factory with the given command name.
+        Get the Command or Factory with the given command name.  That's the
+        only command module that gets imported.
         """
         if command_name in cls.DEPRECATED_ALIASES:
             alias = command_name
@@ -129,14 +156,15 @@ class Command(object):
                 )
             )
 
-        if cls._commands is None:
-            cls._load_commands()
-
         try:
-            module_name = cls._commands[command_name.replace("-", "_")]
+            module_name = cls.get_manifest()[command_name.replace("-", "_")]["module"]
         except KeyError:
             return
 
+        return cls._import_command_class(module_name)
+
+    @staticmethod
+    def _import_command_class(module_name):
         module = importlib.import_module(module_name)
 
         if hasattr(module, "Factory"):
@@ -146,6 +174,17 @@ class Command(object):
 
         return cmd
 
+    @classmethod
+    def get_manifest(cls):
+        """
+        Return a dict of what we know about each of the available commands
+        (see _load_commands()), by module name, without importing any of them.
+        """
+        if not cls._commands:
+            cls._load_commands()
+
+        return cls._commands
+
     @classmethod
     def get_available_commands(cls):
         """
@@ -155,10 +194,7 @@ class Command(object):
         ~/.config/ripe-atlas-tools/commands/.  If we find any files there, we
         add them to the list here.
         """
-        if not cls._commands:
-            cls._load_commands()
-
-        return sorted(cls._commands.keys())
+        return sorted(cls.get_manifest().keys())
 
     def init_args(self, args=None):
         """
@@ -0,0 +1,194 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import sys
+
+from ripe.atlas.cousteau import Probe as CProbe
+
+from ..cache import cache
+from ..exceptions import RipeAtlasToolsException
+from ..filters import Probe
+from ..helpers.json_array import iter_json_values
+from ..helpers.validators import ArgumentType
+from .base import Command as BaseCommand
+
+
+class Command(BaseCommand):
+
+    NAME = "probe-cache"
+
+    DESCRIPTION = "Import or export the probe information in the local cache"
+    EXTRA_DESCRIPTION = (
+        "Importing a snapshot of all probes lets `ripe-atlas report` run "
+        "without asking the API about every probe it comes across, or "
+        "without network access at all.\n\n"
+        "Examples:\n"
+        "  ripe-atlas probe-cache import probes.json\n"
+        "  bzcat 20260101.json.bz2 | ripe-atlas probe-cache import --never-expire\n"
+        "  ripe-atlas probe-cache export probes.jsonl\n"
+    )
+
+    # The number of cached probes to read at once when exporting
+    EXPORT_BATCH_SIZE = 1000
+
+    def add_arguments(self):
+        subparsers = self.parser.add_subparsers(
+            title="action",
+            dest="action",
+            help="Action to be performed on the probe cache. "
+            "Run 'ripe-atlas probe-cache <action> --help' for more details.",
+        )
+
+        import_parser = subparsers.add_parser(
+            "import",
+            help="Load probes from a JSON list, JSON lines or a probe archive "
+            "into the cache.",
+        )
+        import_parser.add_argument(
+            "file",
+            action="store",
+            type=ArgumentType.path,
+            nargs="?",
+            default="-",
+            help="The file to read probes from, or - for standard input "
+            "(the default).",
+        )
+        import_parser.add_argument(
+            "--never-expire",
+            action="store_true",
+            help="Keep the imported probes until they're replaced, rather than "
+            "for the usual {} days.".format(Probe.EXPIRE_TIME // (60 * 60 * 24)),
+        )
+
+        export_parser = subparsers.add_parser(
+            "export", help="Write the cached probes out as JSON lines."
+        )
+        export_parser.add_argument(
+            "file",
+            action="store",
+            nargs="?",
+            default="-",
+            help="The file to write probes to, or - for standard output "
+            "(the default).",
+        )
+
+    def run(self):
+
+        if not self.arguments.action:
+            raise RipeAtlasToolsException(
+                "Action not given. Use --help for more information."
+            )
+
+        if self.arguments.action == "import":
+            count = self._import()
+            self.ok("Imported {} probes into the local cache.".format(count))
+
+        elif self.arguments.action == "export":
+            if self.arguments.file == "-":
+                self._export(sys.stdout)
+            else:
+                with open(self.arguments.file, "w") as f:
+                    count = self._export(f)
+                self.ok("Exported {} probes to {}.".format(count, self.arguments.file))
+
+    def _import(self):
+        """
+        Stream the probes into the cache in a single batch, so that however
+        many there are, only the one being written is held in memory.
+        """
+        expires = None if self.arguments.never_expire else Probe.EXPIRE_TIME
+
+        if self.arguments.file == "-":
+            return self._import_from(sys.stdin, expires)
+        with open(self.arguments.file) as f:
+            return self._import_from(f, expires)
+
+    def _import_from(self, f, expires):
+        count = 0
+
+        def probes():
+            nonlocal count
+            for meta_data in self._get_probe_data(iter_json_values(f)):
+                meta_data = self._from_archive(meta_data)
+                count += 1
+                yield "probe:{}".format(meta_data["id"]), CProbe(
+                    id=meta_data["id"], meta_data=meta_data
+                )
+
+        cache.set_many(probes(), expires)
+
+        return count
+
+    @staticmethod
+    def _get_probe_data(values):
+        """
+        Yield probe dicts from `values`, unwrapping the pages of the API and
+        the probe archive ({"objects": [...]}) along the way.
+        """
+        for value in values:
+            if not isinstance(value, dict):
+                raise RipeAtlasToolsException(
+                    "Probes must be given as JSON objects, not {}.".format(
+                        json.dumps(value)[:40]
+                    )
+                )
+            if "id" in value:
+                yield value
+                continue
+            for key in ("objects", "results"):
+                if isinstance(value.get(key), list):
+                    for meta_data in Command._get_probe_data(value[key]):
+                        yield meta_data
+                    break
+            else:
+                raise RipeAtlasToolsException(
+                    "Found a probe without an id: {}".format(json.dumps(value)[:40])
+                )
+
+    @staticmethod
+    def _from_archive(meta_data):
+        """
+        The probe archive has the status as a plain id, with its name and
+        since beside it, and tags as plain slugs, where the API (and so
+        everything that reads probes from the cache) has objects for both.
+        """
+        status = meta_data.get("status")
+        if status is not None and not isinstance(status, dict):
+            meta_data = dict(meta_data)
+            meta_data["status"] = {
+                "id": status,
+                "name": meta_data.pop("status_name", None),
+                "since": meta_data.pop("status_since", None),
+            }
+        tags = meta_data.get("tags")
+        if tags and any(isinstance(tag, str) for tag in tags):
+            meta_data = dict(meta_data)
+            meta_data["tags"] = [
+                {"name": tag, "slug": tag} if isinstance(tag, str) else tag
+                for tag in tags
+            ]
+        return meta_data
+
+    def _export(self, f):
+        keys = cache.keys("probe")
+        count = 0
+        for i in range(0, len(keys), self.EXPORT_BATCH_SIZE):
+            batch = cache.get_many(keys[i:i + self.EXPORT_BATCH_SIZE])
+            for probe in batch.values():
+                f.write(json.dumps(probe.meta_data, separators=(",", ":")))
+                f.write("\n")
+                count += 1
+        return count
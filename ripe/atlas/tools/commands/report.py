@@ -13,25 +13,30 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import datetime
+import itertools
 import os
 import sys
-
-try:
-    import ujson as json
-except ImportError:
-    import json
-import itertools
+import time
 
 from ripe.atlas.sagan import Result
 from ripe.atlas.cousteau import AtlasLatestRequest, AtlasResultsRequest
 
-from ..aggregators import RangeKeyAggregator, ValueKeyAggregator, aggregate
+from ..aggregators import (
+    OnlineAggregate,
+    RangeKeyAggregator,
+    ValueKeyAggregator,
+    aggregate,
+)
 from ..exceptions import RipeAtlasToolsException
+from ..helpers.json_array import iter_json_array
 from ..helpers.validators import ArgumentType
 from ..renderers import Renderer
 from .base import Command as BaseCommand
-from ..filters import SaganSet, FilterFactory, filter_results
+from ..filters import SaganSet, FilterFactory, filter_raw, iter_filtered
+from ..paging import PagedResults, get_datetime, get_error_message, get_timestamp
 from ..settings import conf
+from ..store import ResultsStore
 
 
 class Command(BaseCommand):
@@ -101,7 +106,30 @@ class Command(BaseCommand):
             action="append",
             help="Tell the rendering engine to aggregate the results by the "
             "selected option. Note that if you opt for aggregation, no "
-            "output will be generated until all results are received.",
+            "output will be generated until all results are received, "
+            "unless you use --summary.",
+        )
+        self.parser.add_argument(
+            "--rtt-median-ranges",
+            type=ArgumentType.comma_separated_numbers(minimum=0),
+            help="The RTT ranges (in ms) to use with --aggregate-by rtt-median, "
+            "as a list of comma-separated numbers. Defaults to {}.".format(
+                ",".join(str(_) for _ in self.AGGREGATORS["rtt-median"][2])
+            ),
+        )
+        self.parser.add_argument(
+            "--summary",
+            action="store_true",
+            help="Rather than rendering every result, print statistics (loss "
+            "and RTTs) for each bucket of --aggregate-by, or for all results "
+            "if there isn't one. Only the statistics are kept in memory, so "
+            "this works for any number of results.",
+        )
+        self.parser.add_argument(
+            "--summary-interval",
+            type=ArgumentType.integer_range(minimum=1),
+            help="With --summary, also print the statistics so far every this "
+            "many seconds.",
         )
         self.parser.add_argument(
             "--probe-asns",
@@ -115,12 +143,38 @@ class Command(BaseCommand):
         self.parser.add_argument(
             "--start-time",
             type=ArgumentType.datetime,
-            help="The start time of the report.",
+            help="The start time of the report. For --from-file or standard "
+            "input, earlier results are skipped.",
         )
         self.parser.add_argument(
             "--stop-time",
             type=ArgumentType.datetime,
-            help="The stop time of the report.",
+            help="The stop time of the report. For --from-file or standard "
+            "input, later results are skipped.",
+        )
+        self.parser.add_argument(
+            "--type",
+            type=str,
+            choices=("ping", "traceroute", "dns", "sslcert", "ntp", "http"),
+            help="Only report on results of this measurement type, skipping "
+            "any others.",
+        )
+        self.parser.add_argument(
+            "--slice-hours",
+            type=ArgumentType.integer_range(minimum=1),
+            help="Fetch the results from --start-time to --stop-time (or now) "
+            "this many hours at a time, a few slices at once, so that output "
+            "starts right away and memory use stays flat however many results "
+            "there are.",
+        )
+        self.parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Keep the results of this measurement in a local store, "
+            "fetching only those that are newer than the ones stored (or that "
+            "fall outside of them, with --start-time).  Without --start-time, "
+            "report on the new results only.  Once a measurement has been "
+            "synced, reports with --start-time read from the store too.",
         )
         self.parser.add_argument(
             "--lookback-days",
@@ -135,6 +189,13 @@ class Command(BaseCommand):
             help="The source of the data to be rendered. "
             "(Conflicts with specifying measurement_id)",
         )
+        self.parser.add_argument(
+            "--jobs",
+            type=ArgumentType.integer_range(minimum=1),
+            default=1,
+            help="The number of processes to parse results with. Worth raising "
+            "for large numbers of results on multi-core machines. Defaults to 1.",
+        )
 
         Renderer.add_arguments_for_available_renderers(self.parser)
 
@@ -175,7 +236,17 @@ class Command(BaseCommand):
             )
 
         if self.arguments.measurement_id:
-            results, sample = self._get_results_from_api(self.arguments.measurement_id)
+            if self._use_store():
+                results, sample = self._get_results_from_store()
+            elif self.arguments.slice_hours:
+                results, sample = self._get_results_in_slices()
+            else:
+                results, sample = self._get_results_from_api(
+                    self.arguments.measurement_id
+                )
+            # The API can't skip other types for us
+            if self.arguments.type:
+                results = self._get_any(filter_raw(results, kind=self.arguments.type))
             use_regular_file = False
         else:
             if self.arguments.from_file:
@@ -187,10 +258,13 @@ class Command(BaseCommand):
                 use_regular_file = False
 
             results, sample = self._get_results_from_file(use_regular_file)
+            results = self._filter_raw_results(results)
 
         # Sagan calls measurements "ssl" when they are actually "sslcert"
         # so we use .raw_data once we have verified and parsed the sample.
-        measurement_type = Result.get(sample).raw_data["type"].lower()
+        measurement_type = (
+            self.arguments.type or Result.get(sample).raw_data["type"].lower()
+        )
 
         renderer = Renderer.get_renderer(self.arguments.renderer, measurement_type)(
             arguments=self.arguments
@@ -199,22 +273,47 @@ class Command(BaseCommand):
         results = SaganSet(
             iterable=results,
             probes=self.arguments.probes,
+            jobs=self.arguments.jobs,
         )
 
         if self.arguments.probe_asns:
-            asn_filters = set([])
-            for asn in self.arguments.probe_asns:
-                asn_filters.add(FilterFactory.create("asn", asn))
-            results = filter_results(asn_filters, list(results))
+            asn_filters = [
+                FilterFactory.create("asn", asn) for asn in self.arguments.probe_asns
+            ]
+            results = iter_filtered(asn_filters, results)
 
-        if self.arguments.aggregate_by:
-            results = aggregate(results, self.get_aggregators())
+        if self.arguments.summary:
+            self.summarise(results)
+        else:
+            if self.arguments.aggregate_by:
+                results = aggregate(results, self.get_aggregators())
 
-        renderer.render(results)
+            renderer.render(results)
 
         if use_regular_file:
             self.file.close()
 
+    def _use_store(self):
+        """
+        Always go through the store with --sync.  Otherwise only read from it
+        when it already has the whole window, as filling in the gaps would
+        mean fetching (and storing) them for every probe, rather than just
+        the ones asked for.
+        """
+        if self.arguments.sync:
+            return True
+        if not self.arguments.start_time:
+            return False
+
+        start = get_timestamp(self.arguments.start_time)
+        if self.arguments.stop_time:
+            stop = get_timestamp(self.arguments.stop_time)
+        else:
+            stop = int(time.time())
+
+        pieces = ResultsStore(self.arguments.measurement_id).get_pieces(start, stop)
+        return all(covered for _, _, covered in pieces)
+
     def _get_results_from_api(self, measurement_id):
 
         results = self._get_request().get()[1]
@@ -224,16 +323,86 @@ class Command(BaseCommand):
                     "There aren't any results for your request."
                 )
         else:
-            error = results.get("error")
-            msg = "Error fetching measurement results"
-            if error:
-                msg += ": [{status} {title}] {detail}".format(**error)
-            else:
-                msg = "{} Error fetching measurement results".format(error)
-            raise RipeAtlasToolsException(msg)
+            raise RipeAtlasToolsException(get_error_message(results))
         sample = results[0]
         return results, sample
 
+    def _get_results_in_slices(self):
+        """
+        Rather than waiting on one enormous response, fetch --slice-hours of
+        results at a time, and start on the first slice while the following
+        ones are still coming in.
+        """
+        if not self.arguments.start_time:
+            raise RipeAtlasToolsException("--slice-hours needs a --start-time.")
+
+        stop = self.arguments.stop_time
+        if not stop:
+            stop = datetime.datetime.now(datetime.timezone.utc)
+
+        results = PagedResults(
+            self.arguments.start_time,
+            stop,
+            self.arguments.slice_hours * 60 * 60,
+            probe_ids=self.arguments.probes,
+            **self._get_paging_kwargs()
+        )
+
+        return self._get_sample(iter(results))
+
+    def _get_results_from_store(self):
+        """
+        Read what we can from the local results store, and only fetch (and
+        store) the parts of the window it doesn't have yet.  Without a
+        --start-time, that's everything since the last time.
+        """
+        store = ResultsStore(self.arguments.measurement_id)
+
+        if self.arguments.start_time:
+            start = get_timestamp(self.arguments.start_time)
+        else:
+            last_stop = store.get_last_stop()
+            if last_stop is None:
+                raise RipeAtlasToolsException(
+                    "There aren't any results stored for this measurement yet, "
+                    "so --sync needs a --start-time to begin from."
+                )
+            start = last_stop + 1
+
+        if self.arguments.stop_time:
+            stop = get_timestamp(self.arguments.stop_time)
+        else:
+            stop = int(time.time())
+
+        slice_size = (self.arguments.slice_hours or 24) * 60 * 60
+
+        # Everything we fetch is stored, so we can't leave out other probes
+        def fetch(start, stop):
+            return PagedResults(
+                get_datetime(start),
+                get_datetime(stop),
+                slice_size,
+                **self._get_paging_kwargs()
+            ).iter_slices()
+
+        return self._get_sample(iter(store.get_results(start, stop, fetch)))
+
+    def _get_paging_kwargs(self):
+        return {
+            "server": conf["api-server"],
+            "msm_id": self.arguments.measurement_id,
+            "user_agent": self.user_agent,
+            "key": self._get_request_auth(),
+        }
+
+    @staticmethod
+    def _get_sample(results):
+        sample = next(results, None)
+        if sample is None:
+            raise RipeAtlasToolsException("There aren't any results for your request.")
+
+        return itertools.chain([sample], results), sample
+
     def _get_results_from_file(self, using_regular_file):
         """
         We need to get the first result from the source in order to detect the
@@ -246,21 +415,81 @@ class Command(BaseCommand):
         if using_regular_file:
             self.file = open(self.arguments.from_file)
 
-        # Pop the first line off the source stack.  This may very well be a Very
-        # Large String and cause a memory explosion, but we like to let our
-        # users shoot themselves in the foot.
-        sample = next(self.file)
+        # Peek at the first character rather than popping the first line off
+        # the source, as that line may very well be a Very Large String.
+        head = self.file.read(1)
+        while head.isspace():
+            head = self.file.read(1)
+
+        if head == "[":
+            # In the case of the Very Large String, we parse out the results
+            # one by one as we go
+            results = iter_json_array(self.file)
+            sample = next(results, None)
+        else:
+            sample = (head + self.file.readline()) or None
+            results = self.file
 
-        # Re-attach the line back onto the iterable so we don't lose anything
-        results = itertools.chain([sample], self.file)
+        if sample is None:
+            raise RipeAtlasToolsException("There aren't any results for your request.")
 
-        # In the case of the Very Large String, we parse out the JSON here
-        if sample.startswith("["):
-            results = json.loads("".join(results))
-            sample = results[0]  # Reassign sample to an actual result
+        # Re-attach the sample back onto the iterable so we don't lose anything
+        results = itertools.chain([sample], results)
 
         return results, sample
 
+    def _filter_raw_results(self, results):
+        """
+        The API takes care of --start-time and --stop-time for us, but a file
+        could hold anything, so we skip what's out of bounds (or of another
+        --type) before going to the trouble of parsing it.
+        """
+        start, stop = self.arguments.start_time, self.arguments.stop_time
+        if not (start or stop or self.arguments.type):
+            return results
+        return self._get_any(
+            filter_raw(
+                results,
+                start=get_timestamp(start) if start else None,
+                stop=get_timestamp(stop) if stop else None,
+                kind=self.arguments.type,
+            )
+        )
+
+    @staticmethod
+    def _get_any(results):
+        """
+        Return `results` as long as our own filtering has left any of them,
+        so that skipping everything fails as an empty response does, rather
+        than quietly rendering nothing.
+        """
+        results = iter(results)
+        first = next(results, None)
+        if first is None:
+            raise RipeAtlasToolsException("There aren't any results for your request.")
+        return itertools.chain([first], results)
+
+    def summarise(self, results):
+        """
+        Keep running statistics per bucket as the results come in, printing
+        them at the end and, if asked, every --summary-interval seconds.
+        """
+        aggregators = self.get_aggregators() if self.arguments.aggregate_by else []
+        summary = OnlineAggregate(aggregators)
+        interval = self.arguments.summary_interval
+
+        flushed = time.monotonic()
+        for result in results:
+            summary.add(result)
+            if interval and time.monotonic() - flushed >= interval:
+                print(summary.render())
+                flushed = time.monotonic()
+
+        if not summary.buckets:
+            raise RipeAtlasToolsException("There aren't any results to summarise.")
+
+        print(summary.render(), end="")
+
     def get_aggregators(self):
         """Return aggregators list based on user input"""
         aggregation_keys = []
@@ -270,7 +499,9 @@ class Command(BaseCommand):
             key = self.AGGREGATORS[aggr_key][0]
             if aggr_key == "rtt-median":
                 # Get range for the aggregation
-                key_range = self.AGGREGATORS[aggr_key][2]
+                key_range = (
+                    self.arguments.rtt_median_ranges or self.AGGREGATORS[aggr_key][2]
+                )
                 aggregation_keys.append(aggregation_class(key=key, ranges=key_range))
             else:
                 aggregation_keys.append(aggregation_class(key=key))
@@ -12,6 +12,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import collections
+import copy
+import itertools
+import operator
+import re
+
 from ripe.atlas.sagan import Result
 from ripe.atlas.sagan import ResultParseError
 from ripe.atlas.cousteau import ProbeRequest
@@ -28,6 +35,8 @@ class FilterFactory(object):
         """Create new filter class based on the key"""
         if key == "asn":
             return ASNFilter(value)
+        elif key == "tags":
+            return TagFilter(value)
         else:
             return Filter(key, value)
 
@@ -37,11 +46,16 @@ class Filter(object):
     Class that represents filter for results. For now supports only attributes
     of probes property of Result property. It could be extended for any property
     of Result easily.
+
+    Filters on the same key can be merged with union(), in which case a result
+    matches if its value is any one of the filters' values.
     """
 
     def __init__(self, key, value):
         self.key = key
         self.value = value
+        self.values = frozenset([value])
+        self.get_value = operator.attrgetter("probe.{}".format(key))
 
     def filter(self, result):
         """
@@ -49,16 +63,25 @@ class Filter(object):
         pile of results.
         """
         try:
-            attr_value = getattr(result.probe, self.key)
+            attr_value = self.get_value(result)
         except AttributeError:
             log = (
                 "Cousteau's Probe class does not have an attribute " "called: <{}>"
             ).format(self.key)
             raise RipeAtlasToolsException(log)
-        if attr_value == self.value:
-            return True
+        try:
+            return attr_value in self.values
+        except TypeError:  # Unhashable, like a list, so it can't be a match
+            return False
 
-        return False
+    def union(self, other):
+        """
+        Return a filter that lets through what either this filter or `other`
+        (a filter of the same class and key) does.
+        """
+        merged = copy.copy(self)
+        merged.values = self.values | other.values
+        return merged
 
 
 class ASNFilter(Filter):
@@ -67,42 +90,215 @@ class ASNFilter(Filter):
     def __init__(self, value):
         key = "asn"
         super(ASNFilter, self).__init__(key, value)
+        self.get_value = operator.attrgetter("probe.asn_v4", "probe.asn_v6")
 
     def filter(self, result):
-        asn_v4 = getattr(result.probe, "asn_v4")
-        asn_v6 = getattr(result.probe, "asn_v6")
-        if self.value in (asn_v4, asn_v6):
-            return True
+        return not self.values.isdisjoint(self.get_value(result))
+
+
+class TagFilter(Filter):
+    """Class that represents filter by probes that have the given tag (slug)."""
+
+    def __init__(self, value):
+        super(TagFilter, self).__init__("tags", value)
 
+    def filter(self, result):
+        tags = self.get_value(result) or ()
+        for tag in tags:
+            if tag.get("slug") in self.values:
+                return True
         return False
 
 
-def filter_results(filters, results):
-    """docstring for filter"""
-    new_results = []
-    for result in results:
-        for rfilter in filters:
+class AnyFilter(object):
+    """
+    Lets through the results that any of `filters` lets through (OR).  Filters
+    of the same class and key are merged, so that asking for twenty ASNs costs
+    a single set lookup per result rather than twenty comparisons.
+    """
+
+    def __init__(self, filters):
+        merged = collections.OrderedDict()
+        for i, rfilter in enumerate(filters):
+            if isinstance(rfilter, Filter):
+                key = (rfilter.__class__, rfilter.key)
+            else:
+                key = i  # A composite, which we can't merge
+            if key in merged:
+                merged[key] = merged[key].union(rfilter)
+            else:
+                merged[key] = rfilter
+        self.filters = list(merged.values())
+        if len(self.filters) == 1:
+            self.filter = self.filters[0].filter
+
+    def filter(self, result):
+        for rfilter in self.filters:
             if rfilter.filter(result):
-                new_results.append(result)
-                break
+                return True
+        return False
+
+
+class AllFilter(object):
+    """Lets through the results that all of `filters` let through (AND)."""
+
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+    def filter(self, result):
+        for rfilter in self.filters:
+            if not rfilter.filter(result):
+                return False
+        return True
+
+
+def iter_filtered(filters, results):
+    """
+    Lazily yield the results that any of `filters` lets through, so that
+    filtering a stream keeps it a stream.
+    """
+    return filter(AnyFilter(filters).filter, results)
+
+
+def filter_results(filters, results):
+    """
+    Return a list of the results that any of `filters` lets through.  See
+    iter_filtered() for a version that doesn't hold on to them.
+    """
+    return list(iter_filtered(filters, results))
+
 
-    return new_results
+RAW_FIELDS = {
+    "prb_id": (re.compile(r'"prb_id"\s*:\s*(\d+)'), int),
+    "timestamp": (re.compile(r'"timestamp"\s*:\s*(\d+)'), int),
+    "type": (re.compile(r'"type"\s*:\s*"(\w+)"'), str),
+}
+
+
+def get_raw_value(line, key):
+    """
+    Cheaply find the value of one of RAW_FIELDS in a raw result (a JSON string
+    or dictionary) without parsing the rest of it.  Returns None if it can't
+    be found, in which case only sagan can tell.
+    """
+    if isinstance(line, dict):
+        return line.get(key)
+    pattern, cast = RAW_FIELDS[key]
+    match = pattern.search(line)
+    if match:
+        return cast(match.group(1))
+    return None
+
+
+def get_probe_id(line):
+    return get_raw_value(line, "prb_id")
+
+
+def filter_raw(lines, start=None, stop=None, kind=None):
+    """
+    Lazily yield the raw results timestamped between `start` and `stop` (Unix
+    times, both inclusive) and of measurement type `kind`, judging by the raw
+    text alone.  Lines we can't judge that way are passed on for sagan to
+    make sense of.
+    """
+    for line in lines:
+        if start is not None or stop is not None:
+            timestamp = get_raw_value(line, "timestamp")
+            if timestamp is not None:
+                if start is not None and timestamp < start:
+                    continue
+                if stop is not None and timestamp > stop:
+                    continue
+        if kind is not None:
+            measurement_type = get_raw_value(line, "type")
+            if measurement_type is not None and measurement_type != kind:
+                continue
+        yield line
+
+
+def parse_results(lines, probes=()):
+    """
+    Parse raw results (JSON strings or dictionaries) into sagan results,
+    dropping garbage and, if `probes` is given, results from other probes.
+    The latter are skipped before parsing wherever we can tell them apart.
+    """
+    sagans = []
+    for line in lines:
+        if probes:
+            probe_id = get_probe_id(line)
+            if probe_id is not None and probe_id not in probes:
+                continue
+        try:
+            sagan = Result.get(
+                line,
+                on_error=Result.ACTION_IGNORE,
+                on_warning=Result.ACTION_IGNORE,
+            )
+        except ResultParseError:
+            continue  # Probably garbage in the file
+        if not probes or sagan.probe_id in probes:
+            sagans.append(sagan)
+    return sagans
 
 
 class SaganSet(object):
     """
     An iterable of sagan results with attached probe information that allows
     for filtering by the filters module.
+
+    With `jobs` > 1, raw results are parsed in chunks on a pool of that many
+    processes, while still being yielded in their original order.
+
+    Probe information is looked up in batches on a background thread, so that
+    the probes of one batch are fetched while the next one is being parsed.
+    Batches start at PROBE_BATCH_SIZE results and grow whenever we have to
+    wait on a lookup, up to PROBE_BATCH_SIZE_MAX, so that a cold cache costs
+    fewer round trips to the API while a warm one still gets output going
+    quickly.
     """
 
-    def __init__(self, iterable=None, probes=()):
-        self._probes = probes
+    PROBE_BATCH_SIZE = 100
+    PROBE_BATCH_SIZE_MAX = 1000
+    PARSE_CHUNK_SIZE = 500
+
+    def __init__(self, iterable=None, probes=(), jobs=1):
+        self._probes = frozenset(probes or ())
         self._iterable = iterable
+        self._jobs = jobs
 
     def __iter__(self):
 
+        batch_size = self.PROBE_BATCH_SIZE
         sagans = []
 
+        with ThreadPoolExecutor(max_workers=1) as executor:
+
+            pending = collections.deque()
+            for sagan in self._parse(self._get_lines()):
+                sagans.append(sagan)
+                if len(sagans) < batch_size:
+                    continue
+
+                pending.append(self._fetch_probes(executor, sagans))
+                sagans = []
+
+                # The previous batch had this one's parsing time to fetch its
+                # probes.  If that wasn't enough, use larger batches.
+                if len(pending) > 1:
+                    batch, future = pending.popleft()
+                    if not future.done():
+                        batch_size = min(batch_size * 2, self.PROBE_BATCH_SIZE_MAX)
+                    for sagan in self._attach_probes(batch, future):
+                        yield sagan
+
+            if sagans:
+                pending.append(self._fetch_probes(executor, sagans))
+
+            while pending:
+                for sagan in self._attach_probes(*pending.popleft()):
+                    yield sagan
+
+    def _get_lines(self):
         for line in self._iterable:
 
             # line may be a dictionary (parsed JSON)
@@ -113,23 +309,31 @@ class SaganSet(object):
             if not line:
                 break
 
-            try:
-                sagan = Result.get(
-                    line,
-                    on_error=Result.ACTION_IGNORE,
-                    on_warning=Result.ACTION_IGNORE,
-                )
-                if not self._probes or sagan.probe_id in self._probes:
-                    sagans.append(sagan)
-                if len(sagans) > 100:
-                    for sagan in self._attach_probes(sagans):
-                        yield sagan
-                    sagans = []
-            except ResultParseError:
-                pass  # Probably garbage in the file
+            yield line
 
-        for sagan in self._attach_probes(sagans):
-            yield sagan
+    def _parse(self, lines):
+        if self._jobs <= 1:
+            for line in lines:
+                for sagan in parse_results([line], self._probes):
+                    yield sagan
+            return
+
+        chunks = iter(
+            lambda: list(itertools.islice(lines, self.PARSE_CHUNK_SIZE)), []
+        )
+
+        # Keep a couple of chunks per process in flight, so that the workers
+        # are never idle but we don't read the whole input ahead either.
+        with ProcessPoolExecutor(max_workers=self._jobs) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(parse_results, chunk, self._probes))
+                if len(pending) >= 2 * self._jobs:
+                    for sagan in pending.popleft().result():
+                        yield sagan
+            while pending:
+                for sagan in pending.popleft().result():
+                    yield sagan
 
     def __next__(self):
         return iter(self).next()
@@ -137,15 +341,14 @@ class SaganSet(object):
     def next(self):
         return self.__next__()
 
-    def _attach_probes(self, sagans):
-        probes = dict(
-            [
-                (p.id, p)
-                for p in Probe.get_many(
-                    (s.probe_id for s in sagans)
-                )
-            ]
-        )
+    @staticmethod
+    def _fetch_probes(executor, sagans):
+        ids = {sagan.probe_id for sagan in sagans}
+        return sagans, executor.submit(Probe.get_many, ids)
+
+    @staticmethod
+    def _attach_probes(sagans, future):
+        probes = {probe.id: probe for probe in future.result()}
         for sagan in sagans:
             sagan.probe = probes[sagan.probe_id]
             yield sagan
@@ -181,20 +384,20 @@ class Probe(object):
         cached for future use.
         """
 
-        r = []
+        keys = {"probe:{}".format(pk): pk for pk in ids}
+        cached = cache.get_many(keys)
 
-        fetch_ids = []
-        for pk in ids:
-            probe = cache.get("probe:{}".format(pk))
-            if probe:
-                r.append(probe)
-            else:
-                fetch_ids.append(str(pk))
+        r = list(cached.values())
+
+        fetch_ids = [str(pk) for key, pk in keys.items() if key not in cached]
 
         if fetch_ids:
             kwargs = {"id__in": fetch_ids, "server": conf["api-server"]}
-            for probe in [p for p in ProbeRequest(return_objects=True, **kwargs)]:
-                cache.set("probe:{}".format(probe.id), probe, cls.EXPIRE_TIME)
-                r.append(probe)
+            fetched = {
+                "probe:{}".format(probe.id): probe
+                for probe in ProbeRequest(return_objects=True, **kwargs)
+            }
+            cache.set_many(fetched, cls.EXPIRE_TIME)
+            r.extend(fetched.values())
 
         return r
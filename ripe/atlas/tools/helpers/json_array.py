@@ -0,0 +1,204 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from ..exceptions import RipeAtlasToolsException
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\r\n"
+
+# What may follow a value, so that a value followed by anything else (like "1"
+# in "1.5" cut off after the "1.") may continue in the next chunk
+DELIMITERS = WHITESPACE + ",:]}"
+
+
+class _Reader(object):
+    """
+    A window onto the file-like object `f`, read `chunk_size` characters at a
+    time, that JSON values can be decoded from one after another.
+    """
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def refill(self, size):
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def peek(self):
+        """
+        Skip any whitespace and return the next character, or "" if there
+        isn't one.
+        """
+        while True:
+            buffer, position = self.buffer, self.position
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            self.position = position
+            if position < len(buffer):
+                return buffer[position]
+            if self.eof:
+                return ""
+            self.refill(self.chunk_size)
+
+    def decode(self, error):
+        """Decode the next value, raising `error` if there isn't a valid one."""
+        if not self.peek():
+            raise RipeAtlasToolsException(error)
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                if self.is_complete(end) or self.eof:
+                    break
+            except ValueError:
+                if self.eof:
+                    raise RipeAtlasToolsException(error)
+            # Grow the reads with the value so that huge values don't get
+            # decoded over and over again
+            self.refill(max(self.chunk_size, len(self.buffer) - self.position))
+        self.position = end
+        return value
+
+    def decode_buffered(self):
+        """
+        Decode the next value if it's all in the buffer already, returning
+        whether that worked and the value.
+        """
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.position)
+        except ValueError:
+            return False, None
+        if not self.is_complete(end):
+            return False, None
+        self.position = end
+        return True, value
+
+    def is_complete(self, end):
+        """
+        Whether a value decoded up to `end` can't go on in the next chunk.
+        """
+        if end < len(self.buffer):
+            return self.buffer[end] in DELIMITERS
+        return self.eof
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Parse a JSON array from the file-like object `f` incrementally, yielding
+    its elements one at a time.  `f` must be positioned just after the
+    opening "[".
+
+    Only the element being decoded and at most one chunk of input are held in
+    memory at any time, so the size of the array doesn't matter.
+    """
+    return _iter_array(_Reader(f, chunk_size))
+
+
+def _iter_array(reader):
+    if reader.peek() == "]":
+        reader.position += 1
+        return
+
+    while True:
+        yield reader.decode("The JSON results list could not be parsed.")
+
+        char = reader.peek()
+        if not char:
+            raise RipeAtlasToolsException("The JSON results list is incomplete.")
+        reader.position += 1
+        if char == "]":
+            return
+        if char != ",":
+            raise RipeAtlasToolsException("The JSON results list could not be parsed.")
+        if not reader.peek():
+            raise RipeAtlasToolsException("The JSON results list is incomplete.")
+
+
+def iter_json_values(f, chunk_size=CHUNK_SIZE, unwrap=("objects", "results")):
+    """
+    Yield the decoded values of `f`, which may hold one big JSON array, one
+    JSON value per line, or an object with the values in an array under one
+    of the `unwrap` keys (like {"objects": [...]}, the probe archive), however
+    it's laid out.  The other members of such an object are dropped.  Either
+    way, only one value at a time is held in memory.
+    """
+    reader = _Reader(f, chunk_size)
+    if reader.peek() == "[":
+        reader.position += 1
+        yield from _iter_array(reader)
+
+    while True:
+        char = reader.peek()
+        if not char:
+            return
+        if char == "{":
+            # Only objects bigger than a chunk, like a whole probe archive, are
+            # worth picking apart as they're read
+            decoded, value = reader.decode_buffered()
+            if not decoded:
+                yield from _iter_object(reader, unwrap)
+                continue
+            for key in unwrap:
+                if isinstance(value.get(key), list):
+                    yield from value[key]
+                    break
+            else:
+                yield value
+        else:
+            yield reader.decode("The JSON values could not be parsed.")
+
+
+def _iter_object(reader, unwrap):
+    """
+    Yield the elements of the array under any of the `unwrap` keys of the
+    object the reader is at, or the object itself if there's no such array.
+    """
+    error = "The JSON values could not be parsed."
+    reader.position += 1
+    members = {}
+    unwrapped = False
+
+    char = reader.peek()
+    while char != "}":
+        key = reader.decode(error)
+        if not isinstance(key, str) or reader.peek() != ":":
+            raise RipeAtlasToolsException(error)
+        reader.position += 1
+        if key in unwrap and reader.peek() == "[":
+            reader.position += 1
+            yield from _iter_array(reader)
+            unwrapped = True
+        else:
+            members[key] = reader.decode(error)
+
+        char = reader.peek()
+        if char == ",":
+            reader.position += 1
+        elif char != "}":
+            raise RipeAtlasToolsException(error)
+    reader.position += 1
+
+    if not unwrapped:
+        yield members
@@ -0,0 +1,79 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+
+from ..version import __version__
+from . import xdg
+
+
+class Manifest(object):
+    """
+    Something that can only be worked out by importing a lot of modules (like
+    which renderers there are and what arguments they take), kept as JSON in
+    the cache directory so that later runs can skip the imports.
+
+    It's valid for as long as nothing in `paths` (the directories those
+    modules are in, and any below them) has been added, removed or modified,
+    and until we're upgraded.
+    """
+
+    def __init__(self, name, paths):
+        self.path = os.path.join(xdg.get_cache_home(), name + ".json")
+        self.paths = paths
+
+    def get(self, build):
+        """
+        Return the data in the manifest, or call `build` to work it out again
+        (and save it for next time) if the manifest is missing or out of date.
+        """
+        signature = self.get_signature()
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+            if manifest["signature"] == signature:
+                return manifest["data"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        data = build()
+        self.save(signature, data)
+        return data
+
+    def get_signature(self):
+        signature = {"version": __version__}
+        for path in self.paths:
+            for directory, directories, files in os.walk(path):
+                if "__pycache__" in directories:
+                    directories.remove("__pycache__")
+                for name in [""] + directories + files:
+                    entry = os.path.join(directory, name)
+                    try:
+                        signature[entry] = os.stat(entry).st_mtime_ns
+                    except OSError:
+                        continue
+        return signature
+
+    def save(self, signature, data):
+        # Not being able to save it only means the next run is slower
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary = "{}.{}.tmp".format(self.path, os.getpid())
+            with open(temporary, "w") as f:
+                json.dump({"signature": signature, "data": data}, f)
+            os.replace(temporary, self.path)
+        except (OSError, TypeError, ValueError):
+            pass
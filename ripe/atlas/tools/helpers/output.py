@@ -0,0 +1,91 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import threading
+
+
+class BufferedOutput(object):
+    """
+    Gathers the text written to it and hands it on to `stream` (stdout by
+    default) in blocks of about `buffer_size` characters, so that rendering a
+    lot of results doesn't cost a write to the terminal or pipe for each one.
+
+    When `stream` is a terminal, output is passed on a line at a time instead,
+    as somebody is probably watching it.  With a `flush_interval` (in
+    seconds), nothing written is held back for longer than that, which is
+    what a live stream needs when results trickle in.
+
+    Use it as a context manager to have whatever's left flushed at the end.
+    """
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(
+        self, stream=None, buffer_size=None, line_buffered=None, flush_interval=None
+    ):
+        self.stream = stream or sys.stdout
+        self.buffer_size = buffer_size or self.BUFFER_SIZE
+        if line_buffered is None:
+            line_buffered = self._isatty(self.stream)
+        self.line_buffered = line_buffered
+        self.flush_interval = flush_interval
+
+        self._parts = []
+        self._size = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def write(self, text):
+        if not text:
+            return
+        with self._lock:
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= self.buffer_size or (
+                self.line_buffered and "\n" in text
+            ):
+                self._flush()
+            elif self.flush_interval and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+        self.stream.flush()
+
+    @staticmethod
+    def _isatty(stream):
+        try:
+            return stream.isatty()
+        except (AttributeError, ValueError):
+            return False
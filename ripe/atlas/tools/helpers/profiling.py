@@ -0,0 +1,156 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This is imported before anything else when ripe-atlas starts, so that the
+# rest can be timed.  Keep it to the standard library.
+
+import atexit
+import contextlib
+import importlib.abc
+import os
+import sys
+import time
+
+
+class StartupProfile(object):
+    """
+    Times each phase of a ripe-atlas run (settings, command discovery, parser
+    build, ...) and, if profiling is turned on, how long each module took to
+    import, and writes a report of both to stderr on the way out.
+
+    Profiling is turned on with --profile-startup anywhere on the command
+    line, or by setting RIPE_ATLAS_PROFILE to anything but "" or "0".
+    """
+
+    FLAG = "--profile-startup"
+    ENV = "RIPE_ATLAS_PROFILE"
+
+    # How many of the slowest imports to list
+    TOP = 25
+
+    def __init__(self, enabled=False, stream=None):
+        self.enabled = enabled
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.phases = []
+        self.imports = []
+        self._stack = []
+
+    @classmethod
+    def start(cls, argv=None):
+        """
+        Start timing, taking FLAG out of `argv` (sys.argv by default) if it's
+        there.  Anything imported after this is timed too, so call it first.
+        """
+        argv = sys.argv if argv is None else argv
+        enabled = os.environ.get(cls.ENV, "") not in ("", "0")
+        if cls.FLAG in argv:
+            argv.remove(cls.FLAG)
+            enabled = True
+
+        profile = cls(enabled=enabled)
+        if enabled:
+            sys.meta_path.insert(0, ImportTimer(profile))
+            atexit.register(profile.report)
+        return profile
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def enter_import(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit_import(self):
+        name, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        self.imports.append((name, elapsed, elapsed - children))
+
+    def report(self):
+        stream = self.stream or sys.stderr
+        total = time.perf_counter() - self.started
+        imported = sum(own for _, _, own in self.imports)
+
+        stream.write("\nStartup profile: {:.1f} ms in all, ".format(total * 1000))
+        stream.write(
+            "{:.1f} ms importing {} modules\n\n".format(
+                imported * 1000, len(self.imports)
+            )
+        )
+
+        stream.write("Phases:\n")
+        for name, elapsed in self.phases:
+            stream.write("  {:9.1f} ms  {}\n".format(elapsed * 1000, name))
+
+        stream.write("\nSlowest imports (cumulative, self):\n")
+        slowest = sorted(self.imports, key=lambda i: i[1], reverse=True)
+        for name, elapsed, own in slowest[: self.TOP]:
+            stream.write(
+                "  {:9.1f} ms {:9.1f} ms  {}\n".format(elapsed * 1000, own * 1000, name)
+            )
+        stream.flush()
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Sits at the front of sys.meta_path, letting the other finders find each
+    module and wrapping its loader in a TimedLoader.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self.profile, name)
+        return spec
+
+
+class TimedLoader(object):
+    """A loader that times how long another one takes to run a module."""
+
+    def __init__(self, loader, profile, name):
+        self._loader = loader
+        self._profile = profile
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        return create_module(spec) if create_module else None
+
+    def exec_module(self, module):
+        self._profile.enter_import(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profile.exit_import()
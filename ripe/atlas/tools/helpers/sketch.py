@@ -0,0 +1,98 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+
+class QuantileSketch(object):
+    """
+    A mergeable sketch of a distribution of positive values (RTTs, say) that
+    answers quantile queries to within `accuracy` of the true value, relative
+    to it.  Values are counted in logarithmically sized bins, so memory
+    depends on the spread of the values rather than how many there are: a
+    1% sketch of anything between 0.01ms and 100s fits in under 1200 bins.
+    The smallest and largest values are kept exactly, and no quantile is
+    ever estimated beyond them.
+    """
+
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zeros += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """
+        Add the values counted by `other`, a sketch of the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches of the same accuracy can be merged")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        for value in (other.min, other.max):
+            if value is not None:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+
+    def quantile(self, q):
+        """
+        Return the `q`-quantile (0 <= q <= 1) of the values, or None if
+        there aren't any.
+        """
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                break
+        # The middle of the bin, as far as relative error goes
+        value = 2 * self.gamma ** index / (self.gamma + 1)
+        return min(max(value, self.min), self.max)
@@ -182,6 +182,46 @@ class ArgumentType(object):
 
             return r
 
+    class comma_separated_numbers(object):
+        def __init__(self, minimum=float("-inf"), maximum=float("inf")):
+            self.minimum = minimum
+            self.maximum = maximum
+
+        def __call__(self, string):
+
+            r = []
+
+            for i in string.split(","):
+
+                try:
+                    i = float(i)
+                except ValueError:
+                    raise argparse.ArgumentTypeError(
+                        "The numbers supplied were not in the correct format. "
+                        "Note that you must specify them as a list of "
+                        "comma-separated numbers without spaces.  Example: "
+                        "0.5,1,2,5,10"
+                    )
+
+                if i.is_integer():
+                    i = int(i)
+
+                if i < self.minimum:
+                    raise argparse.ArgumentTypeError(
+                        "{} is lower than the minimum permitted value of "
+                        "{}.".format(i, self.minimum)
+                    )
+                if i > self.maximum:
+                    raise argparse.ArgumentTypeError(
+                        "{} exceeds the maximum permitted value of {}.".format(
+                            i, self.maximum
+                        )
+                    )
+
+                r.append(i)
+
+            return r
+
     class regex(object):
         def __init__(self, regex):
             self.regex = re.compile(regex)
@@ -27,6 +27,14 @@ def get_config_home():
     return os.path.join(config_home, "ripe-atlas-tools")
 
 
+def get_cache_home():
+    """ """
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if cache_home is None:
+        cache_home = os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "ripe-atlas-tools")
+
+
 if hasattr(platform, "freedesktop_os_release"):
     freedesktop_os_release = platform.freedesktop_os_release
 else:
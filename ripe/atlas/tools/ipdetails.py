@@ -13,18 +13,214 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from concurrent.futures import ThreadPoolExecutor
+import os
+
 import requests
 import IPy
 
 from .cache import cache
 
 
+class PrefixTrie(object):
+    """
+    A binary trie of the network prefixes of a single address family, which
+    answers longest-prefix-match queries in O(address bits) regardless of how
+    many prefixes it holds.
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        # Each node is [zero_child, one_child, prefix_or_None]
+        self._root = [None, None, None]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node[2] is not None:
+                yield node[2]
+            stack.extend(child for child in node[:2] if child is not None)
+
+    def _walk(self, network, prefixlen, create=False):
+        node = self._root
+        for i in range(prefixlen):
+            bit = (network >> (self.bits - 1 - i)) & 1
+            if node[bit] is None:
+                if not create:
+                    return None
+                node[bit] = [None, None, None]
+            node = node[bit]
+        return node
+
+    def add(self, network, prefixlen, prefix):
+        """
+        Store `prefix` at the position of `network`/`prefixlen`.  Returns
+        False if it was already there.
+        """
+        node = self._walk(network, prefixlen, create=True)
+        if node[2] == prefix:
+            return False
+        if node[2] is None:
+            self._size += 1
+        node[2] = prefix
+        return True
+
+    def remove(self, network, prefixlen):
+        node = self._walk(network, prefixlen)
+        if node is not None and node[2] is not None:
+            node[2] = None
+            self._size -= 1
+
+    def matches(self, address):
+        """
+        Return all of the stored prefixes containing `address`, most specific
+        first.
+        """
+        found = []
+        node = self._root
+        for i in range(self.bits + 1):
+            if node[2] is not None:
+                found.append(node[2])
+            if i == self.bits:
+                break
+            node = node[(address >> (self.bits - 1 - i)) & 1]
+            if node is None:
+                break
+        found.reverse()
+        return found
+
+
+class PrefixIndex(object):
+    """
+    A persistent index of the prefixes cached under `IPDetailsPrefix:*`, so
+    that we don't have to scan and unpickle every cache entry to find the
+    prefix an address belongs to.
+
+    The index lives in a journal file next to the cache database with one
+    line per added ("+") or dropped ("-") prefix.  It's replayed into one
+    PrefixTrie per address family when loaded, and rewritten whenever it has
+    accumulated more dead lines than live ones.
+    """
+
+    SUFFIX = ".prefixes"
+
+    def __init__(self, path):
+        self.path = path
+        self._tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+
+    def __len__(self):
+        return sum(len(trie) for trie in self._tries.values())
+
+    @classmethod
+    def load(cls, cache):
+        """
+        Load the index belonging to `cache`.  If there isn't one yet (i.e. the
+        cache was created by an older version) we build it by scanning the
+        cache keys once.
+        """
+        index = cls(cache.get_path() + cls.SUFFIX)
+        if os.path.exists(index.path):
+            index._replay()
+        else:
+            for key in cache.keys("IPDetailsPrefix"):
+                index._add(key.decode().split(":", 1)[1])
+            index._rewrite()
+        return index
+
+    def add(self, prefix):
+        if self._add(prefix):
+            self._append("+", prefix)
+
+    def discard(self, prefix):
+        if self._remove(prefix):
+            self._append("-", prefix)
+
+    def matches(self, ip_object):
+        """
+        Return the indexed prefixes containing `ip_object` (an IPy.IP), most
+        specific first.
+        """
+        trie = self._tries.get(ip_object.version())
+        if trie is None:
+            return []
+        return trie.matches(ip_object.int())
+
+    def clear(self):
+        self._tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _parse(self, prefix):
+        try:
+            network = IPy.IP(prefix)
+        except ValueError:
+            return None
+        return self._tries[network.version()], network.int(), network.prefixlen()
+
+    def _add(self, prefix):
+        parsed = self._parse(prefix)
+        if parsed is None:
+            return False
+        trie, network, prefixlen = parsed
+        return trie.add(network, prefixlen, prefix)
+
+    def _remove(self, prefix):
+        parsed = self._parse(prefix)
+        if parsed is None:
+            return False
+        trie, network, prefixlen = parsed
+        size = len(trie)
+        trie.remove(network, prefixlen)
+        return len(trie) != size
+
+    def _append(self, action, prefix):
+        with open(self.path, "a") as f:
+            f.write("{}{}\n".format(action, prefix))
+
+    def _replay(self):
+        lines = 0
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                lines += 1
+                if line[0] == "+":
+                    self._add(line[1:])
+                elif line[0] == "-":
+                    self._remove(line[1:])
+        if lines > 2 * len(self):
+            self._rewrite()
+
+    def _rewrite(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for trie in self._tries.values():
+                for prefix in trie:
+                    f.write("+{}\n".format(prefix))
+        os.replace(tmp_path, self.path)
+
+
 class IP(object):
 
     RIPESTAT_URL = "https://stat.ripe.net/data/prefix-overview/data.json?resource={ip}"
     CACHE_EXPIRATION_TIME = 60 * 60 * 24 * 7
 
-    def __init__(self, address):
+    # Bulk lookups via resolve_many()
+    QUERY_TIMEOUT = 10
+    QUERY_WORKERS = 8
+
+    _prefix_index = None
+    _session = None
+
+    def __init__(self, address, lookup=True):
         self.cached_prefix_found = False
         self.ip_object = IPy.IP(address)
 
@@ -43,7 +239,10 @@ class IP(object):
             "PRIVATE",
         ]
 
-        details = self._get_details()
+        if lookup:
+            self._set_details(self._get_details())
+
+    def _set_details(self, details):
         if details:
             self.asn = details["ASN"]
             self.holder = details["Holder"]
@@ -69,40 +268,167 @@ class IP(object):
 
         return details
 
+    @classmethod
+    def resolve_many(cls, addresses):
+        """
+        Look up the details of many addresses in one go, returning a dict of
+        {address: IP}.
+
+        Addresses are deduplicated and resolved from the cache where possible,
+        either directly or through a known prefix.  The rest are queried on
+        RIPEstat concurrently: first one address per /24 (or /48), as its
+        neighbours are likely to fall into the prefix we learn from it, and
+        then whatever is still unresolved after that.
+        """
+        ips = {address: cls(address, lookup=False) for address in set(addresses)}
+
+        unresolved = cls._resolve_from_cache(
+            [ip for ip in ips.values() if ip.is_querable()]
+        )
+
+        neighbourhoods = {}
+        for ip in unresolved:
+            shift = 8 if ip.ip_object.version() == 4 else 80
+            key = (ip.ip_object.version(), ip.ip_object.int() >> shift)
+            neighbourhoods.setdefault(key, []).append(ip)
+
+        cls._query_many([group[0] for group in neighbourhoods.values()])
+        cls._query_many(
+            cls._resolve_from_cache(
+                [ip for group in neighbourhoods.values() for ip in group[1:]]
+            )
+        )
+
+        return ips
+
+    @classmethod
+    def _resolve_from_cache(cls, ips):
+        """
+        Resolve `ips` from the cache with one batch lookup by address and one
+        through the cached prefixes containing them.  Returns the ones that
+        couldn't be resolved.
+        """
+        if not ips:
+            return []
+
+        cached = cache.get_many("IPDetails:{}".format(ip.address) for ip in ips)
+        unresolved = []
+        for ip in ips:
+            details = cached.get("IPDetails:{}".format(ip.address))
+            if details:
+                ip._set_details(details)
+            else:
+                unresolved.append(ip)
+
+        index = cls.get_prefix_index()
+        candidates = [index.matches(ip.ip_object) for ip in unresolved]
+        cached = cache.get_many(
+            "IPDetailsPrefix:{}".format(prefix)
+            for prefixes in candidates
+            for prefix in prefixes
+        )
+
+        remaining = []
+        learned = {}
+        for ip, prefixes in zip(unresolved, candidates):
+            for prefix in prefixes:
+                details = cached.get("IPDetailsPrefix:{}".format(prefix))
+                if details:
+                    ip.cached_prefix_found = True
+                    ip._set_details(details)
+                    learned["IPDetails:{}".format(ip.address)] = details
+                    break
+            else:
+                remaining.append(ip)
+
+        # data could exist but expired
+        for prefixes in candidates:
+            for prefix in prefixes:
+                if "IPDetailsPrefix:{}".format(prefix) not in cached:
+                    index.discard(prefix)
+
+        if learned:
+            cache.set_many(learned, cls.CACHE_EXPIRATION_TIME)
+
+        return remaining
+
+    @classmethod
+    def _query_many(cls, ips):
+        """
+        Query RIPEstat for all of `ips` on a bounded thread pool.  Only the
+        HTTP requests run in the workers; the cache is updated from here, in
+        one batch.
+        """
+        if not ips:
+            return
+
+        session = cls.get_session()
+        workers = min(cls.QUERY_WORKERS, len(ips))
+        learned = {}
+        index = cls.get_prefix_index()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda ip: ip.query_stat(session=session), ips)
+            for ip, details in zip(ips, results):
+                if details:
+                    ip._set_details(details)
+                    learned["IPDetails:{}".format(ip.address)] = details
+                    learned["IPDetailsPrefix:{}".format(details["Prefix"])] = details
+
+        cache.set_many(learned, cls.CACHE_EXPIRATION_TIME)
+        for key in learned:
+            if key.startswith("IPDetailsPrefix:"):
+                index.add(key.split(":", 1)[1])
+
+    @classmethod
+    def get_session(cls):
+        """
+        A requests session shared by all bulk lookups, with a connection pool
+        large enough for all of the query workers.
+        """
+        if cls._session is None:
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=cls.QUERY_WORKERS)
+            cls._session = requests.Session()
+            cls._session.mount("https://", adapter)
+        return cls._session
+
     def is_querable(self):
         """Determines if address is worth querable."""
         return self.ip_object.iptype() not in self.not_querable_types
 
+    @classmethod
+    def get_prefix_index(cls):
+        """
+        The index of cached prefixes, loaded lazily the first time it's needed
+        in this process.
+        """
+        if cls._prefix_index is None:
+            cls._prefix_index = PrefixIndex.load(cache)
+        return cls._prefix_index
+
     def get_from_cached_prefix(self):
         """Search cache for existing cached Prefix"""
-        details = None
-
-        for cache_entry in cache.keys():
-            if not cache_entry.decode().startswith("IPDetailsPrefix:"):
-                continue
+        index = self.get_prefix_index()
 
-            prefix_details = cache.get(cache_entry)
+        for prefix in index.matches(self.ip_object):
+            details = cache.get("IPDetailsPrefix:{}".format(prefix))
 
             # data could exist but expired
-            if not prefix_details:
+            if not details:
+                index.discard(prefix)
                 continue
 
-            prefix = IPy.IP(prefix_details["Prefix"])
-
-            if self.ip_object in prefix:
-                details = prefix_details
-                self.cached_prefix_found = True
-                break
+            self.cached_prefix_found = True
+            return details
 
-        return details
+        return None
 
-    def query_stat(self):
+    def query_stat(self, session=requests):
         """Query RIPE Stat to get address details."""
         URL = self.RIPESTAT_URL.format(ip=self.address)
         details = {}
 
         try:
-            response = requests.get(URL)
+            response = session.get(URL, timeout=self.QUERY_TIMEOUT)
             if not response.ok:
                 return details
             res = response.json()
@@ -134,6 +460,7 @@ class IP(object):
         if not self.cached_prefix_found:
             key = "IPDetailsPrefix:{}".format(details["Prefix"])
             cache.set(key, details, self.CACHE_EXPIRATION_TIME)
+            self.get_prefix_index().add(details["Prefix"])
 
         key = "IPDetails:{}".format(self.address)
         cache.set(key, details, self.CACHE_EXPIRATION_TIME)
@@ -0,0 +1,121 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from concurrent.futures import ThreadPoolExecutor
+import calendar
+import collections
+import datetime
+
+import requests
+from ripe.atlas.cousteau import AtlasResultsRequest
+
+from .exceptions import RipeAtlasToolsException
+
+
+class SessionResultsRequest(AtlasResultsRequest):
+    """
+    An AtlasResultsRequest that goes over a shared requests.Session, so that
+    a run of them can reuse the same connections.
+    """
+
+    def __init__(self, session, **kwargs):
+        super(SessionResultsRequest, self).__init__(**kwargs)
+        self.session = session
+
+    def get_http_method(self, method):
+        return self.session.request(method, self.url, **self.http_method_args)
+
+
+def get_error_message(response):
+    """Describe an unsuccessful response from the results API."""
+    error = response.get("error") if isinstance(response, dict) else None
+    msg = "Error fetching measurement results"
+    if error:
+        msg += ": [{status} {title}] {detail}".format(**error)
+    else:
+        msg = "{} Error fetching measurement results".format(error)
+    return msg
+
+
+def get_timestamp(moment):
+    """A datetime (UTC unless it says otherwise) as a Unix timestamp."""
+    return calendar.timegm(moment.utctimetuple())
+
+
+def get_datetime(timestamp):
+    """A Unix timestamp as a naive UTC datetime."""
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=timestamp)
+
+
+def get_slices(start, stop, size):
+    """
+    Split the time between the `start` and `stop` datetimes into slices of
+    `size` seconds, as pairs of naive UTC datetimes.  Both ends of a slice are
+    inclusive, as they are for the API, so each slice stops a second before
+    the next one starts.
+    """
+    start, stop = get_timestamp(start), get_timestamp(stop)
+    for slice_start in range(start, stop + 1, size):
+        slice_stop = min(slice_start + size - 1, stop)
+        yield get_datetime(slice_start), get_datetime(slice_stop)
+
+
+class PagedResults(object):
+    """
+    An iterable of the raw results of a measurement between `start` and
+    `stop`, fetched `slice_size` seconds at a time.  Up to `concurrency`
+    slices are downloaded at once over a shared session, and each one is
+    yielded (in order) as soon as it and the ones before it have arrived, so
+    that only a handful of slices are ever held in memory.
+
+    Any other keyword arguments are passed on to every AtlasResultsRequest.
+    """
+
+    CONCURRENCY = 4
+
+    def __init__(self, start, stop, slice_size, concurrency=None, **kwargs):
+        self.slices = get_slices(start, stop, slice_size)
+        self.concurrency = concurrency or self.CONCURRENCY
+        self.kwargs = kwargs
+
+    def __iter__(self):
+        for _, _, results in self.iter_slices():
+            for result in results:
+                yield result
+
+    def iter_slices(self):
+        """
+        Yield the slices one at a time as (start, stop, results) tuples, for
+        those who need to know which results came from where.
+        """
+        with requests.Session() as session:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                pending = collections.deque()
+                for start, stop in self.slices:
+                    pending.append(
+                        executor.submit(self._fetch, session, start, stop)
+                    )
+                    if len(pending) >= self.concurrency:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+    def _fetch(self, session, start, stop):
+        is_success, results = SessionResultsRequest(
+            session, start=start, stop=stop, **self.kwargs
+        ).get()
+        if not is_success or not isinstance(results, list):
+            raise RipeAtlasToolsException(get_error_message(results))
+        return start, stop, results
@@ -13,13 +13,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import functools
 import importlib
+import itertools
+import json
 import os
 import pkgutil
 import sys
 
 from ..exceptions import RipeAtlasToolsException
 from ..helpers import xdg
+from ..helpers.manifest import Manifest
+from ..helpers.output import BufferedOutput
 
 
 class Renderer(object):
@@ -33,6 +38,9 @@ class Renderer(object):
 
     RENDERS = ()
 
+    # How many results are handed to prefetch() at a time
+    PREFETCH_WINDOW = 100
+
     def __init__(self, *args, **kwargs):
         """
         If "arguments" is in kwargs it can be used to gather renderer's
@@ -50,6 +58,19 @@ class Renderer(object):
         """
         Return a list of renderers available to be used.
         """
+        return list(cls.get_manifest())
+
+    @classmethod
+    def get_manifest(cls):
+        """
+        Return a dict of the available renderers' names and the arguments they
+        add (see ArgumentRecorder), or None for those whose arguments we can't
+        write down.
+
+        Finding out means importing every renderer, which takes longer than
+        many a command does, so we keep the answer in a Manifest and only work
+        it out again once something in the renderer directories has changed.
+        """
 
         paths = [os.path.dirname(__file__)]
         if "HOME" in os.environ:
@@ -57,19 +78,23 @@ class Renderer(object):
             sys.path.append(path)
             paths += [os.path.join(path, "renderers")]
 
-        names = []
+        return Manifest("renderers", paths).get(lambda: cls._build_manifest(paths))
+
+    @classmethod
+    def _build_manifest(cls, paths):
+        manifest = {}
 
         for _, module_name, _ in pkgutil.iter_modules(paths):
             if module_name == "base":
                 continue
             # Check that we can actually use this renderer, otherwise drop it
             try:
-                cls.get_renderer_by_name(module_name)
+                renderer = cls.get_renderer_by_name(module_name)
             except Exception:
                 continue
-            names.append(module_name)
+            manifest[module_name] = ArgumentRecorder.record(renderer.add_arguments)
 
-        return names
+        return manifest
 
     @staticmethod
     def add_common_arguments(parser):
@@ -90,20 +115,19 @@ class Renderer(object):
     @staticmethod
     def add_arguments_for_available_renderers(parser):
         Renderer.add_common_arguments(parser)
-        for renderer_name in Renderer.get_available():
-            renderer_cls = Renderer.get_renderer_by_name(renderer_name)
-            renderer_cls.add_arguments(parser)
+        for renderer_name, arguments in Renderer.get_manifest().items():
+            if arguments is None:
+                renderer_cls = Renderer.get_renderer_by_name(renderer_name)
+                renderer_cls.add_arguments(parser)
+            else:
+                ArgumentRecorder.replay(arguments, parser)
 
     @staticmethod
     def render_template(template, **kwargs):
         """
         A crude templating engine.
         """
-
-        template = os.path.join(os.path.dirname(__file__), "templates", template)
-
-        with open(template) as f:
-            return str(f.read()).format(**kwargs)
+        return get_template(template)(**kwargs)
 
     @classmethod
     def get_renderer(cls, name=None, kind=None):
@@ -192,28 +216,54 @@ class Renderer(object):
         header_shown = False
         last_key = None
 
-        for key, results in normalized.items():
-            for sagan in results:
-                # Possibly show render header
-                if self.show_header and not header_shown:
-                    print(self.header(sagan), end="")
-                    header_shown = True
+        # Live streams shouldn't be held back waiting for a window to fill up,
+        # or for the output buffer to
+        window_size = getattr(results, "prefetch_window", self.PREFETCH_WINDOW)
+        flush_interval = getattr(results, "flush_interval", None)
+
+        with BufferedOutput(flush_interval=flush_interval) as output:
+            for key, results in normalized.items():
+                for window in self._get_windows(results, window_size):
+                    self.prefetch(window)
+
+                    for sagan in window:
+                        # Possibly show render header
+                        if self.show_header and not header_shown:
+                            output.write(self.header(sagan))
+                            header_shown = True
 
-                if key:
-                    indent = " "
-                    if key != last_key:
-                        # Show aggregation group header
-                        print("\n" + key)
-                        last_key = key
-                else:
-                    indent = ""
+                        if key:
+                            indent = " "
+                            if key != last_key:
+                                # Show aggregation group header
+                                output.write("\n" + key + "\n")
+                                last_key = key
+                        else:
+                            indent = ""
 
-                line = Result(self.on_result(sagan), sagan.probe_id)
+                        line = Result(self.on_result(sagan), sagan.probe_id)
 
-                print(indent + line, end="")
+                        output.write(indent + line)
 
-        if self.show_footer:
-            print(self.footer(), end="")
+            if self.show_footer:
+                output.write(self.footer())
+
+    @staticmethod
+    def _get_windows(results, size):
+        results = iter(results)
+        while True:
+            window = list(itertools.islice(results, size))
+            if not window:
+                return
+            yield window
+
+    def prefetch(self, results):
+        """
+        Override this to gather whatever the renderer needs for a window of
+        results (e.g. IP details) in one go, before `on_result` is called for
+        each of them.
+        """
+        pass
 
     def header(self, sample):
         """
@@ -250,6 +300,80 @@ class Renderer(object):
         raise NotImplementedError()
 
 
+class ArgumentRecorder(object):
+    """
+    Stands in for an argparse parser (or argument group), writing down the
+    arguments a renderer adds to it in a form that can be kept as JSON, so
+    that they can be added to the real parser later without importing the
+    renderer.
+    """
+
+    TYPES = {"int": int, "float": float, "str": str}
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.arguments = []
+        self.groups = []
+
+    @classmethod
+    def record(cls, add_arguments):
+        """
+        Return what `add_arguments` adds to a parser, or None if that's
+        anything we can't write down (like a `type` of our own), or if it does
+        anything else with the parser that we don't know how to stand in for
+        (like a mutually exclusive group).  The renderer is then imported to
+        add its arguments itself.
+        """
+        recorder = cls()
+        try:
+            add_arguments(recorder)
+            return json.loads(json.dumps(recorder.get_spec()))
+        except Exception:
+            return None
+
+    @classmethod
+    def replay(cls, spec, parser):
+        """Add the arguments in a recorded `spec` to `parser`."""
+        for args, kwargs in spec["arguments"]:
+            if "type" in kwargs:
+                kwargs = dict(kwargs, type=cls.TYPES[kwargs["type"]])
+            parser.add_argument(*args, **kwargs)
+        for group in spec["groups"]:
+            cls.replay(group, parser.add_argument_group(**group["kwargs"]))
+
+    def add_argument_group(self, **kwargs):
+        group = ArgumentRecorder(**kwargs)
+        self.groups.append(group)
+        return group
+
+    def add_argument(self, *args, **kwargs):
+        if "type" in kwargs:
+            name = getattr(kwargs["type"], "__name__", None)
+            if self.TYPES.get(name) is not kwargs["type"]:
+                raise TypeError("Only built-in types can be recorded")
+            kwargs = dict(kwargs, type=name)
+        self.arguments.append([list(args), kwargs])
+
+    def get_spec(self):
+        return {
+            "kwargs": self.kwargs,
+            "arguments": self.arguments,
+            "groups": [group.get_spec() for group in self.groups],
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(template):
+    """
+    Return a function that fills in the named template, which is only read
+    from disk the first time it's asked for.  Renderers like dns fill in a
+    template for every response, so this saves an open() and read() each.
+    """
+    path = os.path.join(os.path.dirname(__file__), "templates", template)
+    with open(path) as f:
+        return str(f.read()).format
+
+
 class Result(str):
     """
     A string-like object that we can use to render results, but that contains
@@ -0,0 +1,233 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import shutil
+import tempfile
+import zipfile
+
+from ..exceptions import RipeAtlasToolsException
+from .base import Renderer as BaseRenderer
+
+
+# The writers import pyarrow and NumPy themselves, as those take a while, so
+# that only writing a file of that format pays for them (and not, say,
+# building the renderer manifest, which imports every renderer).
+
+
+class ParquetWriter(object):
+    """Writes row groups to a Parquet file with pyarrow."""
+
+    TYPES = {"i8": "int64", "f8": "float64"}
+
+    def __init__(self, path, columns):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema(
+            [(name, self.TYPES[dtype]) for name, dtype in columns]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, columns):
+        self.writer.write_table(
+            self.pyarrow.Table.from_pydict(columns, self.schema)
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+class NPZWriter(object):
+    """
+    Writes row groups to a NumPy .npz file, one array per column.  Each column
+    is streamed to a temporary file as it grows, and only copied into the
+    archive, behind an .npy header, once we know how long it is.
+    """
+
+    def __init__(self, path, columns):
+        import numpy
+
+        self.numpy = numpy
+        self.path = path
+        self.columns = [(name, numpy.dtype(dtype)) for name, dtype in columns]
+        self.files = {name: tempfile.TemporaryFile() for name, _ in columns}
+        self.rows = 0
+
+    def write(self, columns):
+        for name, dtype in self.columns:
+            self.numpy.asarray(columns[name], dtype=dtype).tofile(self.files[name])
+        self.rows += len(columns[self.columns[0][0]])
+
+    def close(self):
+        numpy = self.numpy
+        with zipfile.ZipFile(self.path, "w", allowZip64=True) as archive:
+            for name, dtype in self.columns:
+                f = self.files[name]
+                f.seek(0)
+                with archive.open(name + ".npy", "w", force_zip64=True) as out:
+                    numpy.lib.format.write_array_header_1_0(
+                        out,
+                        {
+                            "descr": numpy.lib.format.dtype_to_descr(dtype),
+                            "fortran_order": False,
+                            "shape": (self.rows,),
+                        },
+                    )
+                    shutil.copyfileobj(f, out)
+                f.close()
+
+
+class Renderer(BaseRenderer):
+    """
+    Rather than printing anything, write the results to --columnar-file as
+    typed columns, ready for pandas and friends.  That's Parquet if pyarrow is
+    installed and the file name doesn't end in .npz, and a NumPy .npz archive
+    otherwise.
+
+    Rows are written ROW_GROUP_SIZE at a time, so any number of results can be
+    exported in a fixed amount of memory.
+    """
+
+    RENDERS = [BaseRenderer.TYPE_PING, BaseRenderer.TYPE_TRACEROUTE]
+
+    ROW_GROUP_SIZE = 64 * 1024
+
+    COLUMNS = {
+        BaseRenderer.TYPE_PING: (
+            ("prb_id", "i8"),
+            ("timestamp", "i8"),
+            ("rtt_min", "f8"),
+            ("rtt_avg", "f8"),
+            ("rtt_max", "f8"),
+            ("sent", "i8"),
+            ("rcvd", "i8"),
+        ),
+        BaseRenderer.TYPE_TRACEROUTE: (
+            ("prb_id", "i8"),
+            ("timestamp", "i8"),
+            ("hop", "i8"),
+            ("rtt_min", "f8"),
+            ("rtt_avg", "f8"),
+            ("rtt_max", "f8"),
+            ("sent", "i8"),
+            ("rcvd", "i8"),
+        ),
+    }
+
+    def __init__(self, *args, **kwargs):
+        BaseRenderer.__init__(self, *args, **kwargs)
+        self.path = None
+        if "arguments" in kwargs:
+            self.path = kwargs["arguments"].columnar_file
+
+    @staticmethod
+    def add_arguments(parser):
+        group = parser.add_argument_group(
+            title="Optional arguments for columnar renderer"
+        )
+        group.add_argument(
+            "--columnar-file",
+            help="The file to write columns to: Parquet if pyarrow is "
+            "installed, or NumPy's .npz if it isn't or the file name ends in "
+            ".npz.",
+        )
+
+    def get_writer(self, columns):
+        if not self.path:
+            raise RipeAtlasToolsException(
+                "The columnar renderer needs a --columnar-file to write to."
+            )
+        if not self.path.endswith(".npz"):
+            try:
+                return ParquetWriter(self.path, columns)
+            except ImportError:
+                if self.path.endswith(".parquet"):
+                    raise RipeAtlasToolsException(
+                        "Writing Parquet files needs pyarrow installed."
+                    )
+        try:
+            return NPZWriter(self.path, columns)
+        except ImportError:
+            raise RipeAtlasToolsException(
+                "The columnar renderer needs either pyarrow or NumPy installed."
+            )
+
+    def render(self, results, sample=None):
+        # Buckets make no difference to a table
+        if isinstance(results, dict):
+            results = (r for bucket in results.values() for r in bucket)
+
+        writer = None
+        columns = None
+        rows = 0
+
+        for result in results:
+            if writer is None:
+                kind = result.raw_data["type"]
+                names = [name for name, _ in self.COLUMNS[kind]]
+                writer = self.get_writer(self.COLUMNS[kind])
+                get_rows = getattr(self, "get_{}_rows".format(kind))
+                columns = {name: [] for name in names}
+            elif result.raw_data["type"] != kind:
+                continue  # A table has room for one kind of result only
+            for row in get_rows(result):
+                for name, value in zip(names, row):
+                    columns[name].append(value)
+                rows += 1
+                if not rows % self.ROW_GROUP_SIZE:
+                    writer.write(columns)
+                    columns = {name: [] for name in names}
+
+        if writer is None:
+            return
+
+        if rows % self.ROW_GROUP_SIZE:
+            writer.write(columns)
+        writer.close()
+
+        if self.show_footer:
+            print("Wrote {} rows to {}.".format(rows, self.path))
+
+    @staticmethod
+    def get_ping_rows(result):
+        yield (
+            result.probe_id,
+            result.raw_data.get("timestamp"),
+            Renderer._get_float(result.rtt_min),
+            Renderer._get_float(result.rtt_average),
+            Renderer._get_float(result.rtt_max),
+            result.packets_sent,
+            result.packets_received,
+        )
+
+    @staticmethod
+    def get_traceroute_rows(result):
+        for hop in result.hops:
+            rtts = [packet.rtt for packet in hop.packets if packet.rtt is not None]
+            yield (
+                result.probe_id,
+                result.raw_data.get("timestamp"),
+                hop.index,
+                min(rtts) if rtts else float("nan"),
+                sum(rtts) / len(rtts) if rtts else float("nan"),
+                max(rtts) if rtts else float("nan"),
+                len(hop.packets),
+                len(rtts),
+            )
+
+    @staticmethod
+    def _get_float(value):
+        return float("nan") if value is None else value
@@ -34,11 +34,19 @@ class Renderer(BaseRenderer):
         # Keys are timestamps, data struct captures ASN membership
         self.asns = Counter()
         self.asn2name = {}
+        self.ips = {}
+
+    def prefetch(self, results):
+        self.ips = IP.resolve_many(
+            result.destination_address
+            for result in results
+            if result.destination_address is not None
+        )
 
     def on_result(self, result):
         dst = result.destination_address
         if dst is not None:
-            ip = IP(dst)
+            ip = self.ips.get(dst) or IP(dst)
             if ip.asn:
                 self.asns[ip.asn] += 1
                 self.asn2name[ip.asn] = sanitise(ip.holder)
@@ -52,10 +52,13 @@ class Renderer(BaseRenderer):
         if not leap and not stratum and not v and not mode:
             return
 
+        # Written out with the result, as it would otherwise get ahead of the
+        # buffered output
+        r = ""
         if mode != "server":
-            print("invalid mode: %s" % mode)
+            r += "invalid mode: %s\n" % mode
 
-        r = "[NTP] %s -> %s (%s)\n" % (
+        r += "[NTP] %s -> %s (%s)\n" % (
             result.source_address,
             result.destination_name,
             result.destination_address,
@@ -84,7 +87,7 @@ class Renderer(BaseRenderer):
                     pkt.final_time,
                 )
         except Exception as ex:
-            print("Got exception when reading packet: %s" % ex)
-            print("Raw: %s" % pkt.raw_data)
+            r += "Got exception when reading packet: %s\n" % ex
+            r += "Raw: %s\n" % pkt.raw_data
 
         return r
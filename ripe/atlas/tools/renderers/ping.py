@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from ..helpers.sanitisers import sanitise
+from ..helpers.sketch import QuantileSketch
 from .base import Renderer as BaseRenderer
 
 
@@ -33,10 +34,12 @@ class Renderer(BaseRenderer):
         self.packet_loss = 0
         self.sent_packets = 0
         self.received_packets = 0
-        self.rtts = []
-        self.rtts_min = []
-        self.rtts_max = []
-        self.rtt_types_map = {"min": self.rtts_min, "max": self.rtts_max}
+
+        # Running statistics, so that memory doesn't grow with the results
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtt_sum = 0
+        self.rtts = QuantileSketch()
 
     def collect_stats(self, result):
         """
@@ -47,51 +50,63 @@ class Renderer(BaseRenderer):
             self.target = result.destination_name
         self.sent_packets += result.packets_sent
         self.received_packets += result.packets_received
-        self.collect_min_max_rtts("min", result.rtt_min)
-        self.collect_min_max_rtts("max", result.rtt_max)
+        self.collect_min_max_rtts(result.rtt_min, result.rtt_max)
 
         self.collect_packets_rtt(result.packets)
 
-    def collect_min_max_rtts(self, rtt_type, rtt):
+    def collect_min_max_rtts(self, rtt_min, rtt_max):
         """
-        Stores the given rtt in the corresponding list (min/max) if rtt is set.
+        Updates the overall min/max rtts with those of a result, if it has any.
         """
-        rtt = rtt
-        if not rtt:
-            rtt = 0
-
-        self.rtt_types_map[rtt_type].append(rtt)
+        if rtt_min is not None and (self.rtt_min is None or rtt_min < self.rtt_min):
+            self.rtt_min = rtt_min
+        if rtt_max is not None and (self.rtt_max is None or rtt_max > self.rtt_max):
+            self.rtt_max = rtt_max
 
     def collect_packets_rtt(self, packets):
         """
-        Collects all the rrts of given packets and stores them
-        in our rtts list.
+        Adds the rtts of the given packets to our running sum and sketch.
+        Packets that were lost don't have one, and duplicate replies are
+        skipped, as the probe leaves them out of its min/avg/max too.
         """
         for packet in packets:
-            rtt = packet.rtt
-            if not packet.rtt:
-                rtt = 0
-            self.rtts.append(rtt)
+            if packet.rtt is not None and not getattr(packet, "dup", False):
+                self.rtt_sum += packet.rtt
+                self.rtts.add(packet.rtt)
+
+    def merge(self, other):
+        """
+        Add the statistics gathered by `other`, another ping renderer, to ours,
+        e.g. to report on several shards of a measurement at once.
+        """
+        if not self.target:
+            self.target = other.target
+        self.sent_packets += other.sent_packets
+        self.received_packets += other.received_packets
+        self.collect_min_max_rtts(other.rtt_min, other.rtt_max)
+        self.rtt_sum += other.rtt_sum
+        self.rtts.merge(other.rtts)
 
     def calculate_loss(self):
         """Calculates the total loss between received and sent packets."""
         if not self.sent_packets:
             return 0
-
         return (1 - float(self.received_packets) / self.sent_packets) * 100
 
     def mean(self):
         """Calculates the mean of the collected rtts"""
-        return round(float(sum(self.rtts)) / max(len(self.rtts), 1), 3)
+        return round(float(self.rtt_sum) / max(len(self.rtts), 1), 3)
 
     def median(self):
-        """Calculates the median of the collected rtts"""
-        sorted_rtts = sorted(self.rtts)
-        index = (len(self.rtts) - 1) // 2
-        if len(self.rtts) % 2:
-            return sorted_rtts[index]
-        else:
-            return (sorted_rtts[index] + sorted_rtts[index + 1]) / 2.0
+        """Estimates the median of the collected rtts"""
+        return self.quantile(0.5)
+
+    def quantile(self, q):
+        """
+        Estimates the `q`-quantile of the collected rtts, to within 1% of the
+        true value.
+        """
+        return self.rtts.quantile(q) or 0
 
     def on_result(self, result):
         packets = result.packets
@@ -133,8 +148,10 @@ class Renderer(BaseRenderer):
             sent=self.sent_packets,
             received=self.received_packets,
             packet_loss=self.packet_loss,
-            min=min(self.rtts_min),
-            median=self.median(),
+            min=self.rtt_min or 0,
             mean=self.mean(),
-            max=max(self.rtts_max),
+            max=self.rtt_max or 0,
+            p50=self.quantile(0.5),
+            p90=self.quantile(0.9),
+            p99=self.quantile(0.99),
         )
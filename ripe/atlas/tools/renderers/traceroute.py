@@ -47,6 +47,18 @@ class Renderer(BaseRenderer):
         else:
             self.show_asns = Renderer.DEFAULT_SHOW_ASNS
 
+        self.ips = {}
+
+    def prefetch(self, results):
+        if self.show_asns:
+            self.ips = IP.resolve_many(
+                packet.origin
+                for result in results
+                for hop in result.hops
+                for packet in hop.packets
+                if packet.origin
+            )
+
     def on_result(self, result):
 
         r = ""
@@ -64,7 +76,8 @@ class Renderer(BaseRenderer):
                 name = name or packet.origin or "*"
                 if self.show_asns:
                     if packet.origin and not asn:
-                        asn = IP(packet.origin).asn
+                        ip = self.ips.get(packet.origin) or IP(packet.origin)
+                        asn = ip.asn
                 if packet.rtt:
                     rtts.append("{:8} ms".format(packet.rtt))
                 else:
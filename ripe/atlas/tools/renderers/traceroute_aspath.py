@@ -48,6 +48,8 @@ class Renderer(BaseRenderer):
         else:
             self.RADIUS = Renderer.DEFAULT_RADIUS
 
+        self.ips = {}
+
     @staticmethod
     def _get_asns_for_output(asns, radius):
         asns_with_padding = [""] * radius + asns
@@ -65,8 +67,8 @@ class Renderer(BaseRenderer):
             "last {} ASNs will be shown\n\n".format(self.RADIUS)
         )
 
-    def on_result(self, result):
-
+    @staticmethod
+    def _get_ip_hops(result):
         ip_hops = []
 
         for hop in result.hops:
@@ -75,11 +77,22 @@ class Renderer(BaseRenderer):
                     ip_hops.append(packet.origin)
                     break
 
+        return ip_hops
+
+    def prefetch(self, results):
+        self.ips = IP.resolve_many(
+            address for result in results for address in self._get_ip_hops(result)
+        )
+
+    def on_result(self, result):
+
+        ip_hops = self._get_ip_hops(result)
+
         asns = []
 
         # starting from the last hop's IP, get up to <RADIUS> ASNs
         for address in reversed(ip_hops):
-            ip = IP(address)
+            ip = self.ips.get(address) or IP(address)
             if ip.asn and ip.asn not in asns:
                 asns.append(ip.asn)
             if len(asns) == self.RADIUS:
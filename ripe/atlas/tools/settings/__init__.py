@@ -166,6 +166,10 @@ class Configuration(UserSettingsParser):
                 },
             },
         },
+        "cache": {
+            "engine": "dbm",
+            "memory-size": 10000,
+        },
         "ripe-ncc": {
             "endpoint": "https://atlas.ripe.net",
             "stream-base-url": "https://atlas-stream.ripe.net",
@@ -187,6 +191,7 @@ class Configuration(UserSettingsParser):
         authorisation = re.compile("^authorisation:$", re.MULTILINE)
         tags = re.compile("^  tags:$", re.MULTILINE)
         specification = re.compile("^specification:$", re.MULTILINE)
+        cache = re.compile("^cache:$", re.MULTILINE)
         ripe = re.compile("^ripe-ncc:$", re.MULTILINE)
 
         with open(template) as t:
@@ -198,6 +203,11 @@ class Configuration(UserSettingsParser):
                 payload,
             )
             payload = authorisation.sub("# Authorisation\n" "authorisation:", payload)
+            payload = cache.sub(
+                "# Local cache: engine is dbm or sqlite, memory-size is the number "
+                "of\n# recently used values also kept in memory\n" "cache:",
+                payload,
+            )
             payload = specification.sub(
                 "\n# Measurement Creation\n" "specification:", payload
             )
@@ -0,0 +1,160 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import gzip
+import json
+import os
+import time
+
+from .filters import filter_raw
+from .helpers import xdg
+from .paging import get_timestamp
+
+
+class ResultsStore(object):
+    """
+    The results of a single measurement, kept on disk so that they only have
+    to be downloaded once.
+
+    Results are appended to gzipped JSON lines files, one per (UTC) day, and
+    an index keeps track of which stretches of time (Unix timestamps, both
+    ends inclusive) have been fetched in full.  Asking for a window of time
+    then reads what's covered from disk and only fetches the gaps.
+
+    Results from the last SETTLE_TIME seconds are passed on but not stored,
+    as probes that were offline for a while may still be sending theirs in.
+    """
+
+    SETTLE_TIME = 60 * 60
+    SEGMENT_SIZE = 60 * 60 * 24
+    INDEX = "index.json"
+
+    def __init__(self, msm_id, path=None):
+        self.msm_id = msm_id
+        self.path = path or os.path.join(
+            xdg.get_cache_home(), "results", str(msm_id)
+        )
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, self.INDEX))
+
+    def get_covered(self):
+        """The stretches of time we have all the results for, in order."""
+        try:
+            with open(os.path.join(self.path, self.INDEX)) as f:
+                return [tuple(span) for span in json.load(f)["covered"]]
+        except FileNotFoundError:
+            return []
+
+    def get_last_stop(self):
+        """The end of the most recent stretch we have, or None."""
+        covered = self.get_covered()
+        return covered[-1][1] if covered else None
+
+    def get_pieces(self, start, stop):
+        """
+        Split the window from `start` to `stop` into (start, stop, covered)
+        pieces, in order, with `covered` telling whether we have that piece on
+        disk or still need to fetch it.
+        """
+        pieces = []
+        for span_start, span_stop in self.get_covered():
+            if span_stop < start or span_start > stop:
+                continue
+            if span_start > start:
+                pieces.append((start, span_start - 1, False))
+            pieces.append((max(start, span_start), min(stop, span_stop), True))
+            start = span_stop + 1
+        if start <= stop:
+            pieces.append((start, stop, False))
+        return pieces
+
+    def get_results(self, start, stop, fetch):
+        """
+        Yield the raw results from `start` to `stop`, reading what we have from
+        disk and storing what we don't as it's fetched.  `fetch` is called with
+        the start and stop of each gap, and should return an iterable of
+        (start, stop, results) slices, as PagedResults.iter_slices() does.
+        """
+        settled = int(time.time()) - self.SETTLE_TIME
+        for piece_start, piece_stop, covered in self.get_pieces(start, stop):
+            if covered:
+                for result in self.read(piece_start, piece_stop):
+                    yield result
+                continue
+            for slice_start, slice_stop, results in fetch(piece_start, piece_stop):
+                slice_start = get_timestamp(slice_start)
+                slice_stop = min(get_timestamp(slice_stop), settled)
+                if slice_start <= slice_stop:
+                    self.add(
+                        [r for r in results if r.get("timestamp", 0) <= slice_stop],
+                        slice_start,
+                        slice_stop,
+                    )
+                for result in results:
+                    yield result
+
+    def read(self, start, stop):
+        """Yield the stored results from `start` to `stop` as JSON strings."""
+        first = start - start % self.SEGMENT_SIZE
+        for segment in range(first, stop + 1, self.SEGMENT_SIZE):
+            try:
+                with gzip.open(self._get_segment_path(segment), "rt") as f:
+                    for line in filter_raw(f, start=start, stop=stop):
+                        yield line
+            except FileNotFoundError:
+                continue
+
+    def add(self, results, start, stop):
+        """
+        Store `results`, which should be all of those from `start` to `stop`,
+        and remember that we now have that stretch of time covered.
+        """
+        os.makedirs(self.path, exist_ok=True)
+
+        segments = collections.defaultdict(list)
+        for result in results:
+            timestamp = result.get("timestamp", start)
+            segments[timestamp - timestamp % self.SEGMENT_SIZE].append(result)
+
+        # Each write adds a gzip member to the end of the file, which readers
+        # see as one continuous stream.
+        for segment, segment_results in segments.items():
+            with gzip.open(self._get_segment_path(segment), "at") as f:
+                for result in segment_results:
+                    f.write(json.dumps(result, separators=(",", ":")))
+                    f.write("\n")
+
+        self._cover(start, stop)
+
+    def _cover(self, start, stop):
+        spans = sorted(self.get_covered() + [(start, stop)])
+        covered = [list(spans[0])]
+        for span_start, span_stop in spans[1:]:
+            if span_start <= covered[-1][1] + 1:
+                covered[-1][1] = max(covered[-1][1], span_stop)
+            else:
+                covered.append([span_start, span_stop])
+
+        path = os.path.join(self.path, self.INDEX)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"covered": covered}, f)
+        os.replace(path + ".tmp", path)
+
+    def _get_segment_path(self, segment):
+        return os.path.join(
+            self.path, time.strftime("%Y-%m-%d.jsonl.gz", time.gmtime(segment))
+        )
@@ -25,6 +25,11 @@ class StreamWrapper:
     specified capture limit and/or timeout
     """
 
+    # Have renderers handle results as soon as they arrive, and show them
+    # within a second
+    prefetch_window = 1
+    flush_interval = 1
+
     def __init__(
         self,
         stream: AtlasStream,
@@ -44,7 +44,8 @@ setup(
     ],
     extras_require={
         "doc": ["sphinx", "sphinx_rtd_theme"],
-        "fast": ["ujson"],
+        "fast": ["ujson", "numpy"],
+        "columnar": ["pyarrow"],
     },
     scripts=[
         "scripts/aping",
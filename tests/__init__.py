@@ -12,3 +12,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# Keep the manifests, caches and stores that the tests write (in-process or
+# from ripe-atlas subprocesses, which inherit this) out of the real ~/.cache
+os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="ripe-atlas-tools-tests-")
+atexit.register(shutil.rmtree, os.environ["XDG_CACHE_HOME"], True)
@@ -15,8 +15,10 @@
 
 import unittest
 from collections import namedtuple
+from unittest import mock
 
 from ripe.atlas.tools.aggregators.base import (
+    _get_natural_key,
     aggregate,
     ValueKeyAggregator,
     RangeKeyAggregator,
@@ -1286,3 +1288,95 @@ class TestAggregators(unittest.TestCase):
             ],
         }
         self.assertEqual(buckets, expected_output)
+
+    def test_equal_values_with_different_labels(self):
+        """Values that are equal but print differently get their own buckets."""
+        results = [self.Result(id=i, probe=None, rtt=rtt, source=None, prefix=None)
+                   for i, rtt in enumerate([34, 34.0, 34, True, 1])]
+        buckets = aggregate(results, [ValueKeyAggregator(key="rtt")])
+        self.assertEqual(
+            {key: [r.id for r in bucket] for key, bucket in buckets.items()},
+            {"RTT: 1": [4], "RTT: 34": [0, 2], "RTT: 34.0": [1], "RTT: True": [3]},
+        )
+
+    def test_same_label_for_different_values(self):
+        """Values that print the same share a bucket, in their original order."""
+        results = [self.Result(id=i, probe=None, rtt=rtt, source=None, prefix=None)
+                   for i, rtt in enumerate(["3333", 3333, "3333"])]
+        buckets = aggregate(results, [ValueKeyAggregator(key="rtt")])
+        self.assertEqual(list(buckets), ["RTT: 3333"])
+        self.assertEqual([r.id for r in buckets["RTT: 3333"]], [0, 1, 2])
+
+    def test_natural_order(self):
+        results = [
+            self.Result(id=i, probe=None, rtt=rtt, source=None, prefix=None)
+            for i, rtt in enumerate(["AS10", "AS9", "10.0.0.0/8", "9.0.0.0/8", None])
+        ]
+        buckets = aggregate(results, [ValueKeyAggregator(key="rtt")])
+        self.assertEqual(
+            list(buckets),
+            ["RTT: 9.0.0.0/8", "RTT: 10.0.0.0/8", "RTT: AS9", "RTT: AS10", "RTT: None"],
+        )
+        # Labels starting with text or numbers can be compared all the same
+        self.assertEqual(
+            sorted(["b", "10a", "9b", "a"], key=_get_natural_key),
+            ["9b", "10a", "a", "b"],
+        )
+
+    def test_range_boundaries(self):
+        """A value equal to a range limit falls into the bucket below it."""
+        aggregator = RangeKeyAggregator(key="rtt", ranges=[10, 20.5, 30])
+        self.assertEqual(
+            [
+                aggregator.get_label(aggregator.get_bucket_key(self.Result(
+                    id=1, probe=None, rtt=rtt, source=None, prefix=None
+                )))
+                for rtt in [31, 30, 25, 20.5, 20, 10, 9]
+            ],
+            [
+                "RTT: > 30",
+                "RTT: 20.5-30",
+                "RTT: 20.5-30",
+                "RTT: 10-20.5",
+                "RTT: 10-20.5",
+                "RTT: < 10",
+                "RTT: < 10",
+            ],
+        )
+
+    def test_range_indexes(self):
+        """Bulk bucketing agrees with bucketing one value at a time."""
+        aggregator = RangeKeyAggregator(key="rtt", ranges=[5, 10, 20.5, 30])
+        values = [-1, 0, 5, 5.1, 10, 15, 20.5, 29.9, 30, 30.1, 1000]
+        expected = [
+            aggregator.get_bucket_key(
+                self.Result(id=1, probe=None, rtt=v, source=None, prefix=None)
+            )
+            for v in values
+        ]
+        self.assertEqual(list(aggregator.get_range_indexes(values)), expected)
+        with mock.patch(
+            "ripe.atlas.tools.aggregators.base.get_numpy", return_value=None
+        ):
+            self.assertEqual(list(aggregator.get_range_indexes(values)), expected)
+
+    def test_range_missing(self):
+        """Entities without a value get a bucket of their own either way."""
+        aggregator = RangeKeyAggregator(key="rtt", ranges=[5, 10, 20.5, 30])
+        entities = [
+            self.Result(id=1, probe=None, rtt=v, source=None, prefix=None)
+            for v in [None, 1000, float("nan"), 7]
+        ]
+        expected = [aggregator.missing, 0, aggregator.missing, 3]
+        self.assertEqual(
+            [aggregator.get_bucket_key(entity) for entity in entities], expected
+        )
+        self.assertEqual(aggregator.get_bucket_keys(entities), expected)
+        with mock.patch(
+            "ripe.atlas.tools.aggregators.base.get_numpy", return_value=None
+        ):
+            self.assertEqual(aggregator.get_bucket_keys(entities), expected)
+
+        buckets = aggregate(entities, [aggregator])
+        self.assertEqual(list(buckets)[-1], "RTT: none")
+        self.assertEqual([e.id for e in buckets["RTT: none"]], [1, 1])
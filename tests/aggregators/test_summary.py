@@ -0,0 +1,100 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import warnings
+
+from ripe.atlas.cousteau import Probe
+from ripe.atlas.sagan import Result
+
+from ripe.atlas.tools.aggregators import (
+    OnlineAggregate,
+    RangeKeyAggregator,
+    ValueKeyAggregator,
+)
+
+from bench.generators import KINDS, Generator
+
+
+class TestOnlineAggregate(unittest.TestCase):
+    def get_results(self, kind, count=100):
+        generator = Generator(kind, count, probes=10)
+        probes = generator.get_probes()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for line in generator.lines():
+                result = Result.get(line)
+                result.probe = Probe(
+                    id=result.probe_id, meta_data=probes[result.probe_id]
+                )
+                yield result
+
+    def test_ping(self):
+        results = list(self.get_results("ping"))
+        summary = OnlineAggregate([ValueKeyAggregator("probe.country_code")])
+        summary.update(results)
+
+        self.assertEqual(len(summary), 100)
+        for key, bucket in summary.get_buckets():
+            in_bucket = [
+                r for r in results if "COUNTRY_CODE: " + r.probe.country_code == key
+            ]
+            rtts = [p.rtt for r in in_bucket for p in r.packets if p.rtt]
+            self.assertEqual(bucket.results, len(in_bucket))
+            self.assertEqual(bucket.sent, sum(r.packets_sent for r in in_bucket))
+            self.assertEqual(bucket.received, len(rtts))
+            self.assertEqual(bucket.rtt_min, min(rtts))
+            self.assertEqual(bucket.rtt_max, max(rtts))
+            self.assertAlmostEqual(bucket.rtt_average, sum(rtts) / len(rtts))
+
+        keys = [key for key, _ in summary.get_buckets()]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_no_rtt(self):
+        """Tests that pings without a single reply get a bucket of their own."""
+        results = list(self.get_results("ping", 20))
+        lost = Result.get(
+            '{"af":4,"prb_id":1,"result":[{"x":"*"},{"x":"*"},{"x":"*"}],'
+            '"ttl":20,"avg":-1,"size":20,"from":"1.2.3.4","proto":"ICMP",'
+            '"timestamp":1440000000,"dup":0,"type":"ping","sent":3,'
+            '"msm_id":1000001,"fw":4700,"max":-1,"step":360,"src_addr":"2.3.4.5",'
+            '"rcvd":0,"msm_name":"Ping","lts":40,"dst_name":"my.name.ca",'
+            '"min":-1,"dst_addr":"3.4.5.6"}'
+        )
+        self.assertIsNone(lost.rtt_median)
+
+        summary = OnlineAggregate([RangeKeyAggregator("rtt_median", [10, 100])])
+        summary.update(results + [lost])
+        buckets = summary.get_buckets()
+        self.assertEqual(buckets[-1][0], "RTT_MEDIAN: none")
+        self.assertEqual(buckets[-1][1].results, 1)
+        self.assertEqual(buckets[-1][1].loss, 100)
+        self.assertEqual(sum(bucket.results for _, bucket in buckets), 21)
+
+    def test_every_kind(self):
+        for kind in KINDS:
+            summary = OnlineAggregate()
+            summary.update(self.get_results(kind, 20))
+            self.assertEqual(list(summary.buckets), [OnlineAggregate.ALL])
+            bucket = summary.buckets[OnlineAggregate.ALL]
+            self.assertEqual(bucket.results, 20)
+            self.assertGreater(bucket.received, 0, kind)
+
+    def test_render(self):
+        summary = OnlineAggregate()
+        summary.update(self.get_results("http", 10))
+        lines = summary.render().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[2].split()[:3], ["All", "results", "10"])
@@ -16,6 +16,7 @@ from ripe.atlas.tools.commands.base import Command as BaseCommand
 
 class Command(BaseCommand):
     NAME = 'user-command-1'
+    DESCRIPTION = 'Do something of your own'
 """
 
 
@@ -27,6 +28,7 @@ class TestCommandLoading(unittest.TestCase):
         "measure",
         "measurement-info",
         "measurement-search",
+        "probe-cache",
         "probe-info",
         "probe-search",
         "report",
@@ -84,6 +86,48 @@ class TestCommandLoading(unittest.TestCase):
         unexpected_cmd = Command.load_command_class("no-such-command")
         self.assertIsNone(unexpected_cmd)
 
+    def test_manifest(self):
+        """
+        Tests that once the manifest is built, commands can be listed and
+        picked without importing any but the one that's picked.
+        """
+        with open(os.path.join(self.user_command_path, "broken.py"), "w") as f:
+            f.write("import no_such_module\n")
+
+        cache_home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_home)
+
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}), mock.patch(
+            "ripe.atlas.tools.commands.base.Command._get_user_command_path",
+            return_value=self.user_command_path,
+        ), mock.patch.object(Command, "_commands", None):
+            Command.get_manifest()
+            Command._commands = None
+
+            with mock.patch.object(
+                Command, "_import_command_class", return_value=Command
+            ) as import_command_class:
+                manifest = Command.get_manifest()
+                self.assertEqual(
+                    manifest["user_command_1"],
+                    {
+                        "module": "user_command_1",
+                        "name": "user-command-1",
+                        "description": "Do something of your own",
+                    },
+                )
+                self.assertEqual(manifest["broken"]["description"], "")
+                self.assertEqual(
+                    manifest["measurement_info"]["description"],
+                    "Return the meta data for one measurement",
+                )
+                import_command_class.assert_not_called()
+
+                Command.load_command_class("measurement-info")
+                import_command_class.assert_called_once_with(
+                    "ripe.atlas.tools.commands.measurement_info"
+                )
+
     def test_deprecated_aliases(self):
         aliases = [
             ("measurement", "measurement-info"),
@@ -0,0 +1,168 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+
+from ripe.atlas.tools.commands.probe_cache import Command
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.filters import Probe
+
+from ..base import capture_sys_output
+from ..test_cache import TemporaryLocalCache, TemporarySQLiteCache
+
+
+class ProbeCacheTestsMixin(object):
+
+    CACHE_CLASS = None
+
+    PROBES = [
+        {"id": 1, "country_code": "NL", "asn_v4": 3333},
+        {"id": 2, "country_code": "GR", "asn_v4": 3337},
+        {"id": 3, "country_code": "DE", "asn_v4": None},
+    ]
+
+    def setUp(self):
+        self.cache = self.CACHE_CLASS()
+        self.addCleanup(self.cache.test_cleanup)
+        for path in (
+            "ripe.atlas.tools.commands.probe_cache.cache",
+            "ripe.atlas.tools.filters.cache",
+        ):
+            patcher = mock.patch(path, self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_command(self, args, stdin=""):
+        cmd = Command()
+        cmd.init_args(args)
+        with capture_sys_output() as (stdout, stderr):
+            with mock.patch("sys.stdin", StringIO(stdin)):
+                cmd.run()
+        return stdout.getvalue()
+
+    def assertCached(self, probes):
+        with mock.patch("ripe.atlas.tools.filters.ProbeRequest") as mock_request:
+            cached = Probe.get_many([probe["id"] for probe in probes])
+        self.assertEqual(mock_request.call_count, 0)
+        self.assertEqual([probe.meta_data for probe in cached], probes)
+
+    def test_import_json_list(self):
+        output = self.run_command(["import"], stdin=json.dumps(self.PROBES))
+        self.assertEqual(output, "Imported 3 probes into the local cache.\n")
+        self.assertCached(self.PROBES)
+
+    def test_import_json_lines(self):
+        lines = "".join(json.dumps(probe) + "\n" for probe in self.PROBES)
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as f:
+            f.write(lines)
+            f.flush()
+            self.run_command(["import", f.name])
+        self.assertCached(self.PROBES)
+
+    def test_import_archive(self):
+        archive = {"meta": {"total_count": 3}, "objects": self.PROBES}
+        self.run_command(["import"], stdin=json.dumps(archive))
+        self.assertCached(self.PROBES)
+
+    def test_import_archive_indented(self):
+        archive = {"meta": {"total_count": 3}, "objects": self.PROBES}
+        output = self.run_command(["import"], stdin=json.dumps(archive, indent=2))
+        self.assertEqual(output, "Imported 3 probes into the local cache.\n")
+        self.assertCached(self.PROBES)
+
+    def test_import_archive_records(self):
+        """Tests that probes in the archive's own shape come out as the API's."""
+        record = {
+            "id": 1,
+            "asn_v4": 3333,
+            "country_code": "NL",
+            "is_anchor": False,
+            "status": 1,
+            "status_name": "Connected",
+            "status_since": 1767225600,
+            "tags": ["system-v3", "system-ipv4-works"],
+            "type": "Probe",
+        }
+        archive = {"meta": {"total_count": 1}, "objects": [record]}
+        self.run_command(["import"], stdin=json.dumps(archive))
+
+        probe = self.cache.get("probe:1")
+        self.assertEqual(probe.status, "Connected")
+        self.assertEqual(
+            probe.meta_data["status"],
+            {"id": 1, "name": "Connected", "since": 1767225600},
+        )
+        self.assertEqual(
+            [tag["slug"] for tag in probe.tags], ["system-v3", "system-ipv4-works"]
+        )
+        self.assertNotIn("status_name", probe.meta_data)
+
+    def test_import_expiry(self):
+        self.run_command(["import"], stdin=json.dumps(self.PROBES[:1]))
+        self.run_command(
+            ["import", "--never-expire"], stdin=json.dumps(self.PROBES[1:])
+        )
+        self.cache._memory.clear()
+        self.cache._now += datetime.timedelta(seconds=Probe.EXPIRE_TIME + 1)
+        self.assertEqual(len(self.cache.get_many(["probe:1", "probe:2"])), 1)
+
+    def test_import_invalid(self):
+        for payload in ('[{"country_code": "NL"}]', "[1, 2]", '{"id": 1}\n{'):
+            with self.assertRaises(RipeAtlasToolsException):
+                self.run_command(["import"], stdin=payload)
+
+    def test_export(self):
+        self.run_command(["import"], stdin=json.dumps(self.PROBES))
+        output = self.run_command(["export"])
+        exported = sorted(
+            (json.loads(line) for line in output.splitlines()),
+            key=lambda probe: probe["id"],
+        )
+        self.assertEqual(exported, self.PROBES)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "probes.jsonl")
+            output = self.run_command(["export", path])
+            self.assertEqual(output, "Exported 3 probes to {}.\n".format(path))
+            with open(path) as f:
+                self.assertEqual(len(f.readlines()), 3)
+
+
+class TestProbeCacheCommand(ProbeCacheTestsMixin, unittest.TestCase):
+
+    CACHE_CLASS = TemporaryLocalCache
+
+    def test_no_action(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.run_command([])
+
+
+class TestProbeCacheCommandSQLite(ProbeCacheTestsMixin, unittest.TestCase):
+
+    CACHE_CLASS = TemporarySQLiteCache
+
+    def test_import_atomic(self):
+        """Tests that a broken import leaves nothing behind."""
+        payload = json.dumps(self.PROBES + [{"country_code": "NL"}])
+        with self.assertRaises(RipeAtlasToolsException):
+            self.run_command(["import"], stdin=payload)
+        self.assertIsNone(self.cache.get("probe:1"))
+        self.assertEqual(self.cache.keys("probe"), [])
@@ -16,8 +16,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import copy
+import datetime
 import json
 import os
+import shutil
 import sys
 import tempfile
 import unittest
@@ -29,8 +31,10 @@ from ripe.atlas.cousteau import Probe
 
 from ripe.atlas.tools.commands.report import Command
 from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.paging import get_timestamp
 from ripe.atlas.tools.renderers import Renderer
 from ripe.atlas.tools.settings import AliasesDB
+from ripe.atlas.tools.store import ResultsStore
 from ..base import capture_sys_output
 
 
@@ -290,7 +294,8 @@ class TestReportCommand(unittest.TestCase):
         "\n"
         "--- hsi.cablecom.ch ping statistics ---\n"
         "27 packets transmitted, 27 received, 0.0% loss\n"
-        "rtt min/med/avg/max = 10.858/34.376/42.948/91.000 ms\n"
+        "rtt min/avg/max = 10.858/36.767/91.000 ms\n"
+        "rtt p50/p90/p99 = 28.504/62.183/87.365 ms\n"
     )
 
     def setUp(self):
@@ -565,7 +570,8 @@ class TestReportCommand(unittest.TestCase):
             "\n"
             "--- hsi.cablecom.ch ping statistics ---\n"
             "27 packets transmitted, 27 received, 0.0% loss\n"
-            "rtt min/med/avg/max = 10.858/34.376/42.948/91.000 ms\n"
+            "rtt min/avg/max = 10.858/36.767/91.000 ms\n"
+            "rtt p50/p90/p99 = 28.504/62.183/87.365 ms\n"
         )
         probes = [
             Probe(
@@ -621,6 +627,254 @@ class TestReportCommand(unittest.TestCase):
                         expected_output.split("\n"), stdout.getvalue().split("\n")
                     )
 
+    def test_summary(self):
+        """Test case where results are summarised per bucket."""
+        probes = [
+            Probe(id=pk, meta_data={"country_code": country})
+            for pk, country in (
+                (202, "GR"),
+                (677, "DE"),
+                (2225, "DE"),
+                (165, "NL"),
+                (1216, "GR"),
+                (270, "GR"),
+                (579, "GR"),
+                (945, "GR"),
+                (879, "GR"),
+            )
+        ]
+
+        with capture_sys_output() as (stdout, stderr):
+            path = "ripe.atlas.cousteau.AtlasRequest.get"
+            with mock.patch(path) as mock_get:
+                mock_get.side_effect = [(True, self.mocked_results)]
+                mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                with mock.patch(mpath) as mock_get_many:
+                    mock_get_many.return_value = probes
+                    self.cmd.init_args(["1", "--aggregate-by", "country", "--summary"])
+                    self.cmd.run()
+
+        lines = stdout.getvalue().split("\n")
+        self.assertEqual(lines[0].split()[:3], ["Bucket", "Results", "Loss%"])
+        self.assertEqual(
+            [line.split()[:4] for line in lines[2:-1]],
+            [
+                ["COUNTRY_CODE:", "DE", "2", "0.0"],
+                ["COUNTRY_CODE:", "GR", "6", "0.0"],
+                ["COUNTRY_CODE:", "NL", "1", "0.0"],
+            ],
+        )
+        # Duplicate replies count neither as packets nor as RTTs
+        self.assertEqual(lines[2].split()[4], "10.858")
+        self.assertEqual(lines[2].split()[-2], "40.715")
+
+    def test_time_window_from_file(self):
+        """Results in a file are limited by --start-time, --stop-time & --type."""
+        lines = [json.dumps(result) for result in self.mocked_results]
+        lines.insert(
+            1,
+            json.dumps(
+                {"type": "traceroute", "timestamp": 1445025450, "prb_id": 1216}
+            ),
+        )
+        temp_file = tempfile.NamedTemporaryFile(mode="w", delete=False)
+        try:
+            temp_file.write("\n".join(lines) + "\n")
+            temp_file.close()
+            with capture_sys_output() as (stdout, stderr):
+                mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                with mock.patch(mpath) as mock_get_many:
+                    mock_get_many.side_effect = lambda ids: [
+                        Probe(id=pk, meta_data={}) for pk in ids
+                    ]
+                    self.cmd.init_args(
+                        [
+                            "--from-file",
+                            temp_file.name,
+                            "--start-time",
+                            "2015-10-16T19:56:00",
+                            "--stop-time",
+                            "2015-10-16T19:58:35",
+                            "--type",
+                            "ping",
+                            "--summary",
+                        ]
+                    )
+                    self.cmd.run()
+        finally:
+            os.unlink(temp_file.name)
+
+        lines = stdout.getvalue().split("\n")
+        self.assertEqual(lines[2].split()[:3], ["All", "results", "3"])
+        self.assertEqual(
+            sorted(pk for call in mock_get_many.call_args_list for pk in call.args[0]),
+            [270, 945, 1216],
+        )
+
+    def test_nothing_left_from_file(self):
+        """Filtering out every result fails as an empty file does."""
+        lines = "".join(json.dumps(result) + "\n" for result in self.mocked_results)
+        for args in (
+            ["--type", "traceroute"],
+            ["--start-time", "2016-01-01"],
+            ["--stop-time", "2015-01-01", "--summary"],
+        ):
+            with mock.patch("sys.stdin", StringIO(lines)):
+                cmd = Command()
+                cmd.init_args(args)
+                with self.assertRaises(RipeAtlasToolsException) as e:
+                    cmd.run()
+            self.assertEqual(
+                str(e.exception), "There aren't any results for your request."
+            )
+
+    def test_type_from_api(self):
+        """Results from the API of another --type are skipped as well."""
+        results = list(self.mocked_results)
+        results.insert(
+            1, {"type": "traceroute", "timestamp": 1445025450, "prb_id": 1216}
+        )
+
+        def run(args):
+            cmd = Command()
+            with capture_sys_output() as (stdout, stderr):
+                mpath = "ripe.atlas.cousteau.AtlasRequest.get"
+                with mock.patch(mpath) as mock_get:
+                    mock_get.side_effect = [(True, results)]
+                    mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                    with mock.patch(mpath) as mock_get_many:
+                        mock_get_many.side_effect = lambda ids: [
+                            Probe(id=pk, meta_data={}) for pk in ids
+                        ]
+                        cmd.init_args(["1"] + args)
+                        cmd.run()
+            return stdout.getvalue()
+
+        output = run(["--type", "ping", "--summary"])
+        self.assertEqual(
+            output.split("\n")[2].split()[:3],
+            ["All", "results", str(len(self.mocked_results))],
+        )
+
+        # Not a single result of that type
+        results = [r for r in results if r["type"] == "ping"]
+        with self.assertRaises(RipeAtlasToolsException):
+            run(["--type", "traceroute"])
+
+    def test_slices(self):
+        """Test case where results are fetched an hour at a time."""
+        slices = []
+
+        def get(request):
+            slices.append(request.start)
+            hour = request.start.hour
+            return True, self.mocked_results[hour * 3:hour * 3 + 3]
+
+        with capture_sys_output() as (stdout, stderr):
+            path = "ripe.atlas.tools.paging.SessionResultsRequest.get"
+            with mock.patch(path, autospec=True, side_effect=get):
+                mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                with mock.patch(mpath) as mock_get_many:
+                    mock_get_many.side_effect = lambda ids: [
+                        Probe(id=pk, meta_data={}) for pk in ids
+                    ]
+                    self.cmd.init_args(
+                        [
+                            "1",
+                            "--start-time",
+                            "2015-10-16T00:00:00",
+                            "--stop-time",
+                            "2015-10-16T02:59:59",
+                            "--slice-hours",
+                            "1",
+                        ]
+                    )
+                    self.cmd.run()
+
+        self.assertEqual(len(slices), 3)
+        self.assertEqual(stdout.getvalue(), self.expected_output_no_aggr)
+
+    def test_slices_need_start(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.cmd.init_args(["1", "--slice-hours", "1"])
+            self.cmd.run()
+
+    def test_sync(self):
+        """Test case where results are kept in, and read from, the store."""
+        cache_home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_home)
+        args = [
+            "1",
+            "--start-time",
+            "2015-10-16T00:00:00",
+            "--stop-time",
+            "2015-10-16T23:59:59",
+        ]
+
+        def run(args):
+            with capture_sys_output() as (stdout, stderr):
+                path = "ripe.atlas.tools.paging.SessionResultsRequest.get"
+                with mock.patch(path) as mock_get:
+                    mock_get.return_value = (True, self.mocked_results)
+                    mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                    with mock.patch(mpath) as mock_get_many:
+                        mock_get_many.side_effect = lambda ids: [
+                            Probe(id=pk, meta_data={}) for pk in ids
+                        ]
+                        cmd = Command()
+                        cmd.init_args(args)
+                        cmd.run()
+            return stdout.getvalue(), mock_get.call_count
+
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+            self.assertEqual(
+                run(args + ["--sync"]), (self.expected_output_no_aggr, 1)
+            )
+            self.assertEqual(run(args), (self.expected_output_no_aggr, 0))
+            # Nothing new since the last sync
+            with self.assertRaises(RipeAtlasToolsException):
+                run(["1", "--sync", "--stop-time", "2015-10-16T23:59:59"])
+
+    def test_sync_uncovered(self):
+        """
+        Test case where the store doesn't have the whole window, so the
+        results are fetched as usual, for just the probes asked for.
+        """
+        cache_home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_home)
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+            ResultsStore(1).add(
+                self.mocked_results,
+                get_timestamp(datetime.datetime(2015, 10, 16)),
+                get_timestamp(datetime.datetime(2015, 10, 16, 23, 59, 59)),
+            )
+            with capture_sys_output():
+                path = "ripe.atlas.tools.commands.report.AtlasResultsRequest"
+                with mock.patch(path) as mock_request:
+                    mock_request.return_value.get.return_value = (
+                        True,
+                        self.mocked_results,
+                    )
+                    mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                    with mock.patch(mpath) as mock_get_many:
+                        mock_get_many.side_effect = lambda ids: [
+                            Probe(id=pk, meta_data={}) for pk in ids
+                        ]
+                        cmd = Command()
+                        cmd.init_args(
+                            [
+                                "1",
+                                "--start-time",
+                                "2015-10-16T00:00:00",
+                                "--stop-time",
+                                "2015-10-17T23:59:59",
+                                "--probes",
+                                "165",
+                            ]
+                        )
+                        cmd.run()
+            self.assertEqual(mock_request.call_args[1]["probe_ids"], [165])
+
     def test_asns_filter(self):
         """Test case where user specified probe asns filters.."""
         expected_output = (
@@ -630,7 +884,8 @@ class TestReportCommand(unittest.TestCase):
             "\n"
             "--- hsi.cablecom.ch ping statistics ---\n"
             "6 packets transmitted, 6 received, 0.0% loss\n"
-            "rtt min/med/avg/max = 23.269/74.638/62.534/91.000 ms\n"
+            "rtt min/avg/max = 23.269/62.534/91.000 ms\n"
+            "rtt p50/p90/p99 = 62.183/87.365/87.365 ms\n"
         )
 
         probes = [
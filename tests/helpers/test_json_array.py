@@ -0,0 +1,116 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import unittest
+from io import StringIO
+
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.helpers.json_array import iter_json_array, iter_json_values
+
+
+class TestJSONArrayHelper(unittest.TestCase):
+
+    RESULTS = [
+        {"prb_id": 1, "type": "ping", "result": [{"rtt": 1.5}, {"x": "*"}]},
+        {"prb_id": 2, "type": "ping", "dst_name": "a, b ] c [", "result": []},
+        12345,
+        "string",
+        [],
+    ]
+
+    def parse(self, payload, chunk_size):
+        f = StringIO(payload)
+        self.assertEqual(f.read(1), "[")
+        return list(iter_json_array(f, chunk_size=chunk_size))
+
+    def test_iter_json_array(self):
+        for payload in (
+            json.dumps(self.RESULTS),
+            json.dumps(self.RESULTS, indent=2),
+        ):
+            for chunk_size in (1, 2, 7, 64, 1024):
+                self.assertEqual(self.parse(payload, chunk_size), self.RESULTS)
+
+    def test_numbers(self):
+        """Tests that numbers cut off between chunks are read whole."""
+        numbers = [1.5, 22.25, -3e-2, 400, 1.25e10, 0]
+        for chunk_size in (1, 2, 3):
+            self.assertEqual(self.parse(json.dumps(numbers), chunk_size), numbers)
+            lines = StringIO("\n".join(json.dumps(n) for n in numbers))
+            self.assertEqual(
+                list(iter_json_values(lines, chunk_size=chunk_size)), numbers
+            )
+            archive = StringIO(json.dumps({"objects": [1], "latitude": 52.3567}))
+            self.assertEqual(
+                list(iter_json_values(archive, chunk_size=chunk_size, unwrap=())),
+                [{"objects": [1], "latitude": 52.3567}],
+            )
+
+    def test_empty(self):
+        self.assertEqual(self.parse("[]", 1), [])
+        self.assertEqual(self.parse("[ \n ]", 1), [])
+
+    def test_incomplete(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.parse('[{"prb_id": 1}, {"prb_id"', 4)
+        with self.assertRaises(RipeAtlasToolsException):
+            self.parse('[{"prb_id": 1}', 4)
+
+    def test_invalid(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.parse('[{"prb_id": 1} {"prb_id": 2}]', 4)
+        with self.assertRaises(RipeAtlasToolsException):
+            self.parse('[{"prb_id": 1},, {"prb_id": 2}]', 4)
+
+    def test_iter_json_values(self):
+        lines = "\n".join(json.dumps(result) for result in self.RESULTS)
+        for payload in (json.dumps(self.RESULTS), "  \n" + lines + "\n\n"):
+            self.assertEqual(
+                list(iter_json_values(StringIO(payload), chunk_size=7)),
+                self.RESULTS,
+            )
+        self.assertEqual(list(iter_json_values(StringIO(""))), [])
+        with self.assertRaises(RipeAtlasToolsException):
+            list(iter_json_values(StringIO('{"prb_id": 1}\n{"prb_id"\n')))
+
+    def test_iter_json_values_archive(self):
+        """Tests that the array in a wrapping object is streamed as well."""
+        archive = {"meta": {"total_count": 5}, "objects": self.RESULTS, "x": []}
+        for payload in (json.dumps(archive), json.dumps(archive, indent=2)):
+            for chunk_size in (1, 7, 1024):
+                self.assertEqual(
+                    list(iter_json_values(StringIO(payload), chunk_size=chunk_size)),
+                    self.RESULTS,
+                )
+
+        # Objects without an array to unwrap come through as they are
+        lines = '{"id": 1, "objects": 2}\n{}\n{"results": [3, 4]}\n'
+        self.assertEqual(
+            list(iter_json_values(StringIO(lines), chunk_size=3)),
+            [{"id": 1, "objects": 2}, {}, 3, 4],
+        )
+
+        for payload in ('{"objects": [1, 2}', '{"objects" [1]}', '{"a": 1,}', "{1: 2}"):
+            with self.assertRaises(RipeAtlasToolsException):
+                list(iter_json_values(StringIO(payload)))
+
+    def test_iter_json_values_lazy(self):
+        """Tests that an archive is read as it's consumed, not all at once."""
+        archive = json.dumps({"objects": [{"id": i} for i in range(1000)]}, indent=2)
+        f = StringIO(archive)
+        values = iter_json_values(f, chunk_size=64)
+        self.assertEqual(next(values), {"id": 0})
+        self.assertLess(f.tell(), 200)
@@ -0,0 +1,89 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ripe.atlas.tools.helpers.manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.modules = os.path.join(self.path, "modules")
+        os.mkdir(self.modules)
+        self.touch("first.py", 1)
+
+        patcher = mock.patch.dict(
+            os.environ, {"XDG_CACHE_HOME": os.path.join(self.path, "cache")}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.builds = 0
+
+    def touch(self, name, mtime):
+        path = os.path.join(self.modules, name)
+        with open(path, "w"):
+            pass
+        os.utime(path, (mtime, mtime))
+        os.utime(self.modules, (mtime, mtime))
+
+    def build(self):
+        self.builds += 1
+        return {"names": sorted(os.listdir(self.modules))}
+
+    def get(self):
+        return Manifest("things", [self.modules]).get(self.build)
+
+    def test_cached(self):
+        self.assertEqual(self.get(), {"names": ["first.py"]})
+        self.assertEqual(self.get(), {"names": ["first.py"]})
+        self.assertEqual(self.builds, 1)
+
+    def test_invalidated(self):
+        """Tests that adding, changing or upgrading means a new build."""
+        self.get()
+        self.touch("second.py", 2)
+        self.assertEqual(self.get(), {"names": ["first.py", "second.py"]})
+        self.touch("second.py", 3)
+        self.get()
+        self.assertEqual(self.builds, 3)
+
+        with mock.patch(
+            "ripe.atlas.tools.helpers.manifest.__version__", "0.0.0"
+        ):
+            self.get()
+        self.assertEqual(self.builds, 4)
+
+    def test_unsaved(self):
+        """Tests that a cache we can't write to only costs us a rebuild."""
+        with open(os.path.join(self.path, "cache"), "w"):
+            pass
+        self.assertEqual(self.get(), {"names": ["first.py"]})
+        self.get()
+        self.assertEqual(self.builds, 2)
+
+    def test_corrupt(self):
+        self.get()
+        path = os.path.join(self.path, "cache", "ripe-atlas-tools", "things.json")
+        with open(path, "w") as f:
+            f.write("{")
+        self.assertEqual(self.get(), {"names": ["first.py"]})
+        self.assertEqual(self.builds, 2)
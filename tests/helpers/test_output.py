@@ -0,0 +1,82 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import unittest
+from io import StringIO
+from unittest import mock
+
+from ripe.atlas.tools.helpers.output import BufferedOutput
+from ripe.atlas.tools.renderers.raw import Renderer
+
+
+class Stream(StringIO):
+    """A StringIO that keeps track of each write it gets."""
+
+    def __init__(self, tty=False):
+        StringIO.__init__(self)
+        self.tty = tty
+        self.writes = []
+        self.flushed = threading.Event()
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        self.writes.append(text)
+        return StringIO.write(self, text)
+
+    def flush(self):
+        self.flushed.set()
+
+
+class TestBufferedOutput(unittest.TestCase):
+    def test_blocks(self):
+        """Tests that output is passed on in blocks when not on a terminal."""
+        stream = Stream()
+        with BufferedOutput(stream, buffer_size=10) as output:
+            for _ in range(7):
+                output.write("abc\n")
+            self.assertEqual(stream.writes, ["abc\nabc\nabc\n", "abc\nabc\nabc\n"])
+        self.assertEqual(stream.writes[-1], "abc\n")
+        self.assertEqual(stream.getvalue(), "abc\n" * 7)
+
+    def test_tty(self):
+        """Tests that terminals get whole lines as soon as they're written."""
+        stream = Stream(tty=True)
+        output = BufferedOutput(stream)
+        self.assertTrue(output.line_buffered)
+        output.write("ab")
+        self.assertEqual(stream.writes, [])
+        output.write("c\n")
+        self.assertEqual(stream.writes, ["abc\n"])
+
+    def test_flush_interval(self):
+        """Tests that nothing is held back for longer than flush_interval."""
+        stream = Stream()
+        output = BufferedOutput(stream, flush_interval=0.01)
+        output.write("abc\n")
+        self.assertTrue(stream.flushed.wait(5))
+        self.assertEqual(stream.writes, ["abc\n"])
+        self.assertIsNone(output._timer)
+
+    def test_render(self):
+        """Tests that a renderer writes a whole block of results at once."""
+        stream = Stream()
+        results = [mock.Mock(raw_data={"prb_id": i}, probe_id=i) for i in range(10)]
+        with mock.patch("sys.stdout", stream):
+            Renderer().render(results)
+        self.assertEqual(len(stream.writes), 1)
+        self.assertEqual(stream.getvalue().count("\n"), 10)
@@ -0,0 +1,76 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+from ripe.atlas.tools.helpers.profiling import ImportTimer, StartupProfile
+
+
+class TestStartupProfile(unittest.TestCase):
+    def start(self, argv, env=""):
+        with mock.patch.dict(os.environ, {"RIPE_ATLAS_PROFILE": env}):
+            profile = StartupProfile.start(argv)
+        if profile.enabled:
+            atexit.unregister(profile.report)
+            self.addCleanup(self.stop)
+        return profile
+
+    @staticmethod
+    def stop():
+        sys.meta_path[:] = [
+            f for f in sys.meta_path if not isinstance(f, ImportTimer)
+        ]
+
+    def test_disabled(self):
+        argv = ["ripe-atlas", "report", "1"]
+        profile = self.start(argv)
+        self.assertFalse(profile.enabled)
+        self.assertEqual(argv, ["ripe-atlas", "report", "1"])
+        self.assertFalse(any(isinstance(f, ImportTimer) for f in sys.meta_path))
+
+    def test_enabled(self):
+        argv = ["ripe-atlas", "report", "--profile-startup", "1"]
+        self.assertTrue(self.start(argv).enabled)
+        self.assertEqual(argv, ["ripe-atlas", "report", "1"])
+        self.assertTrue(self.start(["ripe-atlas"], env="1").enabled)
+        self.assertFalse(self.start(["ripe-atlas"], env="0").enabled)
+
+    def test_report(self):
+        """Tests that phases and (nested) imports are timed and reported."""
+        profile = self.start(["ripe-atlas", "--profile-startup"])
+        sys.modules.pop("colorsys", None)
+        sys.modules.pop("json.tool", None)
+        with profile.phase("importing"):
+            import colorsys  # noqa: F401
+            import json.tool  # noqa: F401
+
+        names = [name for name, _, _ in profile.imports]
+        self.assertIn("colorsys", names)
+        self.assertIn("json.tool", names)
+        self.assertEqual([name for name, _ in profile.phases], ["importing"])
+        for _, elapsed, own in profile.imports:
+            self.assertLessEqual(own, elapsed)
+
+        profile.stream = io.StringIO()
+        profile.report()
+        report = profile.stream.getvalue()
+        self.assertIn("Startup profile:", report)
+        self.assertIn("ms  importing\n", report)
+        self.assertIn("ms  colorsys\n", report)
@@ -0,0 +1,70 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+
+from ripe.atlas.tools.helpers.sketch import QuantileSketch
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.values = [rng.lognormvariate(3, 1) for _ in range(10000)]
+
+    def assertClose(self, sketch, values):
+        values = sorted(values)
+        for q in (0, 0.1, 0.5, 0.9, 0.99, 1):
+            expected = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(
+                sketch.quantile(q), expected, delta=expected * sketch.accuracy
+            )
+
+    def test_quantile(self):
+        sketch = QuantileSketch()
+        sketch.update(self.values)
+        self.assertEqual(len(sketch), 10000)
+        self.assertClose(sketch, self.values)
+        # Memory depends on the spread of the values, not how many there are
+        self.assertLess(len(sketch.bins), 600)
+
+    def test_merge(self):
+        first, second = QuantileSketch(), QuantileSketch()
+        first.update(self.values[:3000])
+        second.update(self.values[3000:])
+        first.merge(second)
+        self.assertEqual(len(first), 10000)
+        self.assertClose(first, self.values)
+
+        with self.assertRaises(ValueError):
+            first.merge(QuantileSketch(accuracy=0.05))
+
+    def test_zeros_and_empty(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        sketch.update([0, 0, 0, 10])
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertAlmostEqual(sketch.quantile(1), 10, delta=0.1)
+
+    def test_extremes(self):
+        """Tests that the ends are exact, even after a merge."""
+        first, second = QuantileSketch(), QuantileSketch()
+        first.update([154.845, 60])
+        second.update([20.5, 90])
+        self.assertEqual(first.quantile(1), 154.845)
+        first.merge(second)
+        self.assertEqual((first.min, first.max), (20.5, 154.845))
+        self.assertEqual(first.quantile(0), 20.5)
+        self.assertEqual(first.quantile(1), 154.845)
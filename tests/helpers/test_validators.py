@@ -58,6 +58,20 @@ class TestArgumentTypeHelper(unittest.TestCase):
         with self.assertRaises(argparse.ArgumentTypeError):
             ArgumentType.comma_separated_integers(maximum=5)("1,2,3,4,6")
 
+    def test_comma_separated_numbers(self):
+
+        self.assertEqual(
+            [0.5, 1, 2], ArgumentType.comma_separated_numbers()("0.5,1.0,2")
+        )
+        self.assertIsInstance(ArgumentType.comma_separated_numbers()("1.0")[0], int)
+
+        with self.assertRaises(argparse.ArgumentTypeError):
+            ArgumentType.comma_separated_numbers()("1,2.5,pizza!")
+        with self.assertRaises(argparse.ArgumentTypeError):
+            ArgumentType.comma_separated_numbers(minimum=0)("-0.5,1")
+        with self.assertRaises(argparse.ArgumentTypeError):
+            ArgumentType.comma_separated_numbers(maximum=5)("1,5.5")
+
     def test_datetime(self):
 
         d = datetime.datetime(2015, 12, 1)
@@ -0,0 +1,149 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import builtins
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from ripe.atlas.tools.renderers.base import ArgumentRecorder, Renderer, get_template
+
+from ..base import capture_sys_output
+
+
+class TestRenderTemplate(unittest.TestCase):
+    def setUp(self):
+        get_template.cache_clear()
+        self.addCleanup(get_template.cache_clear)
+
+    def test_read_once(self):
+        """Tests that a template is only read from disk the first time."""
+        kwargs = {"target": "example.com", "sent": 3, "received": 2, "packet_loss": 1.0}
+        kwargs.update(min=1, mean=2, max=3, p50=2, p90=3, p99=3)
+        with mock.patch("builtins.open", wraps=builtins.open) as mock_open:
+            first = Renderer.render_template("reports/aggregate_ping.txt", **kwargs)
+            kwargs["target"] = "example.net"
+            second = Renderer.render_template("reports/aggregate_ping.txt", **kwargs)
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertIn("--- example.com ping statistics ---", first)
+        self.assertIn("--- example.net ping statistics ---", second)
+
+    def test_missing(self):
+        with self.assertRaises(FileNotFoundError):
+            Renderer.render_template("reports/missing.txt")
+
+
+class TestArgumentRecorder(unittest.TestCase):
+    def test_round_trip(self):
+        """Tests that recorded arguments replay onto a parser as they were."""
+
+        def add_arguments(parser):
+            parser.add_argument("--top", action="store_true")
+            group = parser.add_argument_group(title="Things")
+            group.add_argument("--radius", type=int, default=3, metavar="RADIUS")
+
+        spec = ArgumentRecorder.record(add_arguments)
+        parser = argparse.ArgumentParser()
+        ArgumentRecorder.replay(spec, parser)
+        self.assertEqual(
+            vars(parser.parse_args(["--radius", "5"])), {"top": False, "radius": 5}
+        )
+        self.assertEqual(parser._action_groups[-1].title, "Things")
+
+    def test_unrecordable(self):
+        def add_arguments(parser):
+            parser.add_argument("--when", type=lambda value: value)
+
+        self.assertIsNone(ArgumentRecorder.record(add_arguments))
+
+    def test_unknown_method(self):
+        def add_arguments(parser):
+            group = parser.add_mutually_exclusive_group()
+            group.add_argument("--up", action="store_true")
+
+        self.assertIsNone(ArgumentRecorder.record(add_arguments))
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        patcher = mock.patch.dict(
+            os.environ, {"HOME": path, "XDG_CACHE_HOME": path, "XDG_CONFIG_HOME": path}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_imports(self):
+        """Tests that renderers are only imported to build the manifest."""
+        available = Renderer.get_available()
+        self.assertIn("traceroute_aspath", available)
+        self.assertNotIn("base", available)
+
+        with mock.patch.object(Renderer, "get_renderer_by_name") as get_renderer:
+            self.assertEqual(Renderer.get_available(), available)
+            parser = argparse.ArgumentParser()
+            Renderer.add_arguments_for_available_renderers(parser)
+        get_renderer.assert_not_called()
+        arguments = parser.parse_args(["--traceroute-aspath-radius", "2"])
+        self.assertEqual(arguments.traceroute_aspath_radius, 2)
+
+    def test_unrecordable_plugin(self):
+        """
+        Tests that a user's renderer whose arguments can't be recorded still
+        gets them added, by importing it.
+        """
+        renderers = os.path.join(
+            os.environ["XDG_CONFIG_HOME"], "ripe-atlas-tools", "renderers"
+        )
+        os.makedirs(renderers)
+        open(os.path.join(renderers, "__init__.py"), "w").close()
+        with open(os.path.join(renderers, "exclusive.py"), "w") as f:
+            f.write(PLUGIN)
+
+        self.addCleanup(sys.modules.pop, "renderers", None)
+        self.addCleanup(sys.modules.pop, "renderers.exclusive", None)
+        patcher = mock.patch.object(sys, "path", list(sys.path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        importlib.invalidate_caches()
+
+        self.assertIsNone(Renderer.get_manifest()["exclusive"])
+        self.assertIn("exclusive", Renderer.get_available())
+        parser = argparse.ArgumentParser()
+        Renderer.add_arguments_for_available_renderers(parser)
+        self.assertTrue(parser.parse_args(["--exclusive-up"]).exclusive_up)
+        with self.assertRaises(SystemExit), capture_sys_output():
+            parser.parse_args(["--exclusive-up", "--exclusive-down"])
+
+
+PLUGIN = """
+from ripe.atlas.tools.renderers.base import Renderer as BaseRenderer
+
+
+class Renderer(BaseRenderer):
+    RENDERS = [BaseRenderer.TYPE_PING]
+
+    @staticmethod
+    def add_arguments(parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--exclusive-up", action="store_true")
+        group.add_argument("--exclusive-down", action="store_true")
+"""
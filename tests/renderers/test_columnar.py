@@ -0,0 +1,189 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ripe.atlas.cousteau import Probe
+from ripe.atlas.sagan import Result
+
+from ripe.atlas.tools.commands.report import Command
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.renderers.columnar import Renderer
+from ..base import capture_sys_output
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def get_ping(prb_id, timestamp, rtts):
+    replies = [rtt for rtt in rtts if rtt]
+    return {
+        "af": 4,
+        "prb_id": prb_id,
+        "result": [{"rtt": rtt} if rtt else {"x": "*"} for rtt in rtts],
+        "timestamp": timestamp,
+        "type": "ping",
+        "msm_id": 1000192,
+        "fw": 4700,
+        "from": "109.190.83.40",
+        "dst_addr": "62.2.16.24",
+        "dst_name": "hsi.cablecom.ch",
+        "src_addr": "192.168.103.132",
+        "sent": len(rtts),
+        "rcvd": len(replies),
+        "min": min(replies, default=-1),
+        "avg": sum(replies) / len(replies) if replies else -1,
+        "max": max(replies, default=-1),
+    }
+
+
+TRACEROUTE = {
+    "af": 4,
+    "prb_id": 202,
+    "timestamp": 1445025400,
+    "endtime": 1445025403,
+    "type": "traceroute",
+    "msm_id": 1000193,
+    "fw": 4700,
+    "from": "109.190.83.40",
+    "dst_addr": "62.2.16.24",
+    "dst_name": "hsi.cablecom.ch",
+    "src_addr": "192.168.103.132",
+    "proto": "ICMP",
+    "paris_id": 1,
+    "size": 48,
+    "result": [
+        {
+            "hop": 1,
+            "result": [
+                {"from": "192.168.103.1", "rtt": 1.0, "size": 76, "ttl": 64},
+                {"from": "192.168.103.1", "rtt": 3.0, "size": 76, "ttl": 64},
+                {"x": "*"},
+            ],
+        },
+        {"hop": 2, "result": [{"x": "*"}, {"x": "*"}, {"x": "*"}]},
+    ],
+}
+
+
+@unittest.skipUnless(numpy, "NumPy isn't installed")
+class TestColumnarRenderer(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.results = [
+            get_ping(i % 7 + 1, 1445025400 + i, [20.0 + i, None, 10.0 + i])
+            for i in range(10)
+        ]
+        self.results.append(get_ping(8, 1445025500, [None, None]))
+
+    def render(self, path, results=None):
+        results = [
+            Result.get(r, on_error=Result.ACTION_IGNORE)
+            for r in (results or self.results)
+        ]
+        renderer = Renderer()
+        renderer.path = path
+        renderer.ROW_GROUP_SIZE = 4
+        with capture_sys_output() as (stdout, stderr):
+            renderer.render(results)
+        return stdout.getvalue()
+
+    def test_npz(self):
+        path = os.path.join(self.path, "results.npz")
+        self.assertEqual(self.render(path), "Wrote 11 rows to {}.\n".format(path))
+
+        with numpy.load(path) as columns:
+            self.assertEqual(
+                sorted(columns.files),
+                sorted(name for name, _ in Renderer.COLUMNS["ping"]),
+            )
+            self.assertEqual(columns["prb_id"].dtype, numpy.int64)
+            self.assertEqual(list(columns["prb_id"][:8]), [1, 2, 3, 4, 5, 6, 7, 1])
+            self.assertEqual(list(columns["rtt_min"][:2]), [10.0, 11.0])
+            self.assertEqual(list(columns["rtt_max"][:2]), [20.0, 21.0])
+            self.assertEqual(list(columns["rcvd"][-2:]), [2, 0])
+            self.assertTrue(math.isnan(columns["rtt_avg"][-1]))
+
+    def test_traceroute(self):
+        path = os.path.join(self.path, "results.npz")
+        self.render(path, [TRACEROUTE])
+        with numpy.load(path) as columns:
+            self.assertEqual(list(columns["hop"]), [1, 2])
+            self.assertEqual(list(columns["rtt_avg"][:1]), [2.0])
+            self.assertEqual(list(columns["sent"]), [3, 3])
+            self.assertEqual(list(columns["rcvd"]), [2, 0])
+            self.assertTrue(math.isnan(columns["rtt_min"][1]))
+
+    @unittest.skipUnless(pyarrow, "pyarrow isn't installed")
+    def test_parquet(self):
+        path = os.path.join(self.path, "results.parquet")
+        self.render(path)
+        parquet = pyarrow.parquet.ParquetFile(path)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.num_rows, 11)
+        self.assertEqual(
+            table.column("timestamp").to_pylist()[:2], [1445025400, 1445025401]
+        )
+
+    def test_fallback(self):
+        """Without pyarrow, we fall back to .npz unless asked for Parquet."""
+        path = os.path.join(self.path, "results")
+        with mock.patch(
+            "ripe.atlas.tools.renderers.columnar.ParquetWriter",
+            side_effect=ImportError,
+        ):
+            self.render(path)
+            with self.assertRaises(RipeAtlasToolsException):
+                self.render(path + ".parquet")
+        with numpy.load(path) as columns:
+            self.assertEqual(len(columns["prb_id"]), 11)
+
+    def test_report(self):
+        """Tests that report hands the file name on to the renderer."""
+        path = os.path.join(self.path, "results.npz")
+        with capture_sys_output():
+            mpath = "ripe.atlas.cousteau.AtlasRequest.get"
+            with mock.patch(mpath) as mock_get:
+                mock_get.side_effect = [(True, self.results)]
+                mpath = "ripe.atlas.tools.filters.Probe.get_many"
+                with mock.patch(mpath) as mock_get_many:
+                    mock_get_many.side_effect = lambda ids: [
+                        Probe(id=pk, meta_data={}) for pk in ids
+                    ]
+                    cmd = Command()
+                    cmd.init_args(
+                        ["1", "--renderer", "columnar", "--columnar-file", path]
+                    )
+                    cmd.run()
+        with numpy.load(path) as columns:
+            self.assertEqual(len(columns["prb_id"]), 11)
+
+    def test_no_file(self):
+        with self.assertRaises(RipeAtlasToolsException):
+            self.render(None)
@@ -201,7 +201,8 @@ class TestAggregatePing(unittest.TestCase):
             "\n"
             "--- 194.88.241.228 ping statistics ---\n"
             "15 packets transmitted, 15 received, 0.0% loss\n"
-            "rtt min/med/avg/max = 36.922/42.406/82.693/218.077 ms\n"
+            "rtt min/avg/max = 36.922/82.693/218.077 ms\n"
+            "rtt p50/p90/p99 = 42.524/152.951/156.041 ms\n"
         )
 
         r = Renderer()
@@ -216,48 +217,25 @@ class TestAggregatePing(unittest.TestCase):
         renderer = Renderer()
         for s in self.sagans:
             renderer.collect_stats(s)
-        self.assertEqual(
-            renderer.rtts,
-            [
-                42.343,
-                42.22,
-                42.406,
-                76.611,
-                76.39,
-                76.474,
-                154.118,
-                154.197,
-                154.845,
-                42.264,
-                42.196,
-                42.343,
-                218.077,
-                36.922,
-                38.994,
-            ],
-        )
+        self.assertEqual(len(renderer.rtts), 15)
+        self.assertAlmostEqual(renderer.rtt_sum, 1240.4, places=6)
         self.assertEqual(renderer.target, "194.88.241.228")
         self.assertEqual(renderer.sent_packets, 15)
         self.assertEqual(renderer.received_packets, 15)
-        self.assertEqual(
-            renderer.rtts_min, [42.220215, 76.38997, 154.118, 42.196233, 36.921608]
-        )
-        self.assertEqual(
-            renderer.rtts_max, [42.40614, 76.61127, 154.845, 42.342921, 218.077484]
-        )
+        self.assertEqual(renderer.rtt_min, 36.921608)
+        self.assertEqual(renderer.rtt_max, 218.077484)
 
     def test_collect_min_max_rtts(self):
         """Test use cases for collecting min max rtts."""
         renderer = Renderer()
-        renderer.collect_min_max_rtts("min", 3)
-        self.assertEqual(renderer.rtts_min, [3])
-        renderer.collect_min_max_rtts("min", None)
-        self.assertEqual(renderer.rtts_min, [3, 0])
-
-        renderer.collect_min_max_rtts("max", 3)
-        self.assertEqual(renderer.rtts_max, [3])
-        renderer.collect_min_max_rtts("max", None)
-        self.assertEqual(renderer.rtts_max, [3, 0])
+        renderer.collect_min_max_rtts(3, 5)
+        self.assertEqual((renderer.rtt_min, renderer.rtt_max), (3, 5))
+        renderer.collect_min_max_rtts(None, None)
+        self.assertEqual((renderer.rtt_min, renderer.rtt_max), (3, 5))
+        renderer.collect_min_max_rtts(2, 4)
+        self.assertEqual((renderer.rtt_min, renderer.rtt_max), (2, 5))
+        renderer.collect_min_max_rtts(4, 6)
+        self.assertEqual((renderer.rtt_min, renderer.rtt_max), (2, 6))
 
     def test_collect_packets_rtt(self):
         """Test use cases for collecting rtts."""
@@ -265,12 +243,23 @@ class TestAggregatePing(unittest.TestCase):
         packets = [Packet(rtt=2), Packet(rtt=3.2), Packet(rtt=5.0)]
         renderer = Renderer()
         renderer.collect_packets_rtt(packets)
-        self.assertEqual(renderer.rtts, [2, 3.2, 5.0])
+        self.assertEqual(len(renderer.rtts), 3)
+        self.assertEqual(renderer.rtt_sum, 10.2)
 
+        # Lost packets don't count as 0ms
         packets = [Packet(rtt=None), Packet(rtt=3.2), Packet(rtt=5.0)]
         renderer = Renderer()
         renderer.collect_packets_rtt(packets)
-        self.assertEqual(renderer.rtts, [0, 3.2, 5.0])
+        self.assertEqual(len(renderer.rtts), 2)
+        self.assertEqual(renderer.rtt_sum, 8.2)
+
+        # Nor do duplicate replies
+        DupPacket = namedtuple("DupPacket", "rtt dup")
+        packets = [DupPacket(2, False), DupPacket(3.2, False), DupPacket(9.0, True)]
+        renderer = Renderer()
+        renderer.collect_packets_rtt(packets)
+        self.assertEqual(len(renderer.rtts), 2)
+        self.assertEqual(renderer.rtt_sum, 5.2)
 
     def test_calculate_loss(self):
         """Test use cases for calculating loss."""
@@ -286,22 +275,46 @@ class TestAggregatePing(unittest.TestCase):
         renderer.received_packets = 5
         self.assertEqual(renderer.calculate_loss(), 50)
 
+    def get_renderer(self, rtts):
+        Packet = namedtuple("Packet", "rtt")
+        renderer = Renderer()
+        renderer.collect_packets_rtt([Packet(rtt=rtt) for rtt in rtts])
+        return renderer
+
     def test_mean(self):
         """Test use cases for calculating mean."""
-        renderer = Renderer()
-        renderer.rtts = [0, 2.0, 5.0, 20]
-        self.assertEqual(renderer.mean(), 6.75)
-        renderer.rtts = [0, 2.0, 7.5, 5.0, 20]
-        self.assertEqual(renderer.mean(), 6.9)
-        renderer.rtts = [0, 2.0, 7.5, 5.0, 20, 50]
-        self.assertEqual(renderer.mean(), 14.083)
+        self.assertEqual(self.get_renderer([]).mean(), 0)
+        self.assertEqual(self.get_renderer([0, 2.0, 5.0, 20]).mean(), 6.75)
+        self.assertEqual(self.get_renderer([0, 2.0, 7.5, 5.0, 20]).mean(), 6.9)
+        self.assertEqual(
+            self.get_renderer([0, 2.0, 7.5, 5.0, 20, 50]).mean(), 14.083
+        )
 
     def test_median(self):
-        """Test use cases for calculating median."""
-        renderer = Renderer()
-        renderer.rtts = [0, 2.0, 5.0, 20]
-        self.assertEqual(renderer.median(), 3.5)
-        renderer.rtts = [0, 2.0, 7.5, 5.0, 20]
-        self.assertEqual(renderer.median(), 5)
-        renderer.rtts = [0, 2.0, 7.5, 5.0, 20, 50]
-        self.assertEqual(renderer.median(), 6.25)
+        """Test use cases for estimating the median, to within 1%."""
+        self.assertEqual(self.get_renderer([]).median(), 0)
+        self.assertAlmostEqual(
+            self.get_renderer([0, 2.0, 7.5, 5.0, 20]).median(), 5, delta=0.05
+        )
+        self.assertAlmostEqual(
+            self.get_renderer([7.5, 20, 5.0, 50, 2.0]).median(), 7.5, delta=0.075
+        )
+
+    def test_quantile(self):
+        """Tests that quantiles stay within the range of what was seen."""
+        renderer = self.get_renderer(range(1, 1001))
+        self.assertAlmostEqual(renderer.quantile(0.9), 900, delta=9)
+        self.assertAlmostEqual(renderer.quantile(0.99), 990, delta=9.9)
+        self.assertEqual(renderer.quantile(0), 1)
+        self.assertEqual(renderer.quantile(1), 1000)
+
+    def test_merge(self):
+        """Tests that merging renderers is the same as collecting it all."""
+        whole = Renderer()
+        parts = [Renderer(), Renderer()]
+        for i, s in enumerate(self.sagans):
+            whole.collect_stats(s)
+            parts[i % 2].collect_stats(s)
+        parts[0].merge(parts[1])
+        self.assertEqual(parts[0].footer(), whole.footer())
+        self.assertEqual(parts[0].sent_packets, 15)
@@ -30,6 +30,11 @@ class MockIP:
     def __init__(self, ip: str) -> None:
         self.asn = ip.split(".")[-1].split(":")[-1]
 
+    @classmethod
+    def resolve_many(cls, addresses):
+        cls.resolved = set(addresses)
+        return {address: cls(address) for address in cls.resolved}
+
 
 class TestTracerouteASPathRenderer(unittest.TestCase):
 
@@ -77,3 +82,20 @@ Number of probes for each AS path:
      AS206    AS142     AS46     AS10: 1 probe, 1 completed
 """
         self.assertEqual(output.split("\n"), expected.split("\n"))
+
+    @mock.patch("ripe.atlas.tools.renderers.traceroute_aspath.IP")
+    def test_prefetch(self, mock_IP):
+        mock_IP.resolve_many.side_effect = MockIP.resolve_many
+        args = Namespace(
+            traceroute_aspath_radius=2,
+            show_header=False,
+            show_footer=False,
+        )
+        renderer = Renderer(arguments=args)
+        with mock.patch("builtins.print"):
+            renderer.render([Result.get(res) for res in self.results])
+
+        # All hops of the window are resolved at once, never one by one
+        self.assertEqual(mock_IP.resolve_many.call_count, 1)
+        self.assertEqual(len(MockIP.resolved), 20)
+        self.assertEqual(mock_IP.call_count, 0)
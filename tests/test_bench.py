@@ -0,0 +1,60 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+import unittest
+
+from ripe.atlas.sagan import Result
+
+from bench import micro, run
+from bench.generators import KINDS, Generator
+
+from .base import capture_sys_output
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generators(self):
+        """Tests that the synthetic results are all valid."""
+        for kind in KINDS:
+            generator = Generator(kind, 20, probes=7)
+            for line in generator.lines():
+                result = Result.get(line)
+                self.assertEqual(json.loads(line)["type"], kind)
+                self.assertFalse(result.is_error)
+                self.assertFalse(result.is_malformed)
+                self.assertIn(result.probe_id, generator.get_probes())
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.json")
+            with capture_sys_output():
+                run.main(["--size", "10", "--repeat", "1", "--output", path])
+            with open(path) as f:
+                report = json.load(f)
+
+        stages = {(b["kind"], b["stage"]) for b in report["benchmarks"]}
+        for kind in KINDS:
+            for stage in ("parse", "filter", "aggregate", "render:raw"):
+                self.assertIn((kind, stage), stages)
+        self.assertIn(("traceroute", "render:traceroute_aspath"), stages)
+        self.assertTrue(all(b["results"] == 10 for b in report["benchmarks"]))
+
+    def test_micro(self):
+        with capture_sys_output() as (stdout, stderr):
+            report = micro.main(["--size", "100", "--repeat", "1"])
+        self.assertEqual(json.loads(stdout.getvalue()), report)
+        self.assertIn("aggregate:country", {b["name"] for b in report["benchmarks"]})
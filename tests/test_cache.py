@@ -0,0 +1,203 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ripe.atlas.tools.cache import LocalCache, SQLiteCache, get_cache
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+
+
+class TemporaryCacheMixin(object):
+    def _get_or_create_db_path(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        return os.path.join(self.tmp_dir, "cache")
+
+    def test_cleanup(self):
+        self._db.close()
+        shutil.rmtree(self.tmp_dir)
+
+
+class TemporaryLocalCache(TemporaryCacheMixin, LocalCache):
+    pass
+
+
+class TemporarySQLiteCache(TemporaryCacheMixin, SQLiteCache):
+    pass
+
+
+class CacheTestsMixin(object):
+
+    CACHE_CLASS = None
+
+    def setUp(self):
+        self.cache = self.CACHE_CLASS()
+
+    def tearDown(self):
+        self.cache.test_cleanup()
+
+    def test_get_set(self):
+        self.cache.set("probe:1", {"id": 1}, 60)
+        self.assertEqual(self.cache.get("probe:1"), {"id": 1})
+        self.assertEqual(self.cache["probe:1"], {"id": 1})
+        self.assertIn("probe:1", self.cache)
+        self.assertIsNone(self.cache.get("probe:2"))
+        self.assertEqual(self.cache.get("probe:2", "default"), "default")
+
+    def test_bytes_keys(self):
+        self.cache.set(b"\x80\x03memoised:key", [1, 2], 60)
+        self.assertEqual(self.cache.get(b"\x80\x03memoised:key"), [1, 2])
+
+    def test_expiry(self):
+        self.cache.set("probe:1", {"id": 1}, 60)
+        self.cache.set("probe:2", {"id": 2}, -60)
+        self.assertIsNone(self.cache.get("probe:2"))
+
+        self.cache.set("probe:2", {"id": 2}, -60)
+        self.cache.expire()
+        self.assertEqual(self.cache.keys(), [b"probe:1"])
+
+    def test_get_many_set_many(self):
+        self.cache.set_many({"probe:1": 1, "probe:2": 2, "probe:3": 3}, 60)
+        self.cache.set("probe:4", 4, -60)
+        self.assertEqual(
+            self.cache.get_many(["probe:1", "probe:3", "probe:4", "probe:5"]),
+            {"probe:1": 1, "probe:3": 3},
+        )
+        self.assertEqual(self.cache.get_many([]), {})
+
+    def test_keys_by_namespace(self):
+        self.cache.set_many({"probe:1": 1, "IPDetails:193.0.6.1": {}}, 60)
+        self.assertEqual(
+            sorted(self.cache.keys()), [b"IPDetails:193.0.6.1", b"probe:1"]
+        )
+        self.assertEqual(self.cache.keys("probe"), [b"probe:1"])
+
+    def test_clear(self):
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.cache.clear("probe:1")
+        self.assertEqual(self.cache.keys(), [b"probe:2"])
+        self.cache.clear()
+        self.assertEqual(list(self.cache.keys()), [])
+
+    def test_memory_hits(self):
+        self.cache.set("probe:1", {"id": 1}, 60)
+        with mock.patch.object(self.cache, "_read") as mock_read:
+            self.assertEqual(self.cache.get("probe:1"), {"id": 1})
+            self.assertEqual(self.cache.get(b"probe:1"), {"id": 1})
+            self.assertEqual(mock_read.call_count, 0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 0))
+
+        self.assertIsNone(self.cache.get("probe:2"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_memory_lru(self):
+        self.cache.memory_size = 2
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.cache.get("probe:1")
+        self.cache.set("probe:3", 3, 60)
+
+        # probe:2 was the least recently used, so it's only on disk now
+        self.assertEqual(list(self.cache._memory), [b"probe:1", b"probe:3"])
+        self.assertEqual(self.cache.get("probe:2"), 2)
+        self.assertEqual(list(self.cache._memory), [b"probe:3", b"probe:2"])
+
+    def test_memory_expiry(self):
+        self.cache.set("probe:1", 1, 60)
+        self.cache._now += datetime.timedelta(seconds=120)
+        self.assertIsNone(self.cache.get("probe:1"))
+
+    def test_memory_disabled(self):
+        self.cache.memory_size = 0
+        self.cache.set("probe:1", 1, 60)
+        self.assertEqual(self.cache.get("probe:1"), 1)
+        self.assertEqual(len(self.cache._memory), 0)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_memory_clear(self):
+        self.cache.set_many({"probe:1": 1, "probe:2": 2}, 60)
+        self.cache.clear("probe:1")
+        self.assertIsNone(self.cache.get("probe:1"))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("probe:2"))
+
+    def test_delitem(self):
+        self.cache.set("probe:1", 1, 60)
+        del self.cache["probe:1"]
+        self.assertIsNone(self.cache.get("probe:1"))
+        with self.assertRaises(KeyError):
+            del self.cache["probe:1"]
+
+    def test_threads(self):
+        """Tests that the cache can be shared with a worker thread."""
+        self.cache.set("probe:1", 1, 60)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(self.cache.set, "probe:{}".format(i), i, 60)
+                for i in range(2, 50)
+            ]
+            for future in futures:
+                future.result()
+            got = executor.submit(self.cache.get_many, ["probe:1", "probe:49"])
+            self.assertEqual(got.result(), {"probe:1": 1, "probe:49": 49})
+        self.assertEqual(len(self.cache.keys("probe")), 49)
+
+
+class TestLocalCache(CacheTestsMixin, unittest.TestCase):
+
+    CACHE_CLASS = TemporaryLocalCache
+
+    def test_sync_batches_only(self):
+        """
+        Tests that single writes aren't synced, as with dbm.dumb that rewrites
+        the whole index every time.
+        """
+        with mock.patch.object(self.cache, "_sync") as sync:
+            for i in range(10):
+                self.cache.set("probe:{}".format(i), i, 60)
+            sync.assert_not_called()
+            self.cache.set_many({"probe:10": 10, "probe:11": 11}, 60)
+            sync.assert_called_once_with()
+        self.assertEqual(self.cache.get("probe:3"), 3)
+
+
+class TestSQLiteCache(CacheTestsMixin, unittest.TestCase):
+
+    CACHE_CLASS = TemporarySQLiteCache
+
+    def test_never_expires(self):
+        self.cache.set("probe:1", 1)
+        self.cache._now += datetime.timedelta(days=365)
+        self.cache.expire()
+        self.assertEqual(self.cache.get("probe:1"), 1)
+
+    def test_get_many_large_batch(self):
+        self.cache.set_many({"probe:{}".format(i): i for i in range(2500)}, 60)
+        r = self.cache.get_many("probe:{}".format(i) for i in range(0, 2500, 2))
+        self.assertEqual(len(r), 1250)
+        self.assertEqual(r["probe:2498"], 2498)
+
+
+class TestGetCache(unittest.TestCase):
+    def test_engines(self):
+        self.assertIsInstance(get_cache("dbm"), LocalCache)
+        self.assertIsInstance(get_cache("sqlite"), SQLiteCache)
+        with self.assertRaises(RipeAtlasToolsException):
+            get_cache("memcached")
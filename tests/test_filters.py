@@ -13,12 +13,29 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import time
 import unittest
+from unittest import mock
 
 from ripe.atlas.sagan import Result
 from ripe.atlas.cousteau import Probe
 from ripe.atlas.tools.exceptions import RipeAtlasToolsException
-from ripe.atlas.tools.filters import FilterFactory, Filter, ASNFilter, filter_results
+from ripe.atlas.tools.filters import (
+    FilterFactory,
+    Filter,
+    ASNFilter,
+    TagFilter,
+    AnyFilter,
+    AllFilter,
+    filter_raw,
+    filter_results,
+    get_probe_id,
+    iter_filtered,
+    parse_results,
+    SaganSet,
+    Probe as FProbe,
+)
 
 
 class TestFilterFactory(unittest.TestCase):
@@ -203,3 +220,228 @@ class TestFilterResults(unittest.TestCase):
             FilterFactory.create("country_code", "NL"),
         ]
         self.assertEqual(filter_results(filters, self.sagan_results), expected_results)
+
+    def test_iter_filtered(self):
+        """Tests that results are filtered as they're pulled through."""
+        seen = []
+
+        def results():
+            for result in self.sagan_results:
+                seen.append(result)
+                yield result
+
+        filtered = iter_filtered([FilterFactory.create("asn", 3337)], results())
+        self.assertEqual(seen, [])
+        self.assertIs(next(filtered), self.sagan_results[0])
+        self.assertEqual(seen, self.sagan_results[:1])
+        self.assertEqual(list(filtered), self.sagan_results[2:])
+
+    def test_any_filter_merges(self):
+        """Tests that filters on the same field become a single set lookup."""
+        rfilter = AnyFilter(
+            [
+                FilterFactory.create("asn", 3338),
+                FilterFactory.create("country_code", "DE"),
+                FilterFactory.create("asn", "4446"),
+                FilterFactory.create("country_code", "XX"),
+            ]
+        )
+        self.assertEqual(len(rfilter.filters), 2)
+        self.assertEqual(rfilter.filters[0].values, {3338, "4446"})
+        self.assertEqual(
+            [r for r in self.sagan_results if rfilter.filter(r)],
+            self.sagan_results[1:],
+        )
+
+    def test_composition(self):
+        """Tests AND and OR over different probe fields."""
+        rfilter = AllFilter(
+            [
+                FilterFactory.create("asn", 3337),
+                AnyFilter(
+                    [
+                        FilterFactory.create("country_code", "GR"),
+                        FilterFactory.create("country_code", "DE"),
+                    ]
+                ),
+            ]
+        )
+        self.assertEqual(
+            [r for r in self.sagan_results if rfilter.filter(r)],
+            self.sagan_results[0:3:2],
+        )
+
+    def test_tag_filter(self):
+        """Tests filtering on the slugs of probe tags."""
+        self.sagan_results[1].probe.tags = [{"name": "Home", "slug": "home"}]
+        self.sagan_results[2].probe.tags = [{"name": "Office", "slug": "office"}]
+        self.assertIsInstance(FilterFactory.create("tags", "home"), TagFilter)
+        self.assertEqual(
+            filter_results(
+                [FilterFactory.create("tags", "home")], self.sagan_results
+            ),
+            [self.sagan_results[1]],
+        )
+        # Unhashable values don't match, rather than blowing up
+        self.assertFalse(Filter("tags", "home").filter(self.sagan_results[1]))
+
+
+class TestProbe(unittest.TestCase):
+    def test_get_many(self):
+        """Tests that probes are read and written in one batch each."""
+        cached = Probe(id=1, meta_data={"country_code": "NL"})
+        fetched = Probe(id=2, meta_data={"country_code": "GR"})
+
+        with mock.patch("ripe.atlas.tools.filters.cache") as mock_cache:
+            mock_cache.get_many.return_value = {"probe:1": cached}
+            with mock.patch("ripe.atlas.tools.filters.ProbeRequest") as mock_request:
+                mock_request.return_value = [fetched]
+                probes = FProbe.get_many([1, 2, 2, 1])
+
+        self.assertEqual(probes, [cached, fetched])
+        self.assertEqual(mock_cache.get_many.call_count, 1)
+        self.assertEqual(mock_request.call_args.kwargs["id__in"], ["2"])
+        mock_cache.set_many.assert_called_once_with(
+            {"probe:2": fetched}, FProbe.EXPIRE_TIME
+        )
+
+
+class TestSaganSet(unittest.TestCase):
+    def setUp(self):
+        self.lines = []
+        for i in range(1200):
+            self.lines.append(
+                json.dumps(
+                    {
+                        "af": 4,
+                        "prb_id": i % 7 + 1,
+                        "result": [{"rtt": float(i)}],
+                        "timestamp": 1445025400 + i,
+                        "type": "ping",
+                        "msm_id": 1000192,
+                        "fw": 4700,
+                        "from": "109.190.83.40",
+                        "dst_addr": "62.2.16.24",
+                        "dst_name": "hsi.cablecom.ch",
+                    }
+                )
+                + "\n"
+            )
+            if i % 100 == 0:
+                self.lines.append("garbage\n")
+
+        patcher = mock.patch("ripe.atlas.tools.filters.Probe.get_many")
+        self.mock_get_many = patcher.start()
+        self.mock_get_many.side_effect = lambda ids: [
+            Probe(id=pk, meta_data={"country_code": "NL"}) for pk in ids
+        ]
+        self.addCleanup(patcher.stop)
+
+    def test_iter(self):
+        sagans = list(SaganSet(iterable=self.lines, probes=[1, 2]))
+        self.assertEqual(len(sagans), 344)
+        self.assertTrue(all(s.probe_id in (1, 2) for s in sagans))
+        self.assertTrue(all(s.probe.id == s.probe_id for s in sagans))
+        for batch in self.mock_get_many.call_args_list:
+            self.assertLessEqual(len(batch.args[0]), 2)
+
+    def test_iter_jobs(self):
+        """Tests that parsing on a process pool keeps the original order."""
+        serial = list(SaganSet(iterable=self.lines))
+        parallel = list(SaganSet(iterable=self.lines, jobs=3))
+        self.assertEqual(len(serial), 1200)
+        self.assertEqual(
+            [s.rtt_min for s in parallel], [s.rtt_min for s in serial]
+        )
+        self.assertTrue(all(s.probe.id == s.probe_id for s in parallel))
+
+    def test_iter_batches(self):
+        """Tests that batches grow while we're waiting on lookups."""
+        lines = [
+            json.dumps(dict(json.loads(line), prb_id=i))
+            for i, line in enumerate(self.lines[:200])
+            if line != "garbage\n"
+        ]
+
+        sizes = []
+
+        def get_many(ids):
+            sizes.append(len(ids))
+            time.sleep(0.05)
+            return [Probe(id=pk, meta_data={}) for pk in ids]
+
+        self.mock_get_many.side_effect = get_many
+        sagan_set = SaganSet(iterable=lines)
+        sagan_set.PROBE_BATCH_SIZE = 10
+        sagan_set.PROBE_BATCH_SIZE_MAX = 40
+
+        self.assertEqual(len(list(sagan_set)), 198)
+        self.assertEqual(sizes[:4], [10, 10, 20, 40])
+        self.assertEqual(max(sizes), 40)
+
+    def test_iter_pipelined(self):
+        """Tests that a batch is parsed before the previous one is yielded."""
+        events = []
+        fetch_probes = SaganSet._fetch_probes
+
+        def submit(executor, sagans):
+            events.append("fetch")
+            return fetch_probes(executor, sagans)
+
+        with mock.patch.object(SaganSet, "_fetch_probes", side_effect=submit):
+            for sagan in SaganSet(iterable=self.lines[:250]):
+                events.append("yield")
+                break
+
+        self.assertEqual(events, ["fetch", "fetch", "yield"])
+
+
+class TestParseResults(unittest.TestCase):
+    def test_get_probe_id(self):
+        self.assertEqual(get_probe_id('{"type": "ping", "prb_id": 1216}'), 1216)
+        self.assertEqual(get_probe_id('{"prb_id":12,"result":[]}'), 12)
+        self.assertEqual(get_probe_id({"prb_id": 12}), 12)
+        self.assertIsNone(get_probe_id("garbage"))
+
+    def test_skip_before_parsing(self):
+        """Tests that results from other probes never reach sagan."""
+        lines = [
+            json.dumps(
+                {
+                    "af": 4,
+                    "prb_id": i,
+                    "result": [{"rtt": 27.429}],
+                    "timestamp": 1445025400,
+                    "type": "ping",
+                    "msm_id": 1000192,
+                    "fw": 4700,
+                    "from": "109.190.83.40",
+                    "dst_addr": "62.2.16.24",
+                }
+            )
+            for i in range(1, 11)
+        ]
+        lines.append("garbage")
+        with mock.patch(
+            "ripe.atlas.tools.filters.Result.get", wraps=Result.get
+        ) as mock_get:
+            sagans = parse_results(lines, frozenset([3, 7]))
+        self.assertEqual([s.probe_id for s in sagans], [3, 7])
+        # The garbage line can't be told apart, so it's left to sagan
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_filter_raw(self):
+        """Tests the time window and type guards on raw results."""
+        lines = [
+            '{"type": "ping", "timestamp": 100}',
+            '{"type": "ping", "timestamp": 200}',
+            {"type": "dns", "timestamp": 200},
+            '{"type":"ping","timestamp":300}',
+            "garbage",
+        ]
+        self.assertEqual(
+            list(filter_raw(lines, start=200, stop=300, kind="ping")),
+            [lines[1], lines[3], lines[4]],
+        )
+        self.assertEqual(list(filter_raw(lines, stop=100)), lines[:1] + lines[4:])
+        self.assertEqual(list(filter_raw(lines)), lines)
@@ -16,13 +16,14 @@
 import os
 
 import unittest
+import IPy
 import requests
 import shutil
 import tempfile
 
 from unittest import mock
 
-from ripe.atlas.tools.ipdetails import IP
+from ripe.atlas.tools.ipdetails import IP, PrefixIndex, PrefixTrie
 from ripe.atlas.tools.cache import LocalCache
 
 
@@ -188,10 +189,12 @@ class TestIPDetails(unittest.TestCase):
 
     def setUp(self):
         fake_cache.clear()
+        PrefixIndex(fake_cache.get_path() + PrefixIndex.SUFFIX).clear()
 
         self.mock_cache = mock.patch(
             "ripe.atlas.tools.ipdetails.cache", wraps=fake_cache
         ).start()
+        mock.patch.object(IP, "_prefix_index", None).start()
         self.mock_get = mock.patch("ripe.atlas.tools.ipdetails.requests.get").start()
         self.mock_get.return_value = FakeResponse(
             json_return=self.MOCK_RESULTS[self.IP]
@@ -280,8 +283,8 @@ class TestIPDetails(unittest.TestCase):
         self.assertEqual(det1.asn, self.ASN)
         self.assertEqual(det2.asn, det1.asn)
         self.assertEqual(self.mock_get.call_count, 2)
-        # access to cache get
-        self.assertEqual(self.mock_cache.get.call_count, 3)
+        # access to cache get, the non-matching prefix is never loaded
+        self.assertEqual(self.mock_cache.get.call_count, 2)
         # access to cache set
         self.assertEqual(self.mock_cache.set.call_count, 4)
 
@@ -415,6 +418,76 @@ class TestIPDetails(unittest.TestCase):
         self.assertFalse(ip.cached_prefix_found)
         self.assertEqual(ip.get_from_cached_prefix(), None)
 
+    def test_get_from_cache_prefix_expired(self):
+        """Test case where the most specific cached prefix has expired"""
+        details = {"Prefix": "193.0.0.0/16", "Holder": "test", "ASN": "test"}
+        self.mock_cache.set("IPDetailsPrefix:193.0.0.0/16", details, 1)
+        index = IP.get_prefix_index()
+        index.add("193.0.0.0/21")
+        ip = IP(self.IP)
+        self.assertEqual(ip.asn, "test")
+        self.assertEqual(index.matches(ip.ip_object), ["193.0.0.0/16"])
+
+    def test_prefix_index_persistence(self):
+        """Test case where the index is reloaded from its journal"""
+        IP(self.IP)
+        index = IP.get_prefix_index()
+        index.add("2001:db8::/32")
+        index.discard("193.0.0.0/21")
+
+        reloaded = PrefixIndex.load(fake_cache)
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(
+            reloaded.matches(IP("2001:db8::1").ip_object), ["2001:db8::/32"]
+        )
+        self.assertEqual(reloaded.matches(IP(self.IP).ip_object), [])
+
+    def test_resolve_many(self):
+        """Test case where many addresses are resolved in bulk"""
+        session = mock.Mock()
+        session.get.side_effect = lambda url, timeout: FakeResponse(
+            json_return=self.MOCK_RESULTS.get(
+                url.rsplit("=", 1)[1], self.MOCK_RESULTS[self.IP]
+            )
+        )
+        self.mock_cache.set(
+            "IPDetails:193.0.22.2",
+            {"Prefix": "193.0.22.0/23", "Holder": "cached", "ASN": "1"},
+            1,
+        )
+
+        with mock.patch.object(IP, "get_session", return_value=session):
+            ips = IP.resolve_many(
+                [
+                    self.IP,
+                    self.IP,
+                    self.SAME_PREFIX_IP,
+                    self.SAME_AS_DIFFERENT_PREFIX_IP,
+                    "193.0.22.2",
+                    self.NOT_ANNOUNCED_IP,
+                    "127.0.0.1",
+                ]
+            )
+
+        self.assertEqual(len(ips), 6)
+        self.assertEqual(ips[self.IP].asn, self.ASN)
+        self.assertEqual(ips[self.SAME_PREFIX_IP].prefix, self.PREFIX)
+        self.assertEqual(ips[self.SAME_AS_DIFFERENT_PREFIX_IP].asn, self.ASN)
+        self.assertEqual(ips["193.0.22.2"].holder, "cached")
+        self.assertIsNone(ips[self.NOT_ANNOUNCED_IP].asn)
+        self.assertIsNone(ips["127.0.0.1"].asn)
+
+        # One query per /24, neighbours are resolved through the new prefix
+        queried = [c.args[0].rsplit("=", 1)[1] for c in session.get.mock_calls]
+        self.assertEqual(len(queried), 3)
+        self.assertIn(self.SAME_AS_DIFFERENT_PREFIX_IP, queried)
+        self.assertIn(self.NOT_ANNOUNCED_IP, queried)
+        self.assertEqual(self.mock_get.call_count, 0)
+
+        # Everything we learned is cached for regular lookups
+        self.assertEqual(IP(self.SAME_PREFIX_IP).asn, self.ASN)
+        self.assertEqual(self.mock_get.call_count, 0)
+
     def test_is_querable(self):
         """Test case where IP is quearable"""
         ip = IP(self.IP)
@@ -424,3 +497,26 @@ class TestIPDetails(unittest.TestCase):
         """Test case where IP is not quearable"""
         ip = IP("127.0.0.1")
         self.assertFalse(ip.is_querable())
+
+
+class TestPrefixTrie(unittest.TestCase):
+    def test_longest_match(self):
+        trie = PrefixTrie(32)
+        for prefix in ("0.0.0.0/0", "10.0.0.0/8", "10.1.0.0/16", "10.1.2.3/32"):
+            network = IPy.IP(prefix)
+            trie.add(network.int(), network.prefixlen(), prefix)
+
+        address = IPy.IP("10.1.2.3").int()
+        self.assertEqual(
+            trie.matches(address),
+            ["10.1.2.3/32", "10.1.0.0/16", "10.0.0.0/8", "0.0.0.0/0"],
+        )
+        address = IPy.IP("10.2.0.1").int()
+        self.assertEqual(trie.matches(address), ["10.0.0.0/8", "0.0.0.0/0"])
+
+        trie.remove(IPy.IP("10.0.0.0").int(), 8)
+        self.assertEqual(trie.matches(address), ["0.0.0.0/0"])
+        self.assertEqual(len(trie), 3)
+        self.assertEqual(
+            sorted(trie), ["0.0.0.0/0", "10.1.0.0/16", "10.1.2.3/32"]
+        )
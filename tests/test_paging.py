@@ -0,0 +1,135 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import threading
+import time
+import unittest
+from unittest import mock
+
+from ripe.atlas.tools.exceptions import RipeAtlasToolsException
+from ripe.atlas.tools.paging import (
+    PagedResults,
+    SessionResultsRequest,
+    get_slices,
+    get_timestamp,
+)
+
+
+class TestSlices(unittest.TestCase):
+    def test_get_slices(self):
+        """Tests that slices cover the window without overlapping."""
+        start = datetime.datetime(2016, 1, 1)
+        slices = list(get_slices(start, datetime.datetime(2016, 1, 1, 2, 30), 3600))
+        self.assertEqual(
+            slices,
+            [
+                (start, datetime.datetime(2016, 1, 1, 0, 59, 59)),
+                (
+                    datetime.datetime(2016, 1, 1, 1),
+                    datetime.datetime(2016, 1, 1, 1, 59, 59),
+                ),
+                (
+                    datetime.datetime(2016, 1, 1, 2),
+                    datetime.datetime(2016, 1, 1, 2, 30),
+                ),
+            ],
+        )
+
+    def test_get_slices_aware(self):
+        """Tests that times in other time zones are converted to UTC."""
+        tz = datetime.timezone(datetime.timedelta(hours=2))
+        slices = list(
+            get_slices(
+                datetime.datetime(2016, 1, 1, 2, tzinfo=tz),
+                datetime.datetime(2016, 1, 1, 2, 0, 10, tzinfo=tz),
+                60,
+            )
+        )
+        self.assertEqual(
+            slices,
+            [(datetime.datetime(2016, 1, 1), datetime.datetime(2016, 1, 1, 0, 0, 10))],
+        )
+
+
+class TestPagedResults(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2016, 1, 1)
+        self.stop = datetime.datetime(2016, 1, 1, 9, 59, 59)
+
+    def get(self, request):
+        # Later slices come back first, to show that order is kept anyway
+        hour = request.start.hour
+        time.sleep((10 - hour) * 0.005)
+        with self.lock:
+            self.sessions.add(request.session)
+            self.in_flight.append(hour)
+            self.max_in_flight = max(self.max_in_flight, len(self.in_flight))
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight.remove(hour)
+        return True, [{"timestamp": get_timestamp(request.start), "hour": hour}]
+
+    def test_iter(self):
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.in_flight = []
+        self.max_in_flight = 0
+
+        with mock.patch.object(
+            SessionResultsRequest, "get", autospec=True, side_effect=self.get
+        ):
+            results = list(
+                PagedResults(
+                    self.start, self.stop, 3600, concurrency=3, msm_id=1, probe_ids=[1]
+                )
+            )
+
+        self.assertEqual([r["hour"] for r in results], list(range(10)))
+        self.assertEqual(len(self.sessions), 1)
+        self.assertLessEqual(self.max_in_flight, 3)
+
+    def test_error(self):
+        with mock.patch.object(SessionResultsRequest, "get") as mock_get:
+            mock_get.return_value = (
+                False,
+                {"error": {"status": 404, "title": "Not Found", "detail": "Nope"}},
+            )
+            with self.assertRaises(RipeAtlasToolsException) as e:
+                list(PagedResults(self.start, self.stop, 3600, msm_id=1))
+        self.assertEqual(
+            str(e.exception),
+            "Error fetching measurement results: [404 Not Found] Nope",
+        )
+
+    def test_request(self):
+        """Tests that each slice asks the API for its own window."""
+        session = mock.Mock()
+        request = SessionResultsRequest(
+            session,
+            msm_id=1,
+            start=datetime.datetime(2016, 1, 1),
+            stop=datetime.datetime(2016, 1, 1, 0, 59, 59),
+            server="atlas.example.com",
+        )
+        request.get()
+        self.assertEqual(
+            session.request.call_args.args,
+            ("GET", "https://atlas.example.com/api/v2/measurements/1/results"),
+        )
+        self.assertEqual(
+            session.request.call_args.kwargs["params"],
+            {"start": 1451606400, "stop": 1451609999},
+        )
@@ -0,0 +1,133 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "ripe-atlas"
+)
+
+IMPORTED = """
+import runpy, sys
+sys.argv = [{script!r}] + {args!r}
+try:
+    runpy.run_path({script!r}, run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write(" ".join(sorted(sys.modules)))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    """
+    ripe-atlas gets run from scripts and cron jobs many times over, so how long
+    it takes just to start matters.
+    """
+
+    # Seconds that `ripe-atlas configure --help` may take from start to finish,
+    # which leaves a few times what it needs on a laptop
+    BUDGET = 0.75
+
+    # Modules that a command which doesn't touch results has no reason to load
+    HEAVY = (
+        "numpy",
+        "requests",
+        "OpenSSL",
+        "tzlocal",
+        "IPy",
+        "ripe.atlas.cousteau",
+        "ripe.atlas.sagan",
+        "ripe.atlas.tools.commands.measure",
+    )
+
+    @staticmethod
+    def get_env(**env):
+        # Other tests may have left bash completion or profiling switched on
+        environ = {
+            k: v
+            for k, v in os.environ.items()
+            if k not in ("RIPE_ATLAS_AUTO_COMPLETE", "RIPE_ATLAS_PROFILE")
+        }
+        environ.update(env)
+        return environ
+
+    def run_script(self, *args, **env):
+        return subprocess.run(
+            [sys.executable, SCRIPT] + list(args),
+            capture_output=True,
+            env=self.get_env(**env),
+            timeout=60,
+            text=True,
+        )
+
+    def test_budget(self):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            self.assertEqual(self.run_script("configure", "--help").returncode, 0)
+            timings.append(time.perf_counter() - start)
+        self.assertLess(min(timings), self.BUDGET)
+
+    def get_imported(self, *args):
+        code = IMPORTED.format(script=SCRIPT, args=list(args))
+        process = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            env=self.get_env(),
+            timeout=60,
+            text=True,
+        )
+        return set(process.stderr.split())
+
+    def test_imports(self):
+        self.get_imported("configure", "--help")  # Builds the manifests, if need be
+        imported = self.get_imported("configure", "--help")
+        self.assertIn("ripe.atlas.tools.commands.configure", imported)
+        for name in self.HEAVY:
+            self.assertNotIn(name, imported)
+
+    def test_usage_imports(self):
+        """Tests that listing the commands doesn't import any of them."""
+        self.get_imported()  # Builds the manifests, if need be
+        imported = self.get_imported()
+        self.assertIn("ripe.atlas.tools.commands.base", imported)
+        self.assertEqual(
+            [
+                name
+                for name in imported
+                if name.startswith("ripe.atlas.tools.commands.")
+                and name != "ripe.atlas.tools.commands.base"
+            ],
+            [],
+        )
+
+    def test_profile(self):
+        """Tests that --profile-startup reports on the run without upsetting it."""
+        process = self.run_script("configure", "--profile-startup", "--help")
+        self.assertEqual(process.returncode, 0)
+        self.assertIn("Usage: ripe-atlas configure", process.stdout)
+        self.assertIn("Startup profile:", process.stderr)
+        self.assertIn("parser build", process.stderr)
+        self.assertIn("ripe.atlas.tools.commands.configure", process.stderr)
+
+        process = self.run_script("configure", "--help", RIPE_ATLAS_PROFILE="1")
+        self.assertIn("Startup profile:", process.stderr)
+
+        process = self.run_script("configure", "--help", RIPE_ATLAS_PROFILE="0")
+        self.assertNotIn("Startup profile:", process.stderr)
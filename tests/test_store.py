@@ -0,0 +1,123 @@
+# Copyright (c) 2016 RIPE NCC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ripe.atlas.tools.paging import get_datetime
+from ripe.atlas.tools.store import ResultsStore
+
+DAY = 60 * 60 * 24
+
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.store = ResultsStore(1001, path=os.path.join(self.path, "1001"))
+        self.fetched = []
+
+    def fetch(self, start, stop):
+        """Pretend there's a result every hour on the hour."""
+        self.fetched.append((start, stop))
+        first = start + (-start % 3600)
+        results = [
+            {"prb_id": 1, "timestamp": t} for t in range(first, stop + 1, 3600)
+        ]
+        return [(get_datetime(start), get_datetime(stop), results)]
+
+    def test_empty(self):
+        self.assertFalse(self.store.exists())
+        self.assertIsNone(self.store.get_last_stop())
+        self.assertEqual(self.store.get_pieces(0, 10), [(0, 10, False)])
+
+    def test_add_and_read(self):
+        """Tests that results are split over daily segments and read back."""
+        results = [{"prb_id": 1, "timestamp": t} for t in range(0, 3 * DAY, 3600)]
+        self.store.add(results[:30], 0, 30 * 3600 - 1)
+        self.store.add(results[30:], 30 * 3600, 3 * DAY - 1)
+
+        self.assertTrue(self.store.exists())
+        self.assertEqual(
+            sorted(os.listdir(self.store.path)),
+            [
+                "1970-01-01.jsonl.gz",
+                "1970-01-02.jsonl.gz",
+                "1970-01-03.jsonl.gz",
+                "index.json",
+            ],
+        )
+        # Touching spans are merged
+        self.assertEqual(self.store.get_covered(), [(0, 3 * DAY - 1)])
+        self.assertEqual(
+            [json.loads(line) for line in self.store.read(20 * 3600, 50 * 3600)],
+            results[20:51],
+        )
+
+    def test_get_pieces(self):
+        self.store.add([], 100, 199)
+        self.store.add([], 300, 399)
+        self.assertEqual(
+            self.store.get_pieces(150, 350),
+            [(150, 199, True), (200, 299, False), (300, 350, True)],
+        )
+        self.assertEqual(
+            self.store.get_pieces(0, 500),
+            [
+                (0, 99, False),
+                (100, 199, True),
+                (200, 299, False),
+                (300, 399, True),
+                (400, 500, False),
+            ],
+        )
+
+    def test_get_results(self):
+        """Tests that only the gaps are fetched, and stored for next time."""
+        stop = 2 * DAY - 1
+        first = [
+            json.loads(r) if isinstance(r, str) else r
+            for r in self.store.get_results(DAY, stop, self.fetch)
+        ]
+        self.assertEqual(self.fetched, [(DAY, stop)])
+
+        results = [
+            json.loads(r) if isinstance(r, str) else r
+            for r in self.store.get_results(0, stop, self.fetch)
+        ]
+        self.assertEqual(self.fetched, [(DAY, stop), (0, DAY - 1)])
+        self.assertEqual(len(results), 48)
+        self.assertEqual(results[24:], first)
+
+        self.fetched = []
+        list(self.store.get_results(0, stop, self.fetch))
+        self.assertEqual(self.fetched, [])
+
+    def test_settle_time(self):
+        """Tests that the most recent results are passed on but not stored."""
+        now = int(time.time())
+        start = now - 3 * 3600
+        results = list(self.store.get_results(start, now, self.fetch))
+        self.assertGreaterEqual(len(results), 3)
+        settled = self.store.get_last_stop()
+        self.assertAlmostEqual(settled, now - ResultsStore.SETTLE_TIME, delta=2)
+        self.assertEqual(
+            len(list(self.store.read(start, now))),
+            len([r for r in results if r["timestamp"] <= settled]),
+        )